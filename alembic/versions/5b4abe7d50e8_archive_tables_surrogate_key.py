@@ -0,0 +1,76 @@
+"""Archive tables: surrogate primary key
+
+Revision ID: 5b4abe7d50e8
+Revises: c3f9a1e7d250
+Create Date: 2026-10-20 09:12:44.201583
+
+Em b8e1f4c2d697 o id original era a PK de `<tabela>_archive`. O SQLite reusa
+ids (sem AUTOINCREMENT), então arquivar uma linha com id já presente no
+arquivo falhava com IntegrityError. Agora a PK é `archive_id` e o id original
+vira coluna indexada, não única.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b4abe7d50e8'
+down_revision: Union[str, Sequence[str], None] = 'c3f9a1e7d250'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ARCHIVES = ['transactions_archive', 'installments_archive', 'investments_archive', 'consents_archive']
+
+
+def _rebuild(archive: str, surrogate: bool) -> None:
+    """Recria `archive` com (ou sem) `archive_id`, copiando as linhas."""
+    bind = op.get_bind()
+    old_name = f'{archive}_old'
+    op.drop_index(f'idx_{archive}_user', table_name=archive)
+    if not surrogate:
+        op.drop_index(f'idx_{archive}_id', table_name=archive)
+    op.rename_table(archive, old_name)
+    if bind.dialect.name == 'postgresql':
+        # O nome da PK não acompanha o rename e colidiria com a da tabela nova
+        op.execute(f"ALTER TABLE {old_name} RENAME CONSTRAINT {archive}_pkey TO {old_name}_pkey")
+
+    old = sa.Table(old_name, sa.MetaData(), autoload_with=bind)
+    data_columns = [c for c in old.columns if c.name != 'archive_id']
+    if surrogate:
+        columns = [sa.Column('archive_id', sa.Integer(), primary_key=True, autoincrement=True)]
+        columns += [sa.Column(c.name, c.type, nullable=c.nullable) for c in data_columns]
+    else:
+        columns = [sa.Column(c.name, c.type, primary_key=c.name == 'id', nullable=c.nullable, autoincrement=False)
+                   for c in data_columns]
+    op.create_table(archive, *columns)
+    op.create_index(f'idx_{archive}_user', archive, ['user_id'])
+    if surrogate:
+        op.create_index(f'idx_{archive}_id', archive, ['id'])
+
+    names = ", ".join(c.name for c in data_columns)
+    source = old_name
+    if not surrogate:
+        # Sem archive_id não cabem duas versões do mesmo id: fica a arquivada por último
+        source += f" WHERE archive_id IN (SELECT max(archive_id) FROM {old_name} GROUP BY id)"
+    op.execute(f"INSERT INTO {archive} ({names}) SELECT {names} FROM {source}")
+    op.drop_table(old_name)
+
+
+def upgrade() -> None:
+    """Upgrade schema: PK própria (archive_id) nas tabelas *_archive."""
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for archive in ARCHIVES:
+        if archive in tables and 'archive_id' not in {c['name'] for c in inspector.get_columns(archive)}:
+            _rebuild(archive, surrogate=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema: id original volta a ser a PK (versões repetidas de um id são descartadas)."""
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for archive in ARCHIVES:
+        if archive in tables and 'archive_id' in {c['name'] for c in inspector.get_columns(archive)}:
+            _rebuild(archive, surrogate=False)
@@ -0,0 +1,51 @@
+"""Unique pending sync request per consent
+
+Revision ID: 8ea8a2208478
+Revises: 5b4abe7d50e8
+Create Date: 2026-10-21 10:41:09.582114
+
+Dois webhooks concorrentes podiam enfileirar o mesmo consent (ambos viam a
+fila sem pendente antes do commit). O índice único parcial garante no máximo
+um SyncRequest pendente por consent; pendentes duplicados já existentes são
+fechados como done (o mais antigo continua na fila).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8ea8a2208478'
+down_revision: Union[str, Sequence[str], None] = '5b4abe7d50e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = 'uq_sync_request_pending_consent'
+PENDING = "status = 'pending'"
+
+
+def _sync_request_indexes() -> set:
+    """Nomes dos índices de sync_requests (vazio se a tabela não existe)."""
+    inspector = sa.inspect(op.get_bind())
+    if 'sync_requests' not in inspector.get_table_names():
+        return set()
+    return {index['name'] for index in inspector.get_indexes('sync_requests')}
+
+
+def upgrade() -> None:
+    """Upgrade schema: índice único parcial (consent_id) WHERE status = 'pending'."""
+    if not sa.inspect(op.get_bind()).has_table('sync_requests') or INDEX in _sync_request_indexes():
+        return
+    op.execute(
+        "UPDATE sync_requests SET status = 'done', last_error = 'coalesced' "
+        f"WHERE {PENDING} AND id NOT IN (SELECT min(id) FROM sync_requests WHERE {PENDING} GROUP BY consent_id)"
+    )
+    op.create_index(INDEX, 'sync_requests', ['consent_id'], unique=True,
+                    postgresql_where=sa.text(PENDING), sqlite_where=sa.text(PENDING))
+
+
+def downgrade() -> None:
+    """Downgrade schema: remove o índice único parcial."""
+    if INDEX in _sync_request_indexes():
+        op.drop_index(INDEX, table_name='sync_requests')
@@ -0,0 +1,81 @@
+"""Partial indexes on live rows
+
+Revision ID: a4d7e2b81c35
+Revises: f2c6d8a4b913
+Create Date: 2026-10-19 18:07:52.114806
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d7e2b81c35'
+down_revision: Union[str, Sequence[str], None] = 'f2c6d8a4b913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LIVE = 'deleted_at IS NULL'
+
+# (tabela, índice parcial, colunas) — colunas extras no fim da chave cobrem as somas do summary;
+# deleted_at (sempre NULL) na chave permite ao SQLite usar o índice parcial como covering
+LIVE_INDEXES = [
+    ('transactions', 'idx_transaction_live_user_date', ['user_id', 'date', 'type', 'amount', 'deleted_at']),
+    ('installments', 'idx_installment_live_user_date', ['user_id', 'date_added']),
+    ('installments', 'idx_installment_live_user_end_date', ['user_id', 'end_date', 'date_added', 'monthly_value', 'deleted_at']),
+    ('consents', 'idx_consent_live_user_status', ['user_id', 'status']),
+    ('investments', 'idx_investment_live_user_date', ['user_id', 'purchase_date']),
+]
+
+# Índices substituídos: os compostos incluíam linhas deletadas e os de deleted_at sozinho quase não filtram
+REPLACED_INDEXES = [
+    ('transactions', 'idx_transaction_user_date', ['user_id', 'date']),
+    ('transactions', 'idx_transaction_deleted_at', ['deleted_at']),
+    ('installments', 'idx_installment_user_date', ['user_id', 'date_added']),
+    ('installments', 'idx_installment_user_end_date', ['user_id', 'end_date']),
+    ('installments', 'idx_installment_deleted_at', ['deleted_at']),
+    ('consents', 'idx_consent_user_status', ['user_id', 'status']),
+    ('consents', 'idx_consent_deleted_at', ['deleted_at']),
+    ('investments', 'idx_investment_user_date', ['user_id', 'purchase_date']),
+    ('investments', 'idx_investment_deleted_at', ['deleted_at']),
+]
+
+
+def _existing_indexes() -> set:
+    """(tabela, índice) existentes, via inspector (portável, sem sqlite_master)."""
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    return {
+        (table, index['name'])
+        for table in {t for t, _, _ in LIVE_INDEXES + REPLACED_INDEXES} & tables
+        for index in inspector.get_indexes(table)
+    }
+
+
+def upgrade() -> None:
+    """Upgrade schema: índices parciais WHERE deleted_at IS NULL no lugar dos índices completos."""
+    existing = _existing_indexes()
+    # CONCURRENTLY no Postgres (fora de transação) para não bloquear escritas; ignorado no SQLite
+    with op.get_context().autocommit_block():
+        for table, name, columns in LIVE_INDEXES:
+            if (table, name) not in existing:
+                op.create_index(name, table, columns,
+                                postgresql_where=sa.text(LIVE), sqlite_where=sa.text(LIVE),
+                                postgresql_concurrently=True)
+        for table, name, _ in REPLACED_INDEXES:
+            if (table, name) in existing:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema: volta aos índices completos."""
+    existing = _existing_indexes()
+    with op.get_context().autocommit_block():
+        for table, name, columns in REPLACED_INDEXES:
+            if (table, name) not in existing:
+                op.create_index(name, table, columns, postgresql_concurrently=True)
+        for table, name, _ in LIVE_INDEXES:
+            if (table, name) in existing:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,82 @@
+"""Add installment end_date
+
+Revision ID: b3f1c9d2e4a7
+Revises: 6a8a71d3da19
+Create Date: 2026-10-19 09:12:40.318204
+
+"""
+from typing import Sequence, Union
+from datetime import date
+import calendar
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f1c9d2e4a7'
+down_revision: Union[str, Sequence[str], None] = '6a8a71d3da19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def _end_date(date_added: date, total_months: int) -> date:
+    # Cópia congelada de backend.installment_end_date (migrações não dependem do app)
+    month_index = date_added.month - 1 + max(int(total_months), 1) - 1
+    year = date_added.year + month_index // 12
+    month = month_index % 12 + 1
+    return date(year, month, min(date_added.day, calendar.monthrange(year, month)[1]))
+
+
+def upgrade() -> None:
+    """Upgrade schema: adiciona end_date, faz backfill em lotes e cria índice."""
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+
+    # create_all() (executado ao importar backend) pode já ter criado coluna/índice
+    columns = {c['name'] for c in inspector.get_columns('installments')}
+    if 'end_date' not in columns:
+        op.add_column('installments', sa.Column('end_date', sa.Date(), nullable=True))
+
+    installments = sa.table(
+        'installments',
+        sa.column('id', sa.Integer),
+        sa.column('date_added', sa.Date),
+        sa.column('total_months', sa.Integer),
+        sa.column('end_date', sa.Date),
+    )
+
+    # Backfill em lotes por id (keyset) para não carregar a tabela inteira
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(installments.c.id, installments.c.date_added, installments.c.total_months)
+            .where(installments.c.id > last_id, installments.c.end_date.is_(None))
+            .order_by(installments.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        connection.execute(
+            installments.update()
+            .where(installments.c.id == sa.bindparam('row_id'))
+            .values(end_date=sa.bindparam('row_end_date')),
+            [
+                {"row_id": row.id, "row_end_date": _end_date(row.date_added, row.total_months)}
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+    indexes = {i['name'] for i in inspector.get_indexes('installments')}
+    if 'idx_installment_user_end_date' not in indexes:
+        op.create_index('idx_installment_user_end_date', 'installments', ['user_id', 'end_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema: remove índice e coluna end_date."""
+    op.drop_index('idx_installment_user_end_date', table_name='installments')
+    with op.batch_alter_table('installments') as batch_op:
+        batch_op.drop_column('end_date')
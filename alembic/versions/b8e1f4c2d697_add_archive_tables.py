@@ -0,0 +1,99 @@
+"""Add archive tables
+
+Revision ID: b8e1f4c2d697
+Revises: a4d7e2b81c35
+Create Date: 2026-10-19 19:32:40.508213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e1f4c2d697'
+down_revision: Union[str, Sequence[str], None] = 'a4d7e2b81c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DELETED = 'deleted_at IS NOT NULL'
+
+# Cópia congelada das colunas das tabelas quentes (migrações não dependem do app)
+ARCHIVE_COLUMNS = {
+    'transactions': lambda: [
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('user_id', sa.String(64), nullable=False),
+        sa.Column('description', sa.String(255), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('type', sa.String(16), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    ],
+    'installments': lambda: [
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('user_id', sa.String(64), nullable=False),
+        sa.Column('description', sa.String(255), nullable=False),
+        sa.Column('monthly_value', sa.Float(), nullable=False),
+        sa.Column('total_months', sa.Integer(), nullable=False),
+        sa.Column('date_added', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=True),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    ],
+    'investments': lambda: [
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('user_id', sa.String(64), nullable=False),
+        sa.Column('name', sa.String(256), nullable=False),
+        sa.Column('asset_type', sa.String(64), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('purchase_price', sa.Float(), nullable=False),
+        sa.Column('current_price', sa.Float(), nullable=True),
+        sa.Column('purchase_date', sa.Date(), nullable=False),
+        sa.Column('target_return', sa.Float(), nullable=True),
+        sa.Column('status', sa.String(32), nullable=False),
+        sa.Column('notes', sa.String(1024), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    ],
+    'consents': lambda: [
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('user_id', sa.String(64), nullable=False),
+        sa.Column('consent_id', sa.String(128), nullable=False),
+        sa.Column('provider', sa.String(64), nullable=False),
+        sa.Column('scopes', sa.String(512), nullable=False),
+        sa.Column('status', sa.String(32), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    ],
+}
+
+# Índice parcial das linhas deletadas na tabela quente (busca do `jobs.py archive`)
+SOFT_DELETED_INDEXES = {
+    'transactions': 'idx_transaction_soft_deleted',
+    'installments': 'idx_installment_soft_deleted',
+    'investments': 'idx_investment_soft_deleted',
+    'consents': 'idx_consent_soft_deleted',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema: tabelas *_archive e índice parcial das linhas com soft delete."""
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for table, columns in ARCHIVE_COLUMNS.items():
+        archive = f'{table}_archive'
+        if archive not in tables:
+            op.create_table(archive, *columns(), sa.Column('archived_at', sa.DateTime(), nullable=False))
+            op.create_index(f'idx_{archive}_user', archive, ['user_id'])
+        if SOFT_DELETED_INDEXES[table] not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(SOFT_DELETED_INDEXES[table], table, ['deleted_at'],
+                            postgresql_where=sa.text(DELETED), sqlite_where=sa.text(DELETED))
+
+
+def downgrade() -> None:
+    """Downgrade schema: remove as tabelas *_archive (as linhas arquivadas são perdidas)."""
+    for table in ARCHIVE_COLUMNS:
+        op.drop_index(SOFT_DELETED_INDEXES[table], table_name=table)
+        op.drop_table(f'{table}_archive')
@@ -0,0 +1,127 @@
+"""Partition transactions by month (Postgres, opcional)
+
+Revision ID: c3f9a1e7d250
+Revises: b8e1f4c2d697
+Create Date: 2026-10-19 21:14:09.663172
+
+Só em PostgreSQL e com TRANSACTIONS_PARTITIONED=true no momento do upgrade;
+nos demais casos é um no-op. Para ativar depois: defina a variável e rode
+`alembic downgrade b8e1f4c2d697 && alembic upgrade head`.
+
+Converte `transactions` em tabela particionada por RANGE (date), com uma
+partição por mês (transactions_pYYYY_MM) desde a transação mais antiga até
+PARTITION_MONTHS_AHEAD meses à frente, mais transactions_ppast (MINVALUE até o
+primeiro mês) e transactions_pfuture (até MAXVALUE). Sem partição DEFAULT, para
+o Postgres poder varrer as partições em ordem (ORDER BY date ... LIMIT).
+A manutenção fica com `jobs.py partitions`.
+"""
+import os
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f9a1e7d250'
+down_revision: Union[str, Sequence[str], None] = 'b8e1f4c2d697'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "id, user_id, description, amount, type, date, deleted_at"
+
+COLUMN_DDL = """
+    user_id VARCHAR(64) NOT NULL,
+    description VARCHAR(255) NOT NULL,
+    amount DOUBLE PRECISION NOT NULL,
+    type VARCHAR(16) NOT NULL,
+    date DATE NOT NULL,
+    deleted_at TIMESTAMP WITHOUT TIME ZONE
+"""
+
+# Índices de `transactions` nesta revisão (cópia congelada; num pai particionado valem para todas as partições)
+INDEXES = [
+    ('ix_transactions_user_id', ['user_id'], None),
+    ('idx_transaction_date', ['date'], None),
+    ('idx_transaction_type', ['type'], None),
+    ('idx_transaction_live_user_date', ['user_id', 'date', 'type', 'amount', 'deleted_at'], 'deleted_at IS NULL'),
+    ('idx_transaction_soft_deleted', ['deleted_at'], 'deleted_at IS NOT NULL'),
+]
+
+
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _next_month(d: date) -> date:
+    return date(d.year + d.month // 12, d.month % 12 + 1, 1)
+
+
+def _relkind(connection) -> str:
+    return connection.execute(sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass('transactions')")).scalar()
+
+
+def _create_indexes() -> None:
+    for name, columns, where in INDEXES:
+        op.create_index(name, 'transactions', columns, postgresql_where=sa.text(where) if where else None)
+
+
+def upgrade() -> None:
+    """Upgrade schema: transactions particionada por mês (somente Postgres, opt-in)."""
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql' or os.getenv('TRANSACTIONS_PARTITIONED', 'false').lower() != 'true':
+        return
+    if _relkind(connection) == 'p':
+        return
+
+    oldest = connection.execute(sa.text("SELECT min(date) FROM transactions")).scalar() or date.today()
+    first = _month_start(oldest)
+    end = _month_start(date.today())
+    for _ in range(int(os.getenv('PARTITION_MONTHS_AHEAD', '3')) + 1):
+        end = _next_month(end)
+
+    op.execute("ALTER TABLE transactions RENAME TO transactions_unpartitioned")
+    # O nome da PK (índice) não acompanha o rename da tabela e colidiria com a nova
+    op.execute("ALTER TABLE transactions_unpartitioned RENAME CONSTRAINT transactions_pkey TO transactions_unpartitioned_pkey")
+    op.execute(f"""
+        CREATE TABLE transactions (
+            id INTEGER NOT NULL DEFAULT nextval('transactions_id_seq'),
+            {COLUMN_DDL},
+            PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
+    """)
+    op.execute(f"CREATE TABLE transactions_ppast PARTITION OF transactions FOR VALUES FROM (MINVALUE) TO ('{first}')")
+    month = first
+    while month < end:
+        op.execute(
+            f"CREATE TABLE transactions_p{month:%Y_%m} PARTITION OF transactions "
+            f"FOR VALUES FROM ('{month}') TO ('{_next_month(month)}')"
+        )
+        month = _next_month(month)
+    op.execute(f"CREATE TABLE transactions_pfuture PARTITION OF transactions FOR VALUES FROM ('{end}') TO (MAXVALUE)")
+
+    op.execute(f"INSERT INTO transactions ({COLUMNS}) SELECT {COLUMNS} FROM transactions_unpartitioned")
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+    op.execute("DROP TABLE transactions_unpartitioned")
+    _create_indexes()
+    op.execute("ANALYZE transactions")
+
+
+def downgrade() -> None:
+    """Downgrade schema: volta a uma tabela única (partições desanexadas não são reincorporadas)."""
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql' or _relkind(connection) != 'p':
+        return
+    op.execute("ALTER TABLE transactions RENAME TO transactions_partitioned")
+    op.execute("ALTER TABLE transactions_partitioned RENAME CONSTRAINT transactions_pkey TO transactions_partitioned_pkey")
+    op.execute(f"""
+        CREATE TABLE transactions (
+            id INTEGER NOT NULL DEFAULT nextval('transactions_id_seq') PRIMARY KEY,
+            {COLUMN_DDL}
+        )
+    """)
+    op.execute(f"INSERT INTO transactions ({COLUMNS}) SELECT {COLUMNS} FROM transactions_partitioned")
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+    op.execute("DROP TABLE transactions_partitioned")  # leva junto as partições anexadas
+    _create_indexes()
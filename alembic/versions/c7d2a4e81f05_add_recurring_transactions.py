@@ -0,0 +1,59 @@
+"""Add recurring transactions
+
+Revision ID: c7d2a4e81f05
+Revises: b3f1c9d2e4a7
+Create Date: 2026-10-19 10:03:17.552871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2a4e81f05'
+down_revision: Union[str, Sequence[str], None] = 'b3f1c9d2e4a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema: tabelas de padrões recorrentes e cursor do detector."""
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'recurring_transactions' not in tables:
+        op.create_table(
+            'recurring_transactions',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.String(64), nullable=False),
+            sa.Column('type', sa.String(16), nullable=False),
+            sa.Column('description_key', sa.String(128), nullable=False),
+            sa.Column('description', sa.String(255), nullable=False),
+            sa.Column('amount', sa.Float(), nullable=False),
+            sa.Column('period', sa.String(16), nullable=True),
+            sa.Column('occurrences', sa.Integer(), nullable=False),
+            sa.Column('first_date', sa.Date(), nullable=False),
+            sa.Column('last_date', sa.Date(), nullable=False),
+            sa.Column('next_date', sa.Date(), nullable=True),
+            sa.Column('status', sa.String(16), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+        )
+        op.create_index('idx_recurring_user_status', 'recurring_transactions', ['user_id', 'status'], unique=False)
+        op.create_index('idx_recurring_user_key', 'recurring_transactions', ['user_id', 'type', 'description_key'], unique=False)
+
+    if 'recurrence_cursors' not in tables:
+        op.create_table(
+            'recurrence_cursors',
+            sa.Column('user_id', sa.String(64), primary_key=True),
+            sa.Column('last_transaction_id', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema: remove tabelas de recorrência."""
+    op.drop_table('recurrence_cursors')
+    op.drop_index('idx_recurring_user_key', table_name='recurring_transactions')
+    op.drop_index('idx_recurring_user_status', table_name='recurring_transactions')
+    op.drop_table('recurring_transactions')
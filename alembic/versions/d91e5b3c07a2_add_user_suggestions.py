@@ -0,0 +1,36 @@
+"""Add user suggestions
+
+Revision ID: d91e5b3c07a2
+Revises: c7d2a4e81f05
+Create Date: 2026-10-19 11:20:44.906113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd91e5b3c07a2'
+down_revision: Union[str, Sequence[str], None] = 'c7d2a4e81f05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema: tabela de sugestões pré-computadas."""
+    if 'user_suggestions' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'user_suggestions',
+        sa.Column('user_id', sa.String(64), primary_key=True),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('period_end', sa.Date(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema: remove tabela de sugestões pré-computadas."""
+    op.drop_table('user_suggestions')
@@ -0,0 +1,54 @@
+"""Add webhook events and sync requests
+
+Revision ID: e5a83c1f9b46
+Revises: d91e5b3c07a2
+Create Date: 2026-10-19 15:02:17.338410
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a83c1f9b46'
+down_revision: Union[str, Sequence[str], None] = 'd91e5b3c07a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema: dedupe de eventos de webhook e fila de syncs."""
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if 'webhook_events' not in tables:
+        op.create_table(
+            'webhook_events',
+            sa.Column('event_id', sa.String(128), primary_key=True),
+            sa.Column('event_type', sa.String(64), nullable=False),
+            sa.Column('consent_id', sa.String(128), nullable=True),
+            sa.Column('received_at', sa.DateTime(), nullable=False),
+        )
+        op.create_index('idx_webhook_event_received_at', 'webhook_events', ['received_at'])
+    if 'sync_requests' not in tables:
+        op.create_table(
+            'sync_requests',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.String(64), nullable=False),
+            sa.Column('consent_id', sa.String(128), nullable=False),
+            sa.Column('reason', sa.String(64), nullable=True),
+            sa.Column('status', sa.String(16), nullable=False),
+            sa.Column('attempts', sa.Integer(), nullable=False),
+            sa.Column('last_error', sa.String(512), nullable=True),
+            sa.Column('available_at', sa.DateTime(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+        )
+        op.create_index('idx_sync_request_status_available', 'sync_requests', ['status', 'available_at'])
+        op.create_index('idx_sync_request_consent_status', 'sync_requests', ['consent_id', 'status'])
+
+
+def downgrade() -> None:
+    """Downgrade schema: remove dedupe de webhooks e fila de syncs."""
+    op.drop_table('sync_requests')
+    op.drop_table('webhook_events')
@@ -0,0 +1,32 @@
+"""Add consent expires_at
+
+Revision ID: f2c6d8a4b913
+Revises: e5a83c1f9b46
+Create Date: 2026-10-19 16:41:05.772034
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6d8a4b913'
+down_revision: Union[str, Sequence[str], None] = 'e5a83c1f9b46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema: prazo de expiração dos consents."""
+    # create_all() (executado ao importar backend) pode já ter criado a coluna
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('consents')}
+    if 'expires_at' not in columns:
+        op.add_column('consents', sa.Column('expires_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema: remove prazo de expiração dos consents."""
+    with op.batch_alter_table('consents') as batch_op:
+        batch_op.drop_column('expires_at')
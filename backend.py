@@ -14,23 +14,41 @@ Serialização/validação: Marshmallow.
 from datetime import datetime, date, UTC
 from typing import Optional
 import secrets
+import uuid
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 import time
+import calendar
+import contextvars
+import math
+import json
+import hashlib
 
-from flask import Flask, jsonify, request, redirect, url_for, session
+from flask import Flask, g, jsonify, request, redirect, url_for, session
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_wtf.csrf import CSRFProtect
-from sqlalchemy import create_engine, Integer, String, Float, Date, Column, DateTime, Index
+from sqlalchemy import create_engine, Integer, String, Float, Date, Column, DateTime, Index, Table, Text, func, case, or_, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import declarative_base, sessionmaker, scoped_session
 from marshmallow import Schema, fields, ValidationError, validate
 from authlib.integrations.flask_client import OAuth
 from dotenv import load_dotenv
 import os
-from providers import SimulatedProvider, OpenFinanceProvider
-from logger import logger, LogContext
+from provider_registry import ProviderRegistry, UnknownProviderError
+from resilience import CircuitOpenError
+from upstream_limiter import BudgetExhaustedError
+import recurrence
+import suggestions as suggestions_engine
+from serializers import RowSerializer, json_response
+from validators import validate_transactions
+from logger import logger, bind_log_context, reset_log_context
+import metrics
+import db_profiler
+import profiling
+import tracing
 
 load_dotenv()
 
@@ -43,6 +61,10 @@ DB_URL = os.getenv("DATABASE_URL") or os.getenv("GF_DB_URL", "sqlite:///data.db"
 FLASK_SECRET_KEY = os.getenv("SECRET_KEY") or os.getenv("FLASK_SECRET_KEY", secrets.token_hex(32))
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
+# Opcional: exige "Authorization: Bearer <token>" em /metrics
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+# IDs (Google sub/email) com acesso aos endpoints de admin, separados por vírgula
+ADMIN_USER_IDS = {uid.strip() for uid in os.getenv("ADMIN_USER_IDS", "").split(",") if uid.strip()}
 
 # CRITICAL: Defer engine creation to avoid module import failures
 # If DB_URL is invalid/unreachable, this will cause gunicorn to timeout
@@ -69,13 +91,32 @@ def get_session_local():
     return SessionLocal
 
 
+def live_index(name: str, *columns: str) -> Index:
+    """Índice parcial só das linhas não deletadas (Postgres e SQLite).
+
+    Toda query filtra `deleted_at IS NULL`, então as linhas com soft delete ficam
+    fora do índice. Colunas extras no fim da chave tornam o índice de cobertura
+    (o SQLite não tem INCLUDE); nos de cobertura, `deleted_at` também entra na
+    chave porque o SQLite só usa índice parcial como covering com a coluna do WHERE.
+    """
+    live = text("deleted_at IS NULL")
+    return Index(name, *columns, postgresql_where=live, sqlite_where=live)
+
+
+def soft_deleted_index(name: str) -> Index:
+    """Índice parcial de `deleted_at` só das linhas deletadas (busca do job de arquivamento)."""
+    deleted = text("deleted_at IS NOT NULL")
+    return Index(name, 'deleted_at', postgresql_where=deleted, sqlite_where=deleted)
+
+
 class Transaction(Base):
     __tablename__ = "transactions"
     __table_args__ = (
         Index('idx_transaction_date', 'date'),
         Index('idx_transaction_type', 'type'),
-        Index('idx_transaction_deleted_at', 'deleted_at'),
-        Index('idx_transaction_user_date', 'user_id', 'date'),
+        # Cobre listagem por data, janelas de sugestões e as somas do summary (type, amount)
+        live_index('idx_transaction_live_user_date', 'user_id', 'date', 'type', 'amount', 'deleted_at'),
+        soft_deleted_index('idx_transaction_soft_deleted'),
     )
     
     id = Column(Integer, primary_key=True)
@@ -91,8 +132,10 @@ class Installment(Base):
     __tablename__ = "installments"
     __table_args__ = (
         Index('idx_installment_date_added', 'date_added'),
-        Index('idx_installment_deleted_at', 'deleted_at'),
-        Index('idx_installment_user_date', 'user_id', 'date_added'),
+        live_index('idx_installment_live_user_date', 'user_id', 'date_added'),
+        # Cobre o filtro de parcelamentos ativos e a soma de monthly_value do summary
+        live_index('idx_installment_live_user_end_date', 'user_id', 'end_date', 'date_added', 'monthly_value', 'deleted_at'),
+        soft_deleted_index('idx_installment_soft_deleted'),
     )
     
     id = Column(Integer, primary_key=True)
@@ -101,15 +144,69 @@ class Installment(Base):
     monthly_value = Column(Float, nullable=False)
     total_months = Column(Integer, nullable=False)
     date_added = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=True)  # Data da última parcela (date_added + total_months - 1 meses)
     deleted_at = Column(DateTime, nullable=True)  # Soft delete timestamp
 
 
+def user_summary(session_db, user_id: str, active_on: Optional[date] = None) -> dict:
+    """Totais do usuário calculados no banco (SUM agrupado), sem carregar as linhas.
+
+    As duas queries são respondidas pelos índices parciais de cobertura de
+    transações e parcelamentos. Com `active_on`, soma só parcelamentos em curso.
+    """
+    totals = dict(session_db.query(Transaction.type, func.sum(Transaction.amount)).filter(
+        Transaction.user_id == user_id,
+        Transaction.deleted_at.is_(None)
+    ).group_by(Transaction.type).all())
+    insts_query = session_db.query(func.sum(Installment.monthly_value)).filter(
+        Installment.user_id == user_id,
+        Installment.deleted_at.is_(None)
+    )
+    if active_on is not None:
+        insts_query = insts_query.filter(active_installments_filter(active_on))
+    income = float(totals.get("income") or 0.0)
+    expenses_avulsa = float(totals.get("expense") or 0.0)
+    expenses_parcelas = float(insts_query.scalar() or 0.0)
+    expenses_total = expenses_avulsa + expenses_parcelas
+    return {
+        "income": round(income, 2),
+        "expenses_avulsa": round(expenses_avulsa, 2),
+        "expenses_parcelas": round(expenses_parcelas, 2),
+        "expenses_total": round(expenses_total, 2),
+        "balance": round(income - expenses_total, 2)
+    }
+
+
+def add_months(d: date, months: int) -> date:
+    """Soma meses a uma data, ajustando o dia ao último dia do mês quando necessário."""
+    month_index = d.month - 1 + months
+    year = d.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(d.day, calendar.monthrange(year, month)[1])
+    return date(year, month, day)
+
+
+def installment_end_date(date_added: date, total_months: int) -> date:
+    """Data da última parcela de uma compra parcelada."""
+    return add_months(date_added, max(int(total_months), 1) - 1)
+
+
+def active_installments_filter(today: date):
+    """Critério SQL para parcelamentos em curso no mês de `today`.
+
+    Um parcelamento está ativo se já começou e a última parcela cai no mês
+    corrente ou depois. Usa o índice parcial (user_id, end_date, ...).
+    """
+    month_start = today.replace(day=1)
+    return (Installment.end_date >= month_start) & (Installment.date_added <= today)
+
+
 class Consent(Base):
     __tablename__ = "consents"
     __table_args__ = (
         Index('idx_consent_status', 'status'),
-        Index('idx_consent_deleted_at', 'deleted_at'),
-        Index('idx_consent_user_status', 'user_id', 'status'),
+        live_index('idx_consent_live_user_status', 'user_id', 'status'),
+        soft_deleted_index('idx_consent_soft_deleted'),
     )
     
     id = Column(Integer, primary_key=True)
@@ -119,15 +216,16 @@ class Consent(Base):
     scopes = Column(String(512), nullable=False)
     status = Column(String(32), nullable=False)  # active | revoked | expired
     created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=True)  # expirationDateTime do consent (UTC); None = sem prazo
     deleted_at = Column(DateTime, nullable=True)  # Soft delete timestamp
 
 
 class Investment(Base):
     __tablename__ = "investments"
     __table_args__ = (
-        Index('idx_investment_user_date', 'user_id', 'purchase_date'),
+        live_index('idx_investment_live_user_date', 'user_id', 'purchase_date'),
         Index('idx_investment_type', 'asset_type'),
-        Index('idx_investment_deleted_at', 'deleted_at'),
+        soft_deleted_index('idx_investment_soft_deleted'),
     )
     
     id = Column(Integer, primary_key=True)
@@ -146,6 +244,160 @@ class Investment(Base):
     deleted_at = Column(DateTime, nullable=True)  # Soft delete timestamp
 
 
+class RecurringTransaction(Base):
+    """Padrão recorrente detectado (assinatura, salário, conta fixa)."""
+    __tablename__ = "recurring_transactions"
+    __table_args__ = (
+        Index('idx_recurring_user_status', 'user_id', 'status'),
+        Index('idx_recurring_user_key', 'user_id', 'type', 'description_key'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(String(64), nullable=False)
+    type = Column(String(16), nullable=False)  # income | expense
+    description_key = Column(String(128), nullable=False)  # descrição normalizada
+    description = Column(String(255), nullable=False)  # última descrição observada
+    amount = Column(Float, nullable=False)  # valor médio
+    period = Column(String(16), nullable=True)  # weekly | monthly (None enquanto candidato)
+    occurrences = Column(Integer, nullable=False, default=1)
+    first_date = Column(Date, nullable=False)
+    last_date = Column(Date, nullable=False)
+    next_date = Column(Date, nullable=True)  # próxima ocorrência esperada
+    status = Column(String(16), nullable=False, default='candidate')  # candidate | active
+    updated_at = Column(DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+
+class RecurrenceCursor(Base):
+    """Última transação processada pelo detector de recorrências, por usuário."""
+    __tablename__ = "recurrence_cursors"
+
+    user_id = Column(String(64), primary_key=True)
+    last_transaction_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+
+class UserSuggestion(Base):
+    """Sugestões pré-computadas pelo job em lote (payload JSON de /suggestions)."""
+    __tablename__ = "user_suggestions"
+
+    user_id = Column(String(64), primary_key=True)
+    payload = Column(Text, nullable=False)
+    period_end = Column(Date, nullable=False)  # Data de referência do cálculo
+    computed_at = Column(DateTime, nullable=False)
+
+
+
+class WebhookEvent(Base):
+    """Eventos de webhook já processados (dedupe de reenvios pelo event_id)."""
+    __tablename__ = "webhook_events"
+    __table_args__ = (
+        Index('idx_webhook_event_received_at', 'received_at'),  # limpeza por idade
+    )
+
+    event_id = Column(String(128), primary_key=True)
+    event_type = Column(String(64), nullable=False)
+    consent_id = Column(String(128), nullable=True)
+    received_at = Column(DateTime, nullable=False)
+
+
+class SyncRequest(Base):
+    """Fila de syncs pendentes (webhooks → `jobs.py sync-queue`)."""
+    __tablename__ = "sync_requests"
+    __table_args__ = (
+        Index('idx_sync_request_status_available', 'status', 'available_at'),
+        Index('idx_sync_request_consent_status', 'consent_id', 'status'),
+        # No máximo um pedido pendente por consent, mesmo com webhooks concorrentes
+        Index('uq_sync_request_pending_consent', 'consent_id', unique=True,
+              postgresql_where=text("status = 'pending'"), sqlite_where=text("status = 'pending'")),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(String(64), nullable=False)
+    consent_id = Column(String(128), nullable=False)
+    reason = Column(String(64), nullable=True)  # evento que originou o pedido
+    status = Column(String(16), nullable=False, default='pending')  # pending | running | done | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String(512), nullable=True)
+    available_at = Column(DateTime, nullable=False)  # não processar antes (backoff entre tentativas)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+
+def archive_table(model) -> Table:
+    """Tabela fria `<tabela>_archive`: mesmas colunas de `model` + archived_at.
+
+    A PK é própria (`archive_id`): o id original é só uma coluna indexada, já que
+    o SQLite reusa ids e a mesma linha "lógica" pode ser arquivada mais de uma
+    vez. Sem as restrições de unicidade da tabela quente; user_id indexado para
+    restaurar por usuário.
+    """
+    hot = model.__table__
+    return Table(
+        f"{hot.name}_archive", Base.metadata,
+        Column("archive_id", Integer, primary_key=True, autoincrement=True),
+        *[Column(c.name, c.type, nullable=c.nullable) for c in hot.columns],
+        Column("archived_at", DateTime, nullable=False),
+        Index(f"idx_{hot.name}_archive_user", "user_id"),
+        Index(f"idx_{hot.name}_archive_id", "id"),
+    )
+
+
+# Tabelas com soft delete → tabela de arquivo (`jobs.py archive` / `jobs.py restore`)
+ARCHIVE_TABLES = {model.__tablename__: archive_table(model) for model in (Transaction, Installment, Investment, Consent)}
+
+
+# Idade máxima de sugestões pré-computadas antes de recalcular sob demanda
+SUGGESTIONS_MAX_AGE = timedelta(minutes=int(os.getenv("SUGGESTIONS_MAX_AGE_MINUTES", "1440")))
+
+
+def is_suggestion_fresh(cached: "UserSuggestion", today: date) -> bool:
+    """Sugestão pré-computada ainda válida (mesma data de referência e dentro da idade máxima)."""
+    return cached.period_end == today and datetime.now() - cached.computed_at <= SUGGESTIONS_MAX_AGE
+
+
+def invalidate_suggestions(session_db, user_id: str) -> None:
+    """Descarta sugestões pré-computadas após alteração das transações do usuário."""
+    session_db.query(UserSuggestion).filter(UserSuggestion.user_id == user_id).delete(synchronize_session=False)
+
+
+def query_category_totals(session_db, user_id: str, start: date) -> list:
+    """Totais (type, category, total, count) desde `start`, em um único GROUP BY.
+
+    Usa o índice (user_id, date); a categorização roda no banco via CASE.
+    """
+    category = suggestions_engine.category_expression(Transaction.description).label("category")
+    rows = session_db.query(
+        Transaction.type, category, func.sum(Transaction.amount), func.count(Transaction.id)
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.deleted_at.is_(None),
+        Transaction.date >= start
+    ).group_by(Transaction.type, category).all()
+    return [tuple(row) for row in rows]
+
+
+def query_month_over_month(session_db, user_id: str, today: date) -> dict:
+    """Variação mês a mês por categoria em um único GROUP BY sobre os dois meses."""
+    current_range, previous_range = suggestions_engine.month_ranges(today)
+    bucket = case((Transaction.date >= current_range[0], 'current'), else_='previous').label("bucket")
+    category = suggestions_engine.category_expression(Transaction.description).label("category")
+    rows = session_db.query(
+        bucket, Transaction.type, category, func.sum(Transaction.amount), func.count(Transaction.id)
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.deleted_at.is_(None),
+        Transaction.date >= previous_range[0],
+        Transaction.date <= current_range[1],
+        or_(Transaction.date >= current_range[0], Transaction.date <= previous_range[1])
+    ).group_by(bucket, Transaction.type, category).all()
+    return suggestions_engine.month_over_month(
+        [tuple(row[1:]) for row in rows if row[0] == 'current'],
+        [tuple(row[1:]) for row in rows if row[0] == 'previous'],
+        current_range,
+        previous_range
+    )
+
+
 class ConsentSchema(Schema):
     id = fields.Int(dump_only=True)
     user_id = fields.Str(required=True, validate=validate.Length(min=1))
@@ -154,6 +406,7 @@ class ConsentSchema(Schema):
     scopes = fields.Str(required=True)
     status = fields.Str(required=True, validate=validate.OneOf(["active", "revoked", "expired"]))
     created_at = fields.DateTime(dump_only=True)
+    expires_at = fields.DateTime(allow_none=True)
 
 
 class InvestmentSchema(Schema):
@@ -188,6 +441,19 @@ class InstallmentSchema(Schema):
     monthly_value = fields.Float(required=True)
     total_months = fields.Int(required=True)
     date_added = fields.Date(required=True)
+    end_date = fields.Date(dump_only=True)
+
+
+class RecurringTransactionSchema(Schema):
+    id = fields.Int(dump_only=True)
+    type = fields.Str()
+    description = fields.Str()
+    amount = fields.Float()
+    period = fields.Str()
+    occurrences = fields.Int()
+    first_date = fields.Date()
+    last_date = fields.Date()
+    next_date = fields.Date(allow_none=True)
 
 
 transaction_schema = TransactionSchema()
@@ -198,6 +464,350 @@ investment_schema = InvestmentSchema()
 investments_schema = InvestmentSchema(many=True)
 consent_schema = ConsentSchema()
 consents_schema = ConsentSchema(many=True)
+recurring_transactions_schema = RecurringTransactionSchema(many=True)
+
+# Serialização rápida (colunas + Row tuples) para endpoints de listagem
+transaction_rows = RowSerializer(Transaction, transaction_schema)
+installment_rows = RowSerializer(Installment, installment_schema)
+investment_rows = RowSerializer(Investment, investment_schema)
+consent_rows = RowSerializer(Consent, consent_schema)
+
+
+def detect_recurrences(session_db, user_id: str) -> int:
+    """Atualiza os padrões recorrentes do usuário com as transações novas.
+
+    Processa apenas transações com id acima do cursor do usuário, de modo que
+    cada sync paga pelas linhas que inseriu e não pelo histórico inteiro. Se uma
+    linha nova for anterior à última ocorrência do seu grupo, só esse grupo é
+    refeito a partir do histórico.
+
+    Returns:
+        Quantidade de transações processadas.
+    """
+    cursor = session_db.get(RecurrenceCursor, user_id)
+    if cursor is None:
+        cursor = RecurrenceCursor(user_id=user_id, last_transaction_id=0)
+        session_db.add(cursor)
+
+    rows = session_db.query(
+        Transaction.id, Transaction.description, Transaction.amount, Transaction.type, Transaction.date
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.deleted_at.is_(None),
+        Transaction.id > cursor.last_transaction_id
+    ).order_by(Transaction.date, Transaction.id).all()
+    if not rows:
+        return 0
+
+    patterns = session_db.query(RecurringTransaction).filter(
+        RecurringTransaction.user_id == user_id
+    ).all()
+
+    # Linhas retroativas (id novo, data antiga): refaz esses grupos a partir do histórico
+    rebuild = recurrence.backdated_keys(patterns, rows)
+    replay = rows
+    if rebuild:
+        for pattern in patterns:
+            if (pattern.type, pattern.description_key) in rebuild:
+                session_db.delete(pattern)
+        patterns = [p for p in patterns if (p.type, p.description_key) not in rebuild]
+        history = session_db.query(
+            Transaction.id, Transaction.description, Transaction.amount, Transaction.type, Transaction.date
+        ).filter(
+            Transaction.user_id == user_id,
+            Transaction.deleted_at.is_(None),
+            Transaction.id <= cursor.last_transaction_id
+        ).all()
+        replay = sorted(
+            [r for r in history if recurrence.group_key(r) in rebuild] + list(rows),
+            key=lambda r: (r.date, r.id)
+        )
+
+    created = recurrence.update_patterns(
+        patterns, replay, lambda **fields: RecurringTransaction(user_id=user_id, **fields)
+    )
+    session_db.add_all(created)
+    session_db.flush()
+
+    # Candidatos que ficaram para trás não podem mais formar padrão: descartar
+    stale_before = max(r.date for r in rows) - timedelta(days=100)
+    session_db.query(RecurringTransaction).filter(
+        RecurringTransaction.user_id == user_id,
+        RecurringTransaction.status == 'candidate',
+        RecurringTransaction.last_date < stale_before
+    ).delete(synchronize_session=False)
+
+    cursor.last_transaction_id = max(r.id for r in rows)
+    session_db.commit()
+    return len(rows)
+
+
+OPENFINANCE_SYNC_WORKERS = int(os.getenv("OPENFINANCE_SYNC_WORKERS", "4"))
+
+
+def to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Datetime em UTC sem tzinfo, como `Consent.expires_at` é gravado (naive = já em UTC)."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(UTC).replace(tzinfo=None)
+
+
+def consent_not_expired(now: Optional[datetime] = None):
+    """Filtro: consent sem prazo ou com `expires_at` no futuro (mesmo antes do sweep marcar expired)."""
+    return or_(Consent.expires_at.is_(None), Consent.expires_at > (now or to_naive_utc(datetime.now(UTC))))
+
+
+def active_consents(session_db, user_id: str, consent_id: Optional[str] = None) -> list:
+    """Consents ativos e não vencidos do usuário (opcionalmente só um)."""
+    query = session_db.query(Consent).filter(
+        Consent.user_id == user_id,
+        Consent.status == 'active',
+        Consent.deleted_at.is_(None),
+        consent_not_expired()
+    )
+    if consent_id:
+        query = query.filter(Consent.consent_id == consent_id)
+    return query.order_by(Consent.id).all()
+
+
+def _sync_error_code(error: Exception) -> str:
+    if isinstance(error, (CircuitOpenError, BudgetExhaustedError)):
+        return "provider_unavailable"
+    if isinstance(error, UnknownProviderError):
+        return "unknown_provider"
+    return "sync_failed"
+
+
+def fetch_from_consents(registry: ProviderRegistry, user_id: str, consents: list) -> tuple:
+    """Busca as transações de cada consent, em paralelo entre instituições.
+
+    Cada consent usa o provider da sua instituição (`Consent.provider`). Falha
+    de uma instituição não derruba as demais.
+
+    Returns:
+        (resultados como [(consent_id, provider, resultado de `provider.sync`)],
+        falhas como [(consent_id, provider, exceção)])
+    """
+    targets = [(c.consent_id, c.provider) for c in consents]  # fora da sessão: threads não tocam no ORM
+
+    def fetch(consent_id: str, provider_name: str) -> dict:
+        return registry.get(provider_name).sync(local_user_id=user_id, consent_id=consent_id)
+
+    results, failures = [], []
+
+    def collect(consent_id: str, provider_name: str, call) -> None:
+        try:
+            results.append((consent_id, provider_name, call()))
+        except Exception as e:
+            logger.error("Erro ao sincronizar consent", extra={"user_id": user_id, "error_code": _sync_error_code(e), "consent_id": consent_id, "error": str(e)})
+            failures.append((consent_id, provider_name, e))
+
+    if len(targets) == 1:
+        consent_id, provider_name = targets[0]
+        collect(consent_id, provider_name, lambda: fetch(consent_id, provider_name))
+        return results, failures
+
+    with ThreadPoolExecutor(max_workers=min(len(targets), OPENFINANCE_SYNC_WORKERS)) as pool:
+        # copy_context por tarefa: logs e spans das threads continuam ligados ao request
+        futures = [
+            (consent_id, provider_name, pool.submit(contextvars.copy_context().run, fetch, consent_id, provider_name))
+            for consent_id, provider_name in targets
+        ]
+        for consent_id, provider_name, future in futures:
+            collect(consent_id, provider_name, future.result)
+    return results, failures
+
+
+WEBHOOK_MAX_BATCH = int(os.getenv("WEBHOOK_MAX_BATCH", "500"))
+CONSENT_STATUS_EVENTS = {"consent.revoked": "revoked", "consent.expired": "expired"}
+SYNC_EVENTS = {"transaction.created", "account.updated"}  # disparam sync via fila
+
+
+def webhook_event_id(event: dict) -> Optional[str]:
+    """ID do evento informado pela instituição (`event_id`/`id`), ou None.
+
+    Sem ID não há como distinguir reenvio de um novo evento idêntico (ex.: dois
+    `transaction.created` seguidos), então esses eventos não são deduplicados;
+    a fila de sync já coalesce os pedidos por consent.
+    """
+    event_id = event.get("event_id") or event.get("id")
+    return str(event_id)[:128] if event_id else None
+
+
+def enqueue_syncs(session_db, consents: dict, reason: str, now: Optional[datetime] = None) -> int:
+    """Enfileira um SyncRequest por consent ({consent_id: user_id}), sem duplicar pendentes.
+
+    Não faz commit. Se outra transação enfileirar o mesmo consent entre a
+    consulta e o commit, o índice único parcial `uq_sync_request_pending_consent`
+    faz o commit falhar com IntegrityError (a rota do webhook refaz o lote).
+
+    Returns: quantidade enfileirada.
+    """
+    if not consents:
+        return 0
+    now = now or datetime.now()
+    pending = {row[0] for row in session_db.query(SyncRequest.consent_id).filter(
+        SyncRequest.status == 'pending',
+        SyncRequest.consent_id.in_(list(consents))
+    )}
+    rows = [
+        SyncRequest(user_id=user_id, consent_id=consent_id, reason=reason, status='pending', attempts=0,
+                    available_at=now, created_at=now)
+        for consent_id, user_id in consents.items() if consent_id not in pending
+    ]
+    session_db.add_all(rows)
+    return len(rows)
+
+
+def ingest_webhook_events(session_db, events: list) -> dict:
+    """Processa um lote de eventos de webhook com um commit.
+
+    - Descarta eventos com ID já visto (lookup pela PK de `webhook_events`) ou repetido no lote.
+    - Mudanças de status de consent: um UPDATE por status de destino (o último evento do lote,
+      na ordem de chegada, vence; com ou sem ID).
+    - Eventos de dados viram SyncRequest na fila, coalescidos por consent.
+
+    Returns:
+        Resumo com processed, duplicates, rejected (por índice), unknown_consents e queued.
+    """
+    now = datetime.now()
+    rejected, accepted, identified = [], [], set()
+    for index, event in enumerate(events):
+        if not isinstance(event, dict) or not event.get("event") or not event.get("consent_id"):
+            rejected.append({"index": index, "error": "missing_required_fields"})
+        elif event["event"] not in CONSENT_STATUS_EVENTS and event["event"] not in SYNC_EVENTS:
+            rejected.append({"index": index, "error": "unknown_event_type"})
+        else:
+            event_id = webhook_event_id(event)
+            if event_id is None or event_id not in identified:
+                if event_id is not None:
+                    identified.add(event_id)
+                accepted.append((event_id, event))
+    duplicates = len(events) - len(rejected) - len(accepted)
+
+    seen = {row[0] for row in session_db.query(WebhookEvent.event_id).filter(
+        WebhookEvent.event_id.in_(list(identified))
+    )} if identified else set()
+    # Mantém a ordem de chegada (eventos com e sem ID intercalados)
+    new = [(event_id, event) for event_id, event in accepted if event_id not in seen]
+    duplicates += len(accepted) - len(new)
+    new_events = [event for _, event in new]
+
+    consent_ids = {event["consent_id"] for event in new_events}
+    consents = {row.consent_id: row for row in session_db.query(
+        Consent.consent_id, Consent.user_id, Consent.status
+    ).filter(
+        Consent.consent_id.in_(consent_ids),
+        Consent.deleted_at.is_(None)
+    )} if consent_ids else {}
+
+    status_changes, to_sync = {}, {}
+    for event in new_events:
+        consent = consents.get(event["consent_id"])
+        if consent is None:
+            continue
+        if event["event"] in CONSENT_STATUS_EVENTS:
+            status_changes[consent.consent_id] = CONSENT_STATUS_EVENTS[event["event"]]
+        else:
+            to_sync[consent.consent_id] = consent.user_id
+    for status in set(status_changes.values()):
+        session_db.query(Consent).filter(
+            Consent.consent_id.in_([cid for cid, target in status_changes.items() if target == status]),
+            Consent.deleted_at.is_(None)
+        ).update({Consent.status: status}, synchronize_session=False)
+
+    # Só sincroniza consents que continuam ativos depois deste lote
+    queued = enqueue_syncs(session_db, {
+        cid: user_id for cid, user_id in to_sync.items()
+        if cid not in status_changes and consents[cid].status == 'active'
+    }, reason="webhook", now=now)
+    # Eventos de consent desconhecido não são gravados: um reenvio posterior ainda é processado
+    recorded = [
+        WebhookEvent(event_id=event_id, event_type=event["event"], consent_id=event["consent_id"], received_at=now)
+        for event_id, event in new if event_id is not None and event["consent_id"] in consents
+    ]
+    session_db.add_all(recorded)
+    session_db.commit()
+    return {
+        "received": len(events),
+        "processed": sum(1 for event in new_events if event["consent_id"] in consents),
+        "duplicates": duplicates,
+        "rejected": rejected,
+        "unknown_consents": sorted(consent_ids - set(consents)),
+        "status_changes": len(status_changes),
+        "queued": queued,
+    }
+
+
+def sync_open_finance(session_db, registry: ProviderRegistry, user_id: str, consents: list) -> dict:
+    """Sincroniza os consents do usuário e importa tudo em uma única passada de dedupe/insert.
+
+    Levanta a exceção da primeira falha se nenhuma instituição respondeu.
+    A validação é feita por consent: linhas inválidas (ex.: valor ausente ou
+    zero) são puladas e o consent entra em failed com `invalid_provider_data`
+    e os erros por índice; as linhas válidas e os demais consents são importados.
+
+    Returns:
+        Dict com inserted (Transaction), skipped, sources e failed.
+    """
+    results, failures = fetch_from_consents(registry, user_id, consents)
+    if not results:
+        # Erro "definitivo" tem precedência sobre indisponibilidade temporária
+        raise next((e for _, _, e in failures if _sync_error_code(e) != "provider_unavailable"), failures[0][2])
+    failed = [
+        {"consent_id": consent_id, "provider": provider_name, "error": _sync_error_code(e)}
+        for consent_id, provider_name, e in failures
+    ]
+    sources = sorted({r.get("source") for _, _, r in results})
+
+    # Validação por consent (erros por índice dentro do consent); inválidas ficam de fora
+    valid = []
+    for consent_id, provider_name, result in results:
+        rows, errors = validate_transactions(result["transactions"], user_id)
+        valid.extend(rows)
+        if errors:
+            logger.warning("Transações inválidas recebidas do provider", extra={"user_id": user_id, "error_code": "invalid_provider_data", "consent_id": consent_id, "invalid": len(errors)})
+            failed.append({"consent_id": consent_id, "provider": provider_name, "error": "invalid_provider_data", "errors": errors})
+
+    # Pré-carrega transações existentes do usuário para deduplicação (apenas não deletadas)
+    existing = session_db.query(
+        Transaction.date, Transaction.type, Transaction.amount, Transaction.description
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.deleted_at.is_(None)
+    ).all()
+    def fingerprint(d: dict) -> str:
+        return f"{d['date']}|{d['type']}|{d['amount']:.2f}|{d['description'].strip().lower()}"
+    existing_fp = {fingerprint({
+        'date': t.date.isoformat(),
+        'type': t.type,
+        'amount': t.amount,
+        'description': t.description
+    }) for t in existing}
+
+    inserted = []
+    skipped = 0
+    for data in valid:
+        fp = fingerprint(data)
+        if fp in existing_fp:
+            skipped += 1
+            continue
+        obj = Transaction(**data)
+        session_db.add(obj)
+        inserted.append(obj)
+        existing_fp.add(fp)
+    if inserted:
+        invalidate_suggestions(session_db, user_id)
+    session_db.commit()
+
+    # Detecção incremental de recorrências sobre as linhas novas
+    try:
+        detect_recurrences(session_db, user_id)
+    except Exception as e:
+        session_db.rollback()
+        logger.error("Erro na detecção de recorrências", extra={"user_id": user_id, "error": str(e)})
+
+    return {"inserted": inserted, "skipped": skipped, "sources": sources, "failed": failed}
 
 
 def create_app() -> Flask:
@@ -209,12 +819,17 @@ def create_app() -> Flask:
     CORS(app, supports_credentials=True, origins=["http://localhost:5000", "http://127.0.0.1:5000"])
 
     # Rate Limiting (CRITICAL: Previne brute force e DDoS)
+    # RATELIMIT_ENABLED=false apenas para load tests/benchmarks
+    app.config["RATELIMIT_ENABLED"] = os.getenv("RATELIMIT_ENABLED", "true").lower() == "true"
     limiter = Limiter(
         app=app,
         key_func=get_remote_address,
         default_limits=["200 per day", "50 per hour"],
         storage_uri="memory://"
     )
+    # Desabilitado, o Limiter não se registra em app.extensions e os decorators
+    # (que guardam só weakref) perderiam a instância: mantém a referência
+    app.extensions.setdefault("limiter", set()).add(limiter)
     
     # CSRF Protection (CRITICAL: Previne Cross-Site Request Forgery)
     csrf = CSRFProtect(app)
@@ -231,6 +846,30 @@ def create_app() -> Flask:
     def _permanent_session():
         session.permanent = True
 
+    @app.before_request
+    def _bind_log_context():
+        # Contexto por request (contextvars): seguro com workers gthread
+        g.request_id = tracing.clean_request_id(request.headers.get('X-Request-ID')) or uuid.uuid4().hex
+        user = session.get('user') or {}
+        g._log_context_token = bind_log_context(
+            request_id=g.request_id,
+            user_id=(request.view_args or {}).get('user_id') or user.get('id'),
+            endpoint=request.path,
+            method=request.method,
+        )
+
+    @app.after_request
+    def _echo_request_id(response):
+        if 'request_id' in g:
+            response.headers['X-Request-ID'] = g.request_id
+        return response
+
+    @app.teardown_request
+    def _reset_log_context(exc):
+        token = g.pop('_log_context_token', None)
+        if token is not None:
+            reset_log_context(token)
+
     # Endpoint para obter CSRF token (para chamadas AJAX)
     @app.route('/api/csrf-token', methods=['GET'])
     def get_csrf_token():
@@ -245,6 +884,15 @@ def create_app() -> Flask:
     except Exception as e:
         logger.error(f"Failed to create database tables: {e}")
         # App will still start, just without database
+
+    # Latência por rota e tempo de SQL por request (expostos em /metrics)
+    metrics.init_app(app, get_engine())
+    # Detector de N+1/queries lentas (opt-in: DB_PROFILING=true)
+    if db_profiler.ENABLED:
+        db_profiler.init_app(app, get_engine())
+    # Spans da request, SQL e provedores (opt-in: TRACE_EXPORT_PATH)
+    if tracing.ENABLED:
+        tracing.init_app(app, get_engine())
     
     # Configurar OAuth
     oauth = OAuth(app)
@@ -259,22 +907,9 @@ def create_app() -> Flask:
     else:
         google = None
 
-    # Inicializa provider Open Finance
-    # Se credenciais reais configuradas, usa OpenFinanceProvider; senão, usa simulado
-    use_real_openfinance = os.getenv("OPENFINANCE_ENABLE_REAL", "false").lower() == "true"
-    
-    if use_real_openfinance:
-        provider = OpenFinanceProvider(
-            base_url=os.getenv("OPENFINANCE_BASE_URL"),
-            client_id=os.getenv("OPENFINANCE_CLIENT_ID"),
-            client_secret=os.getenv("OPENFINANCE_CLIENT_SECRET"),
-            certificate_path=os.getenv("OPENFINANCE_CERT_PATH"),
-            private_key_path=os.getenv("OPENFINANCE_KEY_PATH")
-        )
-        logger.info("Open Finance real provider inicializado")
-    else:
-        provider = SimulatedProvider()
-        logger.info("Open Finance simulated provider inicializado (modo desenvolvimento)")
+    # Providers Open Finance por instituição (Consent.provider → provider configurado)
+    provider_registry = ProviderRegistry.from_env()
+    app.extensions["openfinance_providers"] = provider_registry
 
     # -------------------------------------------------------------------
     # Utilitários
@@ -351,6 +986,24 @@ def create_app() -> Flask:
             return fn(*args, **kwargs)
         return wrapper
 
+    def is_admin() -> bool:
+        if app.config.get('TESTING'):
+            return True
+        user = session.get('user')
+        return bool(user) and user.get('id') in ADMIN_USER_IDS
+
+    def require_admin(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not is_admin():
+                return jsonify({"error": "forbidden", "details": "Acesso restrito a administradores"}), 403
+            return fn(*args, **kwargs)
+        return wrapper
+
+    # Profiling sob demanda (opt-in: PROFILING_ENABLED=true)
+    if profiling.ENABLED:
+        profiling.init_app(app, is_admin)
+
     # -------------------------------------------------------------------
     # Exceções customizadas
     # -------------------------------------------------------------------
@@ -386,6 +1039,37 @@ def create_app() -> Flask:
     def health():
         return jsonify({"status": "ok"})
 
+    @app.route("/metrics")
+    @csrf.exempt  # GET não requer CSRF
+    @limiter.exempt  # scrapes periódicos não devem consumir o limite padrão
+    def metrics_endpoint():
+        """Métricas no formato texto do Prometheus (agregadas entre workers)."""
+        if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+            return jsonify({"error": "unauthorized"}), 401
+        return metrics.REGISTRY.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+    # -------------------------------------------------------------------
+    # Admin: perfis de requests (ring buffer em memória, por processo)
+    # -------------------------------------------------------------------
+    @app.route("/api/admin/profiles", methods=["GET"])
+    @require_admin
+    @csrf.exempt  # GET não requer CSRF
+    def list_profiles():
+        try:
+            limit = int(request.args.get("limit", profiling.BUFFER_SIZE))
+        except ValueError:
+            raise BadRequest({"limit": ["Deve ser um inteiro"]})
+        return jsonify({"enabled": profiling.ENABLED, "items": profiling.recent(max(limit, 1))}), 200
+
+    @app.route("/api/admin/profiles/<int:profile_id>", methods=["GET"])
+    @require_admin
+    @csrf.exempt  # GET não requer CSRF
+    def get_profile(profile_id: int):
+        entry = profiling.get(profile_id)
+        if entry is None:
+            raise NotFound("Perfil não encontrado (buffer é por processo e limitado)")
+        return jsonify(entry), 200
+
     @app.route("/")
     @require_auth
     @csrf.exempt  # GET não requer CSRF
@@ -504,7 +1188,8 @@ def create_app() -> Flask:
             provider=payload.get('provider', ''),
             scopes=payload.get('scopes', ''),
             status=payload.get('status', ''),
-            created_at=datetime.now(UTC)
+            created_at=datetime.now(UTC),
+            expires_at=to_naive_utc(data.get('expires_at'))
         )
         session_db.add(obj)
         session_db.commit()
@@ -515,7 +1200,7 @@ def create_app() -> Flask:
     @csrf.exempt  # GET não requer CSRF
     def list_consents(user_id: str):
         session_db = get_session()
-        query = session_db.query(Consent).filter(
+        query = consent_rows.query(session_db).filter(
             Consent.user_id == user_id,
             Consent.deleted_at.is_(None)
         ).order_by(Consent.created_at.desc())
@@ -528,8 +1213,8 @@ def create_app() -> Flask:
         paginated = paginate_query(query, page, per_page)
         
         # Retornar com metadados de paginação
-        return jsonify({
-            "items": consents_schema.dump(paginated["items"]),
+        return json_response({
+            "items": consent_rows.dump(paginated["items"]),
             "pagination": {
                 "current_page": paginated["current_page"],
                 "per_page": paginated["per_page"],
@@ -547,7 +1232,7 @@ def create_app() -> Flask:
     def list_transactions(user_id: str):
         # Query base - filtrar apenas registros não deletados
         session = get_session()
-        query = session.query(Transaction).filter(
+        query = transaction_rows.query(session).filter(
             Transaction.user_id == user_id,
             Transaction.deleted_at.is_(None)
         ).order_by(Transaction.date.desc())
@@ -560,8 +1245,8 @@ def create_app() -> Flask:
         paginated = paginate_query(query, page, per_page)
         
         # Retornar com metadados de paginação
-        return jsonify({
-            "items": transactions_schema.dump(paginated["items"]),
+        return json_response({
+            "items": transaction_rows.dump(paginated["items"]),
             "pagination": {
                 "current_page": paginated["current_page"],
                 "per_page": paginated["per_page"],
@@ -590,6 +1275,7 @@ def create_app() -> Flask:
             date=datetime.strptime(payload.get('date', ''), '%Y-%m-%d').date() if payload.get('date') else today_date()
         )
         session.add(txn)
+        invalidate_suggestions(session, user_id)
         session.commit()
         return jsonify(transaction_schema.dump(txn)), 201
 
@@ -628,6 +1314,7 @@ def create_app() -> Flask:
                     setattr(txn, field, payload[field])
                 else:
                     setattr(txn, field, payload[field])
+        invalidate_suggestions(session, user_id)
         session.commit()
         return jsonify(transaction_schema.dump(txn))
 
@@ -645,6 +1332,7 @@ def create_app() -> Flask:
             raise NotFound("Transação não encontrada")
         # Soft delete: set deleted_at timestamp
         txn.deleted_at = datetime.now(UTC)
+        invalidate_suggestions(session, user_id)
         session.commit()
         return jsonify({"deleted": txn_id})
 
@@ -659,179 +1347,76 @@ def create_app() -> Flask:
         """
         Retorna sugestões personalizadas baseadas no histórico financeiro do usuário.
         Analisa padrões de gastos e oferece recomendações de economia.
+
+        Query params:
+            period: 7d | 30d (padrão) | 90d | ytd
         """
+        period = request.args.get('period', suggestions_engine.DEFAULT_PERIOD)
+        if period not in suggestions_engine.PERIODS:
+            raise BadRequest({"period": [f"Deve ser um de: {', '.join(suggestions_engine.PERIODS)}"]})
         session_db = get_session()
+        today = today_date()
+
+        # Sugestões pré-computadas pelo job em lote (jobs.py suggestions), se frescas
+        if period == suggestions_engine.DEFAULT_PERIOD:
+            cached = session_db.get(UserSuggestion, user_id)
+            if cached is not None and is_suggestion_fresh(cached, today):
+                session_db.close()
+                return jsonify(json.loads(cached.payload))
         
-        # Buscar transações dos últimos 30 dias
-        thirty_days_ago = today_date() - timedelta(days=30)
-        recent_txns = session_db.query(Transaction).filter(
-            Transaction.user_id == user_id,
-            Transaction.deleted_at.is_(None),
-            Transaction.date >= thirty_days_ago
-        ).all()
-        
-        suggestions = []
-        
-        if not recent_txns:
-            suggestions.append({
-                "type": "info",
-                "category": "getting_started",
-                "title": "Comece a registrar suas transações",
-                "description": "Adicione suas receitas e despesas para receber sugestões personalizadas",
-                "priority": "high",
-                "icon": "📊"
-            })
-            return jsonify({"suggestions": suggestions})
-        
-        # Calcular estatísticas
-        total_income = sum(float(t.amount) for t in recent_txns if t.type == "income")
-        total_expense = sum(float(t.amount) for t in recent_txns if t.type == "expense")
-        balance = total_income - total_expense
-        
-        # Análise por descrição (categorias informais)
-        expense_categories = {}
-        for txn in recent_txns:
-            if txn.type == "expense":
-                desc = txn.description.lower()
-                # Categorizar por palavras-chave
-                if any(word in desc for word in ['restaurante', 'ifood', 'uber eats', 'almoço', 'jantar', 'lanche']):
-                    category = 'alimentacao'
-                elif any(word in desc for word in ['uber', 'taxi', '99', 'gasolina', 'combustível']):
-                    category = 'transporte'
-                elif any(word in desc for word in ['netflix', 'spotify', 'amazon', 'assinatura', 'streaming']):
-                    category = 'assinaturas'
-                elif any(word in desc for word in ['supermercado', 'mercado', 'compras']):
-                    category = 'supermercado'
-                elif any(word in desc for word in ['energia', 'água', 'internet', 'celular', 'conta']):
-                    category = 'contas'
-                else:
-                    category = 'outros'
-                
-                expense_categories[category] = expense_categories.get(category, 0) + float(txn.amount)
-        
-        # SUGESTÃO 1: Saldo negativo
-        if balance < 0:
-            suggestions.append({
-                "type": "alert",
-                "category": "budget",
-                "title": "Gastos acima das receitas",
-                "description": f"Você gastou R$ {abs(balance):.2f} a mais do que recebeu nos últimos 30 dias. Considere revisar seus gastos.",
-                "priority": "high",
-                "icon": "⚠️",
-                "action": {
-                    "label": "Ver despesas",
-                    "endpoint": f"/api/users/{user_id}/transactions?type=expense"
-                }
-            })
-        
-        # SUGESTÃO 2: Gastos com alimentação elevados
-        if 'alimentacao' in expense_categories:
-            food_expense = expense_categories['alimentacao']
-            if total_income > 0:
-                food_percentage = (food_expense / total_income) * 100
-                if food_percentage > 30:
-                    suggestions.append({
-                        "type": "tip",
-                        "category": "savings",
-                        "title": "Gastos com alimentação elevados",
-                        "description": f"Você gastou R$ {food_expense:.2f} ({food_percentage:.1f}% da sua receita) com alimentação. Considere cozinhar mais em casa.",
-                        "priority": "medium",
-                        "icon": "🍔",
-                        "potential_savings": food_expense * 0.3  # Economia de 30%
-                    })
-        
-        # SUGESTÃO 3: Muitas assinaturas
-        if 'assinaturas' in expense_categories:
-            subscription_expense = expense_categories['assinaturas']
-            suggestions.append({
-                "type": "tip",
-                "category": "subscriptions",
-                "title": "Revise suas assinaturas",
-                "description": f"Você tem R$ {subscription_expense:.2f} em assinaturas. Cancele serviços que não usa.",
-                "priority": "low",
-                "icon": "📺",
-                "potential_savings": subscription_expense * 0.5
-            })
-        
-        # SUGESTÃO 4: Gastos com transporte
-        if 'transporte' in expense_categories:
-            transport_expense = expense_categories['transporte']
-            if transport_expense > 500:
-                suggestions.append({
-                    "type": "tip",
-                    "category": "transport",
-                    "title": "Considere alternativas de transporte",
-                    "description": f"Você gastou R$ {transport_expense:.2f} com transporte. Avalie transporte público ou carona compartilhada.",
-                    "priority": "medium",
-                    "icon": "🚗"
-                })
-        
-        # SUGESTÃO 5: Poucas receitas
-        if len([t for t in recent_txns if t.type == "income"]) < 2:
-            suggestions.append({
-                "type": "info",
-                "category": "income",
-                "title": "Diversifique suas fontes de renda",
-                "description": "Considere buscar fontes alternativas de renda como freelancing ou investimentos.",
-                "priority": "low",
-                "icon": "💰"
-            })
-        
-        # SUGESTÃO 6: Meta de economia (Regra 50-30-20)
-        if total_income > 0:
-            recommended_savings = total_income * 0.20  # 20% da receita
-            actual_savings = balance
-            if actual_savings < recommended_savings:
-                suggestions.append({
-                    "type": "goal",
-                    "category": "savings",
-                    "title": "Meta de economia mensal",
-                    "description": f"Tente economizar 20% da sua receita (R$ {recommended_savings:.2f}). Você está economizando R$ {actual_savings:.2f}.",
-                    "priority": "medium",
-                    "icon": "🎯",
-                    "progress": (actual_savings / recommended_savings * 100) if recommended_savings > 0 else 0
-                })
-        
-        # SUGESTÃO 7: Categoria com maior gasto
-        if expense_categories:
-            max_category = max(expense_categories.items(), key=lambda x: x[1])
-            category_name_map = {
-                'alimentacao': 'Alimentação',
-                'transporte': 'Transporte',
-                'assinaturas': 'Assinaturas',
-                'supermercado': 'Supermercado',
-                'contas': 'Contas Fixas',
-                'outros': 'Outros'
-            }
-            suggestions.append({
-                "type": "insight",
-                "category": "spending_pattern",
-                "title": f"Maior gasto: {category_name_map.get(max_category[0], 'Outros')}",
-                "description": f"Sua categoria com mais gastos é {category_name_map.get(max_category[0], 'Outros')}: R$ {max_category[1]:.2f}",
-                "priority": "low",
-                "icon": "📈"
-            })
-        
-        # Ordenar por prioridade
-        priority_order = {"high": 0, "medium": 1, "low": 2}
-        suggestions.sort(key=lambda x: priority_order.get(x.get("priority", "low"), 2))
-        
+        # Totais do período e comparação mês a mês: um GROUP BY cada
+        start, end = suggestions_engine.period_range(period, today)
+        aggregates = query_category_totals(session_db, user_id, start)
+        comparison = query_month_over_month(session_db, user_id, today)
+        recurring_expenses = [
+            p for p in session_db.query(RecurringTransaction).filter(
+                RecurringTransaction.user_id == user_id,
+                RecurringTransaction.status == 'active',
+                RecurringTransaction.type == 'expense'
+            ).all()
+            if recurrence.is_current(p, today)
+        ]
+        result = suggestions_engine.build_suggestions(
+            user_id, aggregates, recurring_expenses, start, end, period, comparison
+        )
         session_db.close()
-        
-        return jsonify({
-            "suggestions": suggestions,
-            "period": {
-                "start": thirty_days_ago.isoformat(),
-                "end": today_date().isoformat(),
-                "days": 30
-            },
-            "summary": {
-                "total_income": round(total_income, 2),
-                "total_expense": round(total_expense, 2),
-                "balance": round(balance, 2),
-                "transactions_count": len(recent_txns)
+        return jsonify(result)
+
+    # -------------------------------------------------------------------
+    # Recorrências detectadas e previsão
+    # -------------------------------------------------------------------
+    @app.route("/api/users/<user_id>/recurrences", methods=["GET"])
+    @require_auth
+    @csrf.exempt  # GET não requer CSRF
+    @limiter.limit("50 per hour")
+    def list_recurrences(user_id: str):
+        """
+        Lista recorrências vigentes (assinaturas, salários, contas fixas) e
+        projeta as próximas ocorrências para os próximos `days` dias (padrão 30).
+        """
+        days = max(1, min(365, request.args.get('days', 30, type=int)))
+        session_db = get_session()
+        today = today_date()
+        patterns = [
+            p for p in session_db.query(RecurringTransaction).filter(
+                RecurringTransaction.user_id == user_id,
+                RecurringTransaction.status == 'active'
+            ).order_by(RecurringTransaction.next_date).all()
+            if recurrence.is_current(p, today)
+        ]
+        upcoming = recurrence.forecast(patterns, today, today + timedelta(days=days))
+        result = {
+            "items": recurring_transactions_schema.dump(patterns),
+            "forecast": {
+                "start": today.isoformat(),
+                "end": (today + timedelta(days=days)).isoformat(),
+                "income": round(sum(o["amount"] for o in upcoming if o["type"] == "income"), 2),
+                "expense": round(sum(o["amount"] for o in upcoming if o["type"] == "expense"), 2),
+                "occurrences": upcoming
             }
-        })
+        }
+        session_db.close()
+        return jsonify(result)
 
     # -------------------------------------------------------------------
     # Installments CRUD
@@ -841,10 +1426,14 @@ def create_app() -> Flask:
     @csrf.exempt  # GET não requer CSRF
     def list_installments(user_id: str):
         session = get_session()
-        query = session.query(Installment).filter(
+        query = installment_rows.query(session).filter(
             Installment.user_id == user_id,
             Installment.deleted_at.is_(None)
-        ).order_by(Installment.date_added.desc())
+        )
+        # ?active=true: apenas parcelamentos em curso (filtrado em SQL via end_date)
+        if request.args.get('active', 'false').lower() == 'true':
+            query = query.filter(active_installments_filter(today_date()))
+        query = query.order_by(Installment.date_added.desc())
         
         # Parâmetros de paginação
         page = request.args.get('page', 1, type=int)
@@ -854,8 +1443,8 @@ def create_app() -> Flask:
         paginated = paginate_query(query, page, per_page)
         
         # Retornar com metadados de paginação
-        return jsonify({
-            "items": installments_schema.dump(paginated["items"]),
+        return json_response({
+            "items": installment_rows.dump(paginated["items"]),
             "pagination": {
                 "current_page": paginated["current_page"],
                 "per_page": paginated["per_page"],
@@ -875,6 +1464,7 @@ def create_app() -> Flask:
         data = parse_json(installment_schema, payload)
         session = get_session()
         inst = Installment(**data)
+        inst.end_date = installment_end_date(inst.date_added, inst.total_months)
         session.add(inst)
         session.commit()
         return jsonify(installment_schema.dump(inst)), 201
@@ -917,6 +1507,7 @@ def create_app() -> Flask:
                         raise BadRequest({field: ["Formato deve ser YYYY-MM-DD"]})
                 else:
                     setattr(inst, field, payload[field])
+        inst.end_date = installment_end_date(inst.date_added, inst.total_months)
         session.commit()
         return jsonify(installment_schema.dump(inst))
 
@@ -944,35 +1535,9 @@ def create_app() -> Flask:
     @require_auth
     @csrf.exempt  # GET não requer CSRF
     def summary(user_id: str):
-        session = get_session()
-        # Filtrar apenas registros não deletados
-        txns = session.query(Transaction).filter(
-            Transaction.user_id == user_id,
-            Transaction.deleted_at.is_(None)
-        ).all()
-        insts = session.query(Installment).filter(
-            Installment.user_id == user_id,
-            Installment.deleted_at.is_(None)
-        ).all()
-        # Calcular somas iterando sobre objetos ORM
-        income = 0.0
-        expenses_avulsa = 0.0
-        for t in txns:
-            amt = float(t.amount) if t.amount else 0.0
-            if t.type and t.type == "income":
-                income += amt
-            elif t.type and t.type == "expense":
-                expenses_avulsa += amt
-        expenses_parcelas = sum(float(i.monthly_value) if i.monthly_value else 0.0 for i in insts) if insts else 0.0
-        expenses_total = float(expenses_avulsa) + float(expenses_parcelas)
-        balance = float(income) - float(expenses_total)
-        return jsonify({
-            "income": round(income, 2),
-            "expenses_avulsa": round(expenses_avulsa, 2),
-            "expenses_parcelas": round(expenses_parcelas, 2),
-            "expenses_total": round(expenses_total, 2),
-            "balance": round(balance, 2)
-        })
+        # ?active=true: soma apenas parcelas de planos em curso (filtrado em SQL)
+        active_only = request.args.get('active', 'false').lower() == 'true'
+        return jsonify(user_summary(get_session(), user_id, today_date() if active_only else None))
 
     # -------------------------------------------------------------------
     # Importação simulada (Open Finance)
@@ -988,12 +1553,12 @@ def create_app() -> Flask:
             {"description": "Restaurante - Almoço", "amount": 45.50, "type": "expense", "date": hoje_str},
             {"description": "Assinatura Netflix", "amount": 39.90, "type": "expense", "date": hoje_str},
         ]
-        created = []
-        for item in simulated:
-            data = parse_json(transaction_schema, {**item, "user_id": user_id})
-            txn = Transaction(**data)
-            session.add(txn)
-            created.append(txn)
+        valid, errors = validate_transactions(simulated, user_id)
+        if errors:
+            raise BadRequest({"transactions": errors})
+        created = [Transaction(**data) for data in valid]
+        session.add_all(created)
+        invalidate_suggestions(session, user_id)
         session.commit()
         return jsonify({
             "status": "success",
@@ -1009,70 +1574,42 @@ def create_app() -> Flask:
     @csrf.exempt  # Desabilitado para desenvolvimento
     @limiter.limit("10 per hour")  # IMPORTANT: Limita sync para economizar banda
     def open_finance_sync(user_id: str):
-        """Sincroniza transações via Open Finance."""
+        """Sincroniza transações de todos os consents ativos (ou só `?consent_id=`)."""
         start_time = time.time()
         session_db = get_session()
         
         # Validar consent ativo
-        active_consent = session_db.query(Consent).filter(
-            Consent.user_id == user_id,
-            Consent.status == 'active',
-            Consent.deleted_at.is_(None)
-        ).first()
+        consents = active_consents(session_db, user_id, request.args.get("consent_id"))
         
-        if not active_consent:
+        if not consents:
             logger.warning("Tentativa de sync sem consent ativo", extra={"user_id": user_id, "endpoint": "/openfinance/sync", "error_code": "no_active_consent"})
             return jsonify({"error": "no_active_consent", "details": "Nenhum consent ativo encontrado para este usuário."}), 400
         
-        logger.info("Sincronização Open Finance iniciada", extra={"user_id": user_id, "endpoint": "/openfinance/sync", "consent_id": active_consent.consent_id})
+        logger.info("Sincronização Open Finance iniciada", extra={"user_id": user_id, "endpoint": "/openfinance/sync", "consents": len(consents)})
         
-        # Usa provider para sincronizar
-        # Provider real requer consent_id; provider simulado ignora
+        # Fan-out entre instituições; uma única passada de dedupe/insert
         try:
-            if isinstance(provider, OpenFinanceProvider):
-                result = provider.sync(local_user_id=user_id, consent_id=active_consent.consent_id)
-            else:
-                # SimulatedProvider usa assinatura antiga (sem consent_id)
-                result = provider.sync(local_user_id=user_id)
+            result = sync_open_finance(session_db, provider_registry, user_id, consents)
+        except (CircuitOpenError, BudgetExhaustedError) as e:
+            logger.warning("Instituição indisponível (circuito aberto ou cota esgotada)", extra={"user_id": user_id, "endpoint": "/openfinance/sync", "error_code": "provider_unavailable"})
+            response = jsonify({"error": "provider_unavailable", "details": str(e)})
+            response.headers["Retry-After"] = str(max(1, math.ceil(e.retry_after)))
+            return response, 503
         except Exception as e:
+            session_db.rollback()
             logger.error("Erro na sincronização Open Finance", extra={"user_id": user_id, "error": str(e)})
             return jsonify({"error": "sync_failed", "details": str(e)}), 500
         
-        inserted = []
-        skipped = 0
-
-        # Pré-carrega transações existentes do usuário para deduplicação (apenas não deletadas)
-        existing = session_db.query(Transaction).filter(
-            Transaction.user_id == user_id,
-            Transaction.deleted_at.is_(None)
-        ).all()
-        def fingerprint(d: dict) -> str:
-            return f"{d['date']}|{d['type']}|{d['amount']:.2f}|{d['description'].strip().lower()}"
-        existing_fp = {fingerprint({
-            'date': t.date.isoformat(),
-            'type': t.type,
-            'amount': t.amount,
-            'description': t.description
-        }) for t in existing}
-
-        for tx in result["transactions"]:
-            fp = fingerprint(tx)
-            if fp in existing_fp:
-                skipped += 1
-                continue
-            data = parse_json(transaction_schema, {**tx, "user_id": user_id})
-            obj = Transaction(**data)
-            session_db.add(obj)
-            inserted.append(obj)
-            existing_fp.add(fp)
-        session_db.commit()
+        inserted = result["inserted"]
         duration_ms = (time.time() - start_time) * 1000
-        logger.info("Sincronização Open Finance concluída", extra={"user_id": user_id, "endpoint": "/openfinance/sync", "imported": len(inserted), "skipped": skipped, "duration_ms": round(duration_ms, 2)})
+        logger.info("Sincronização Open Finance concluída", extra={"user_id": user_id, "endpoint": "/openfinance/sync", "imported": len(inserted), "skipped": result["skipped"], "duration_ms": round(duration_ms, 2)})
         return jsonify({
             "status": "success",
-            "source": result.get("source"),
+            "source": ", ".join(result["sources"]),
+            "sources": result["sources"],
             "imported": len(inserted),
-            "skipped_duplicates": skipped,
+            "skipped_duplicates": result["skipped"],
+            "failed": result["failed"],
             "transactions": transactions_schema.dump(inserted),
         }), 201
 
@@ -1091,7 +1628,7 @@ def create_app() -> Flask:
         asset_type_filter = request.args.get('asset_type')
         
         session_db = get_session()
-        query = session_db.query(Investment).filter(
+        query = investment_rows.query(session_db).filter(
             Investment.user_id == user_id,
             Investment.deleted_at.is_(None)
         )
@@ -1105,8 +1642,8 @@ def create_app() -> Flask:
         paginated = paginate_query(query, page, per_page)
         session_db.close()
         
-        return jsonify({
-            "items": investments_schema.dump(paginated["items"]),
+        return json_response({
+            "items": investment_rows.dump(paginated["items"]),
             "pagination": {
                 "total": paginated["total"],
                 "pages": paginated["pages"],
@@ -1504,6 +2041,9 @@ def create_app() -> Flask:
         - consent.expired: Consentimento expirou
         - transaction.created: Nova transação disponível
         - account.updated: Dados da conta foram atualizados
+        
+        Aceita um evento, uma lista ou {"events": [...]}; reenvios (mesmo event_id)
+        são ignorados e eventos de dados enfileiram um sync (`jobs.py sync-queue`).
         """
         start_time = time.time()
         
@@ -1517,7 +2057,6 @@ def create_app() -> Flask:
             
             # Verificar assinatura HMAC
             import hmac
-            import hashlib
             expected_signature = hmac.new(
                 webhook_secret.encode(),
                 request.get_data(),
@@ -1528,98 +2067,53 @@ def create_app() -> Flask:
                 logger.warning("Webhook com assinatura inválida", extra={"endpoint": "/openfinance/webhook"})
                 return jsonify({"error": "invalid_signature"}), 401
         
+        payload = request.get_json(silent=True)
+        # Aceita um evento, uma lista de eventos ou {"events": [...]}
+        single = isinstance(payload, dict) and "events" not in payload
+        events = [payload] if single else (payload.get("events") if isinstance(payload, dict) else payload)
+        if not payload or not isinstance(events, list):
+            return jsonify({"error": "invalid_payload"}), 400
+        if len(events) > WEBHOOK_MAX_BATCH:
+            return jsonify({"error": "batch_too_large", "details": f"Máximo de {WEBHOOK_MAX_BATCH} eventos por request."}), 413
+        
+        session_db = get_session()
         try:
-            payload = request.get_json()
-            if not payload:
-                return jsonify({"error": "invalid_payload"}), 400
-            
-            event_type = payload.get("event")
-            consent_id = payload.get("consent_id")
-            event_data = payload.get("data", {})
-            
-            if not event_type or not consent_id:
-                return jsonify({"error": "missing_required_fields"}), 400
-            
-            logger.info(f"Webhook recebido: {event_type}", extra={
-                "endpoint": "/openfinance/webhook",
-                "event": event_type,
-                "consent_id": consent_id
-            })
-            
-            # Usar sessão do banco
-            db = SessionLocal()
             try:
-                # Buscar consentimento
-                consent = db.query(Consent).filter(
-                    Consent.consent_id == consent_id,
-                    Consent.deleted_at.is_(None)
-            ).first()
-            
-                if not consent:
-                    logger.warning("Webhook para consent desconhecido", extra={
-                        "consent_id": consent_id,
-                        "event": event_type
-                    })
-                    return jsonify({"error": "consent_not_found"}), 404
-                
-                # Processar evento
-                if event_type == "consent.revoked":
-                    consent.status = "revoked"
-                    db.commit()
-                    logger.info("Consentimento revogado via webhook", extra={
-                        "consent_id": consent_id,
-                        "user_id": consent.user_id
-                    })
-                    
-                elif event_type == "consent.expired":
-                    consent.status = "expired"
-                    db.commit()
-                    logger.info("Consentimento expirado via webhook", extra={
-                        "consent_id": consent_id,
-                        "user_id": consent.user_id
-                    })
-                    
-                elif event_type == "transaction.created":
-                    # Disparar sincronização automática em background (opcional)
-                    # Por enquanto, apenas logar o evento
-                    logger.info("Nova transação disponível", extra={
-                        "consent_id": consent_id,
-                        "user_id": consent.user_id,
-                        "transaction_count": event_data.get("count", 1)
-                    })
-                    # TODO: Implementar sincronização automática em background task
-                    
-                elif event_type == "account.updated":
-                    logger.info("Conta atualizada", extra={
-                        "consent_id": consent_id,
-                        "user_id": consent.user_id
-                    })
-                    # TODO: Atualizar informações da conta
-                    
-                else:
-                    logger.warning("Evento desconhecido", extra={
-                        "event": event_type,
-                        "consent_id": consent_id
-                    })
-                    return jsonify({"error": "unknown_event_type"}), 400
-                
-                duration_ms = (time.time() - start_time) * 1000
-                logger.info("Webhook processado com sucesso", extra={
-                    "endpoint": "/openfinance/webhook",
-                    "event": event_type,
-                    "duration_ms": round(duration_ms, 2)
-                })
-                
-                return jsonify({"status": "processed", "event": event_type}), 200
-            finally:
-                db.close()
-                
+                result = ingest_webhook_events(session_db, events)
+            except IntegrityError:
+                # Reenvio concorrente gravou o mesmo event_id: refaz o lote (agora como duplicado)
+                session_db.rollback()
+                result = ingest_webhook_events(session_db, events)
         except Exception as e:
+            session_db.rollback()
             logger.error("Erro ao processar webhook", extra={
                 "endpoint": "/openfinance/webhook",
                 "error": str(e)
             })
             return jsonify({"error": "webhook_processing_failed", "details": str(e)}), 500
+        finally:
+            session_db.close()
+        
+        duration_ms = (time.time() - start_time) * 1000
+        logger.info("Webhook processado com sucesso", extra={
+            "endpoint": "/openfinance/webhook",
+            "received": result["received"],
+            "processed": result["processed"],
+            "duplicates": result["duplicates"],
+            "queued": result["queued"],
+            "duration_ms": round(duration_ms, 2)
+        })
+        
+        if single:
+            # Compatibilidade com o contrato de um evento por request
+            if result["rejected"]:
+                return jsonify({"error": result["rejected"][0]["error"]}), 400
+            if result["unknown_consents"]:
+                logger.warning("Webhook para consent desconhecido", extra={"endpoint": "/openfinance/webhook", "error_code": "consent_not_found"})
+                return jsonify({"error": "consent_not_found"}), 404
+            status = "duplicate" if result["duplicates"] else "processed"
+            return jsonify({"status": status, "event": payload.get("event"), "queued": result["queued"]}), 200
+        return jsonify({"status": "processed", **result}), 200
 
     return app
 
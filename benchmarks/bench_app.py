@@ -0,0 +1,16 @@
+"""Entry point WSGI para load tests (gunicorn benchmarks.bench_app:app).
+
+Reaproveita a app de `backend` em modo de teste: sem autenticação de sessão
+e sem CSRF, para que o driver de carga chame os endpoints diretamente.
+Rate limiting é controlado por `RATELIMIT_ENABLED` (o load test define false).
+NUNCA usar em produção.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import app  # noqa: E402
+
+app.config["TESTING"] = True
+app.config["WTF_CSRF_ENABLED"] = False
@@ -0,0 +1,230 @@
+"""Benchmark antes/depois dos índices parciais (deleted_at IS NULL) e do summary em SQL.
+
+Uso:
+    python benchmarks/bench_live_indexes.py [--users 200] [--transactions 500]
+        [--installments 20] [--deleted-ratio 0.3] [--sample 50] [--repeat 3] [--output relatorio.json]
+
+Popula a base com N usuários, uma fração das linhas com soft delete, e mede
+para uma amostra de usuários:
+
+- before: índices completos (user_id, date) + deleted_at, summary carregando as
+  linhas no ORM e somando em Python (implementação anterior)
+- sql_full_indexes: índices completos + `backend.user_summary` (isola o ganho do SUM)
+- after:  índices parciais de cobertura + `backend.user_summary` (SUM no banco)
+
+Queries medidas: summary, summary ?active=true, listagem paginada de
+transações e lista de consents ativos. O relatório traz o plano de execução da
+soma de transações e confere se os totais dos cenários são iguais.
+
+Por padrão usa um SQLite temporário; para Postgres, defina GF_DB_URL (as
+tabelas da base apontada são recriadas).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+_TMP_DB = None
+if not os.getenv("GF_DB_URL") and not os.getenv("DATABASE_URL"):
+    _fd, _TMP_DB = tempfile.mkstemp(prefix="gf_live_idx_", suffix=".db")
+    os.close(_fd)
+    os.environ["GF_DB_URL"] = f"sqlite:///{_TMP_DB}"
+
+from sqlalchemy import Index, insert, text  # noqa: E402
+
+import backend  # noqa: E402
+from backend import Consent, Installment, Investment, Transaction  # noqa: E402
+
+# Índices anteriores à migração a4d7e2b81c35 (congelados aqui)
+FULL_INDEXES = [
+    Index('idx_transaction_user_date', Transaction.user_id, Transaction.date),
+    Index('idx_transaction_deleted_at', Transaction.deleted_at),
+    Index('idx_installment_user_date', Installment.user_id, Installment.date_added),
+    Index('idx_installment_user_end_date', Installment.user_id, Installment.end_date),
+    Index('idx_installment_deleted_at', Installment.deleted_at),
+    Index('idx_consent_user_status', Consent.user_id, Consent.status),
+    Index('idx_consent_deleted_at', Consent.deleted_at),
+]
+LIVE_INDEX_NAMES = {'idx_transaction_live_user_date', 'idx_installment_live_user_date',
+                    'idx_installment_live_user_end_date', 'idx_consent_live_user_status'}
+
+
+def live_indexes() -> list:
+    return [index for model in (Transaction, Installment, Consent)
+            for index in model.__table__.indexes if index.name in LIVE_INDEX_NAMES]
+
+
+def seed(engine, users: int, transactions: int, installments: int, deleted_ratio: float) -> None:
+    backend.Base.metadata.drop_all(engine, tables=[t.__table__ for t in (Transaction, Installment, Consent, Investment)])
+    backend.Base.metadata.create_all(engine, tables=[t.__table__ for t in (Transaction, Installment, Consent, Investment)])
+    rng = random.Random(42)
+    today = date.today()
+    deleted_at = datetime.now()
+
+    def maybe_deleted():
+        return deleted_at if rng.random() < deleted_ratio else None
+
+    with engine.begin() as conn:
+        for u in range(users):
+            user_id = f"user{u:05d}"
+            conn.execute(insert(Transaction), [{
+                "user_id": user_id, "description": f"Transação {i}",
+                "amount": round(rng.uniform(5, 500), 2), "type": "income" if i % 5 == 0 else "expense",
+                "date": today - timedelta(days=rng.randrange(730)), "deleted_at": maybe_deleted(),
+            } for i in range(transactions)])
+            rows = []
+            for i in range(installments):
+                added = today - timedelta(days=rng.randrange(720))
+                months = rng.randint(2, 24)
+                rows.append({
+                    "user_id": user_id, "description": f"Parcelamento {i}", "monthly_value": round(rng.uniform(20, 400), 2),
+                    "total_months": months, "date_added": added,
+                    "end_date": backend.installment_end_date(added, months), "deleted_at": maybe_deleted(),
+                })
+            conn.execute(insert(Installment), rows)
+            conn.execute(insert(Consent), [{
+                "user_id": user_id, "consent_id": f"{user_id}-c{i}", "provider": "simulated", "scopes": "x",
+                "status": "active" if i % 2 == 0 else "revoked", "created_at": deleted_at, "deleted_at": maybe_deleted(),
+            } for i in range(4)])
+
+
+def use_indexes(engine, create: list, drop: list) -> None:
+    for index in drop:
+        index.drop(engine, checkfirst=True)
+    for index in create:
+        index.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def legacy_summary(session_db, user_id: str, active_on=None) -> dict:
+    """Summary anterior: carrega as linhas no ORM e soma em Python."""
+    txns = session_db.query(Transaction).filter(Transaction.user_id == user_id, Transaction.deleted_at.is_(None)).all()
+    insts_query = session_db.query(Installment).filter(Installment.user_id == user_id, Installment.deleted_at.is_(None))
+    if active_on is not None:
+        insts_query = insts_query.filter(backend.active_installments_filter(active_on))
+    income = sum(float(t.amount) for t in txns if t.type == "income")
+    expenses_avulsa = sum(float(t.amount) for t in txns if t.type == "expense")
+    expenses_parcelas = sum(float(i.monthly_value) for i in insts_query.all())
+    expenses_total = expenses_avulsa + expenses_parcelas
+    return {
+        "income": round(income, 2), "expenses_avulsa": round(expenses_avulsa, 2),
+        "expenses_parcelas": round(expenses_parcelas, 2), "expenses_total": round(expenses_total, 2),
+        "balance": round(income - expenses_total, 2),
+    }
+
+
+def list_page(session_db, user_id: str):
+    return backend.transaction_rows.query(session_db).filter(
+        Transaction.user_id == user_id, Transaction.deleted_at.is_(None)
+    ).order_by(Transaction.date.desc()).limit(20).all()
+
+
+def consents(session_db, user_id: str):
+    return session_db.query(Consent.consent_id).filter(
+        Consent.user_id == user_id, Consent.status == 'active', Consent.deleted_at.is_(None)
+    ).all()
+
+
+def timed(session_db, fn, user_ids: list, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        session_db.expunge_all()
+        start = time.perf_counter()
+        for user_id in user_ids:
+            fn(session_db, user_id)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {"best_seconds": round(best, 4), "ms_per_call": round(best * 1000 / len(user_ids), 3)}
+
+
+def query_plan(engine, user_id: str) -> list:
+    stmt = backend.get_session_local()().query(Transaction.type, backend.func.sum(Transaction.amount)).filter(
+        Transaction.user_id == user_id, Transaction.deleted_at.is_(None)
+    ).group_by(Transaction.type).statement
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as conn:
+        return [" ".join(str(col) for col in row[-1:]) for row in conn.execute(text(prefix + sql))]
+
+
+def run_scenario(engine, summary, user_ids: list, repeat: int) -> dict:
+    session_db = backend.get_session_local()()
+    today = date.today()
+    try:
+        return {
+            "summary": timed(session_db, lambda s, u: summary(s, u), user_ids, repeat),
+            "summary_active": timed(session_db, lambda s, u: summary(s, u, today), user_ids, repeat),
+            "list_transactions": timed(session_db, list_page, user_ids, repeat),
+            "active_consents": timed(session_db, consents, user_ids, repeat),
+            "plan_summary_transactions": query_plan(engine, user_ids[0]),
+            "results": [summary(session_db, u, today) for u in user_ids],
+        }
+    finally:
+        backend.get_session_local().remove()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--transactions", type=int, default=500, help="transações por usuário")
+    parser.add_argument("--installments", type=int, default=20, help="parcelamentos por usuário")
+    parser.add_argument("--deleted-ratio", type=float, default=0.3, help="fração de linhas com soft delete")
+    parser.add_argument("--sample", type=int, default=50, help="usuários consultados por medição")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="grava o relatório JSON neste arquivo")
+    args = parser.parse_args(argv)
+
+    engine = backend.get_engine()
+    try:
+        seed(engine, args.users, args.transactions, args.installments, args.deleted_ratio)
+        user_ids = random.Random(7).sample([f"user{u:05d}" for u in range(args.users)], min(args.sample, args.users))
+
+        use_indexes(engine, create=FULL_INDEXES, drop=live_indexes())
+        before = run_scenario(engine, legacy_summary, user_ids, args.repeat)
+        sql_full_indexes = run_scenario(engine, backend.user_summary, user_ids, args.repeat)
+        use_indexes(engine, create=live_indexes(), drop=FULL_INDEXES)
+        after = run_scenario(engine, backend.user_summary, user_ids, args.repeat)
+    finally:
+        engine.dispose()
+        if _TMP_DB:
+            os.remove(_TMP_DB)
+
+    consistent = all(
+        all(abs(b[key] - other[key]) <= 0.02 for key in b)
+        for b, m, a in zip(before.pop("results"), sql_full_indexes.pop("results"), after.pop("results"))
+        for other in (m, a)
+    )
+    speedup = {
+        name: round(before[name]["best_seconds"] / after[name]["best_seconds"], 2)
+        for name in ("summary", "summary_active", "list_transactions", "active_consents")
+        if after[name]["best_seconds"]
+    }
+    report = {
+        "benchmark": "live_indexes",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "dialect": engine.dialect.name,
+        "config": vars(args),
+        "before": before,
+        "sql_full_indexes": sql_full_indexes,
+        "after": after,
+        "speedup": speedup,
+        "consistent": consistent,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    sys.exit(0 if consistent else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Micro-benchmark: custo de logging por request no thread chamador.
+
+Uso:
+    python benchmarks/bench_logging.py [--requests 20000] [--logs-per-request 3]
+
+Compara o formatter original (datetime.now + json.dumps a cada log, escrita
+síncrona) com o StructuredFormatter atual em modo síncrono, assíncrono
+(QueueHandler/QueueListener) e assíncrono com amostragem de INFO. A saída vai
+para os.devnull; o tempo de drenagem da fila é reportado à parte.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, UTC
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logger import configure_logger  # noqa: E402
+
+
+class LegacyFormatter(logging.Formatter):
+    """Cópia do formatter anterior, como linha de base."""
+
+    def format(self, record):
+        log_obj = {
+            "timestamp": datetime.now(UTC).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in ["user_id", "endpoint", "method", "status_code", "duration_ms", "error_code"]:
+            if hasattr(record, field):
+                value = getattr(record, field, None)
+                if value is not None:
+                    log_obj[field] = value
+        return json.dumps(log_obj, ensure_ascii=False)
+
+
+def build_logger(name: str, stream, mode: str):
+    logger = logging.getLogger(f"bench.{name}")
+    logger.handlers.clear()
+    logger.filters.clear()
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if mode == "legacy":
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(LegacyFormatter())
+        logger.addHandler(handler)
+        return logger, None
+    sampling = {logging.INFO: 0.1} if mode == "async_sampled" else None
+    queue_handler = configure_logger(logger, stream, async_mode=mode != "sync", sampling=sampling)
+    return logger, queue_handler
+
+
+EXTRA_FIELDS = ("user_id", "endpoint", "method", "status_code", "duration_ms")
+
+
+def simulate(logger, requests: int, logs_per_request: int) -> float:
+    start = time.perf_counter()
+    for i in range(requests):
+        for j in range(logs_per_request):
+            logger.info(
+                "Request processada",
+                extra={"user_id": f"user{i % 100}", "endpoint": "/api/users/<user_id>/transactions",
+                       "method": "GET", "status_code": 200, "duration_ms": 12.5 + j},
+            )
+    return time.perf_counter() - start
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--logs-per-request", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    results = []
+    with open(os.devnull, "w") as devnull:
+        for mode in ("legacy", "sync", "async", "async_sampled"):
+            logger, queue_handler = build_logger(mode, devnull, mode)
+            caller = simulate(logger, args.requests, args.logs_per_request)
+            drain_start = time.perf_counter()
+            if queue_handler is not None:
+                queue_handler.stop_listener()
+            drain = time.perf_counter() - drain_start
+            results.append({
+                "mode": mode,
+                "caller_us_per_request": round(caller / args.requests * 1e6, 2),
+                "drain_ms": round(drain * 1000, 1),
+            })
+    print(json.dumps({
+        "benchmark": "logging",
+        "requests": args.requests,
+        "logs_per_request": args.logs_per_request,
+        "fields": len(EXTRA_FIELDS),
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark do sync dos providers sem banco real: stub HTTP e SimulatedProvider.
+
+Uso:
+    python benchmarks/bench_provider.py [--accounts 5] [--transactions 2000]
+        [--page-sizes 25 250 1000] [--latency-ms 0] [--repeat 3] [--output relatorio.json]
+
+Para cada page-size, mede `OpenFinanceProvider.sync` contra o stub (token,
+contas e transações paginadas). Mede também o `SimulatedProvider` com o mesmo
+volume, como referência sem HTTP. Confere se as N contas × M transações chegaram
+completas e iguais nos dois casos (mesmo gerador determinístico).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import providers  # noqa: E402
+from benchmarks.stub_openfinance import default_faults, start_stub_server  # noqa: E402
+from providers import OpenFinanceProvider, SimulatedProvider  # noqa: E402
+from token_cache import TokenCache  # noqa: E402
+
+
+def measure(sync, repeat: int) -> dict:
+    timings, count = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(sync()["transactions"])
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {
+        "transactions": count,
+        "best_seconds": round(best, 4),
+        "mean_seconds": round(sum(timings) / len(timings), 4),
+        "transactions_per_second": round(count / best, 1) if best else None,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=5)
+    parser.add_argument("--transactions", type=int, default=2000, help="transações por conta")
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[25, 250, 1000])
+    parser.add_argument("--latency-ms", type=int, default=0, help="latência do stub por request")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="grava o relatório JSON neste arquivo")
+    args = parser.parse_args(argv)
+    expected = args.accounts * args.transactions
+
+    server = start_stub_server(0, args.accounts, args.transactions, args.seed,
+                               faults=default_faults(latency_ms=args.latency_ms))
+    stub_results = {}
+    stub_rows = None
+    try:
+        provider = OpenFinanceProvider(
+            base_url=f"http://127.0.0.1:{server.server_address[1]}",
+            client_id="bench", client_secret="bench", token_cache=TokenCache(), name="bench_stub",
+        )
+        for page_size in args.page_sizes:
+            providers.PAGE_SIZE = page_size
+            pages = args.accounts * -(-args.transactions // page_size) + 1
+            stub_results[str(page_size)] = {
+                "requests_per_sync": pages + 1,  # + token (cacheado após o primeiro sync)
+                **measure(lambda: provider.sync("bench_user", "consent-bench"), args.repeat),
+            }
+        stub_rows = provider.sync("bench_user", "consent-bench")["transactions"]
+    finally:
+        server.shutdown()
+
+    # O stub serve as mesmas contas para qualquer consent (acc0..accN); o simulado usa o consent como prefixo
+    simulated = SimulatedProvider(accounts=args.accounts, transactions=args.transactions, seed=args.seed)
+    simulated_result = measure(lambda: simulated.sync("bench_user", "consent-bench"), args.repeat)
+
+    report = {
+        "benchmark": "provider_sync",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": vars(args),
+        "expected_transactions": expected,
+        "stub": stub_results,
+        "simulated": simulated_result,
+        "complete": all(r["transactions"] == expected for r in stub_results.values())
+                    and simulated_result["transactions"] == expected and len(stub_rows or []) == expected,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    sys.exit(0 if report["complete"] else 1)
+
+
+if __name__ == "__main__":
+    main()
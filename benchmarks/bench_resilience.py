@@ -0,0 +1,170 @@
+"""Cenários de resiliência do OpenFinanceProvider contra o stub com falhas injetadas.
+
+Uso:
+    python benchmarks/bench_resilience.py [--output relatorio.json]
+
+Cada cenário sobe um stub próprio (uma "instituição" por porta, logo um circuit
+breaker por cenário) e verifica o comportamento esperado:
+
+- healthy:      sem falhas → sucesso sem retry
+- transient:    30% de 503 → sucesso com retries
+- rate_limited: 429 com Retry-After: 1 → espera respeitada
+- outage:       100% de 503 → circuito abre e passa a falhar na hora
+- recovery:     após o reset, chamada de teste fecha o circuito
+- slow:         latência acima do read timeout → Timeout após as tentativas
+
+Imprime um relatório JSON com `passed` por cenário; sai com código 1 se algum falhar.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Parâmetros curtos para o cenário rodar em segundos (lidos no import de resilience)
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+os.environ.setdefault("OPENFINANCE_CONNECT_TIMEOUT", "0.5")
+os.environ.setdefault("OPENFINANCE_READ_TIMEOUT", "0.3")
+os.environ.setdefault("OPENFINANCE_MAX_RETRIES", "3")
+os.environ.setdefault("OPENFINANCE_BACKOFF_BASE", "0.02")
+os.environ.setdefault("OPENFINANCE_BACKOFF_MAX", "0.2")
+os.environ.setdefault("OPENFINANCE_CIRCUIT_FAILURES", "5")
+os.environ.setdefault("OPENFINANCE_CIRCUIT_RESET_SECONDS", "1")
+
+import requests  # noqa: E402
+
+import resilience  # noqa: E402
+from benchmarks.stub_openfinance import default_faults, start_stub_server  # noqa: E402
+from providers import OpenFinanceProvider  # noqa: E402
+from token_cache import TokenCache  # noqa: E402
+
+
+def make_provider(server) -> OpenFinanceProvider:
+    return OpenFinanceProvider(
+        base_url=f"http://127.0.0.1:{server.server_address[1]}",
+        client_id="bench", client_secret="bench", token_cache=TokenCache(),
+    )
+
+
+def retries_for(institution: str) -> float:
+    return sum(value for key, value in resilience.RETRIES.snapshot() if key[0] == institution)
+
+
+def attempt_sync(provider: OpenFinanceProvider) -> dict:
+    institution = resilience.institution_of(provider.base_url)
+    retries_before = retries_for(institution)
+    start = time.perf_counter()
+    try:
+        result = provider.sync("bench_user", "consent-bench")
+        outcome, detail = "success", len(result["transactions"])
+    except resilience.CircuitOpenError as e:
+        outcome, detail = "circuit_open", round(e.retry_after, 3)
+    except requests.RequestException as e:
+        outcome, detail = type(e).__name__, str(e)[:120]
+    return {
+        "outcome": outcome,
+        "detail": detail,
+        "seconds": round(time.perf_counter() - start, 3),
+        "retries": int(retries_for(institution) - retries_before),
+        "circuit_state": resilience.breaker_for(provider.base_url).state,
+    }
+
+
+def scenario_healthy() -> dict:
+    server = start_stub_server(transactions=20)
+    try:
+        run = attempt_sync(make_provider(server))
+    finally:
+        server.shutdown()
+    return {"runs": [run], "passed": run["outcome"] == "success" and run["retries"] == 0}
+
+
+def scenario_transient() -> dict:
+    server = start_stub_server(transactions=20, faults=default_faults(fail_rate=0.3))
+    try:
+        provider = make_provider(server)
+        runs = [attempt_sync(provider) for _ in range(5)]
+    finally:
+        server.shutdown()
+    successes = sum(run["outcome"] == "success" for run in runs)
+    return {"runs": runs, "passed": successes >= 4 and sum(run["retries"] for run in runs) > 0}
+
+
+def scenario_rate_limited() -> dict:
+    server = start_stub_server(transactions=20, faults=default_faults(fail_rate=0.5, fail_status=429, retry_after=1))
+    try:
+        provider = make_provider(server)
+        runs = [attempt_sync(provider) for _ in range(3)]
+    finally:
+        server.shutdown()
+    # Cada retry por 429 espera pelo menos o Retry-After; 429 não abre o circuito
+    honored = all(run["seconds"] >= run["retries"] * 1.0 for run in runs)
+    return {"runs": runs, "passed": honored and all(run["circuit_state"] == resilience.CLOSED for run in runs)}
+
+
+def scenario_outage_and_recovery() -> dict:
+    server = start_stub_server(transactions=20, faults=default_faults(fail_rate=1.0))
+    try:
+        provider = make_provider(server)
+        outage = [attempt_sync(provider) for _ in range(3)]
+        time.sleep(resilience.CIRCUIT_RESET_SECONDS + 0.1)
+        server.faults["fail_rate"] = 0.0
+        recovery = attempt_sync(provider)
+    finally:
+        server.shutdown()
+    opened = outage[-1]["outcome"] == "circuit_open" and outage[-1]["seconds"] < 0.05
+    return {
+        "outage": {"runs": outage, "passed": opened},
+        "recovery": {"runs": [recovery], "passed": recovery["outcome"] == "success" and recovery["circuit_state"] == resilience.CLOSED},
+    }
+
+
+def scenario_slow() -> dict:
+    latency_ms = int(resilience.READ_TIMEOUT * 1000) + 200
+    server = start_stub_server(transactions=20, faults=default_faults(latency_ms=latency_ms))
+    try:
+        run = attempt_sync(make_provider(server))
+    finally:
+        server.shutdown()
+    bound = (resilience.MAX_RETRIES + 1) * (resilience.READ_TIMEOUT + resilience.BACKOFF_MAX) + 1
+    return {"runs": [run], "passed": run["outcome"] in ("ReadTimeout", "circuit_open") and run["seconds"] < bound}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="grava o relatório JSON neste arquivo")
+    args = parser.parse_args(argv)
+
+    scenarios = {
+        "healthy": scenario_healthy(),
+        "transient": scenario_transient(),
+        "rate_limited": scenario_rate_limited(),
+        **scenario_outage_and_recovery(),
+        "slow": scenario_slow(),
+    }
+    report = {
+        "benchmark": "resilience",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "connect_timeout": resilience.CONNECT_TIMEOUT, "read_timeout": resilience.READ_TIMEOUT,
+            "max_retries": resilience.MAX_RETRIES, "backoff_base": resilience.BACKOFF_BASE,
+            "backoff_max": resilience.BACKOFF_MAX, "circuit_failures": resilience.CIRCUIT_FAILURES,
+            "circuit_reset_seconds": resilience.CIRCUIT_RESET_SECONDS,
+        },
+        "scenarios": scenarios,
+        "passed": all(result["passed"] for result in scenarios.values()),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
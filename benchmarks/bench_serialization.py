@@ -0,0 +1,83 @@
+"""Micro-benchmark: marshmallow (ORM + Schema.dump + json) vs RowSerializer (+ orjson).
+
+Uso:
+    python benchmarks/bench_serialization.py [--sizes 100 1000 10000] [--repeat 5]
+
+Mede, para cada tamanho, o tempo de query + serialização + codificação JSON
+dos dois caminhos sobre um SQLite em memória e imprime o resultado em JSON.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GF_DB_URL", "sqlite:///:memory:")
+
+from backend import Transaction, transactions_schema, transaction_rows, get_session_local  # noqa: E402
+from serializers import orjson  # noqa: E402
+
+
+def seed(session_db, count: int) -> None:
+    session_db.query(Transaction).delete()
+    start = date.today()
+    session_db.add_all([
+        Transaction(
+            user_id="bench",
+            description=f"Transação {i}",
+            amount=10.0 + i % 500,
+            type="income" if i % 5 == 0 else "expense",
+            date=start - timedelta(days=i % 365),
+        )
+        for i in range(count)
+    ])
+    session_db.commit()
+
+
+def marshmallow_path(session_db) -> bytes:
+    items = session_db.query(Transaction).filter(Transaction.user_id == "bench").all()
+    return json.dumps({"items": transactions_schema.dump(items)}).encode()
+
+
+def fast_path(session_db) -> bytes:
+    rows = transaction_rows.query(session_db).filter(Transaction.user_id == "bench").all()
+    payload = {"items": transaction_rows.dump(rows)}
+    return orjson.dumps(payload) if orjson is not None else json.dumps(payload).encode()
+
+
+def best_of(fn, session_db, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        session_db.expunge_all()  # evita reaproveitar objetos do identity map
+        start = time.perf_counter()
+        fn(session_db)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    session_db = get_session_local()()
+    results = []
+    for size in args.sizes:
+        seed(session_db, size)
+        assert json.loads(marshmallow_path(session_db)) == json.loads(fast_path(session_db))
+        slow = best_of(marshmallow_path, session_db, args.repeat)
+        fast = best_of(fast_path, session_db, args.repeat)
+        results.append({
+            "rows": size,
+            "marshmallow_ms": round(slow * 1000, 3),
+            "fast_ms": round(fast * 1000, 3),
+            "speedup": round(slow / fast, 2) if fast else None,
+        })
+    print(json.dumps({"benchmark": "serialization", "orjson": orjson is not None, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
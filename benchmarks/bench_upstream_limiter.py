@@ -0,0 +1,120 @@
+"""Verifica a taxa agregada do UpstreamLimiter com threads e com processos.
+
+Uso:
+    python benchmarks/bench_upstream_limiter.py [--rate 20] [--burst 5] [--seconds 3]
+        [--threads 8] [--processes 4] [--output relatorio.json]
+
+- threads:   um limiter em memória compartilhado por N threads (um worker)
+- processes: N processos, cada um com seu limiter, compartilhando o SQLite
+
+A taxa observada deve ficar em torno de `rate` (+ `burst` no início) e nunca
+acima; `max_rate_ratio` é a taxa observada dividida pelo limite teórico.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from upstream_limiter import UpstreamLimiter  # noqa: E402
+
+BASE_URL = "https://bench.example"
+
+
+def hammer(limiter: UpstreamLimiter, deadline: float, stamps: list) -> None:
+    """Pede tokens até o deadline (sem chamadas reais), anotando o instante de cada um."""
+    while True:
+        limiter.acquire(BASE_URL, "accounts")
+        now = time.time()
+        if now >= deadline:
+            return
+        stamps.append(now)
+
+
+def run_threads(rate: float, burst: float, seconds: float, threads: int) -> list:
+    limiter = UpstreamLimiter(rate=rate, burst=burst, store_path=None)
+    stamps: list = []
+    deadline = time.time() + seconds
+    workers = [threading.Thread(target=hammer, args=(limiter, deadline, stamps)) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return stamps
+
+
+def _process_main(rate, burst, store_path, deadline, queue) -> None:
+    stamps: list = []
+    hammer(UpstreamLimiter(rate=rate, burst=burst, store_path=store_path), deadline, stamps)
+    queue.put(stamps)
+
+
+def run_processes(rate: float, burst: float, seconds: float, processes: int) -> list:
+    fd, store_path = tempfile.mkstemp(prefix="gf_limiter_", suffix=".db")
+    os.close(fd)
+    try:
+        queue = multiprocessing.Queue()
+        deadline = time.time() + seconds
+        procs = [multiprocessing.Process(target=_process_main, args=(rate, burst, store_path, deadline, queue))
+                 for _ in range(processes)]
+        for proc in procs:
+            proc.start()
+        stamps = [stamp for _ in procs for stamp in queue.get()]
+        for proc in procs:
+            proc.join()
+        return stamps
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(store_path + suffix):
+                os.remove(store_path + suffix)
+
+
+def summarize(stamps: list, rate: float, burst: float, seconds: float) -> dict:
+    allowed = burst + rate * seconds
+    return {
+        "requests": len(stamps),
+        "allowed": round(allowed, 1),
+        "observed_rps": round(len(stamps) / seconds, 2),
+        "max_rate_ratio": round(len(stamps) / allowed, 3),
+        "passed": len(stamps) <= allowed + 1,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=20)
+    parser.add_argument("--burst", type=float, default=5)
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--output", help="grava o relatório JSON neste arquivo")
+    args = parser.parse_args(argv)
+
+    results = {
+        "threads": summarize(run_threads(args.rate, args.burst, args.seconds, args.threads), args.rate, args.burst, args.seconds),
+        "processes": summarize(run_processes(args.rate, args.burst, args.seconds, args.processes), args.rate, args.burst, args.seconds),
+    }
+    report = {
+        "benchmark": "upstream_limiter",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": vars(args),
+        "scenarios": results,
+        "passed": all(result["passed"] for result in results.values()),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Micro-benchmark: TransactionSchema.load por linha vs validate_transactions em lote.
+
+Uso:
+    python benchmarks/bench_validation.py [--sizes 1000 10000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GF_DB_URL", "sqlite:///:memory:")
+
+from backend import transaction_schema  # noqa: E402
+from validators import validate_transactions  # noqa: E402
+
+
+def provider_rows(count: int):
+    today = date.today()
+    return [
+        {
+            "description": f"Compra {i}",
+            "amount": 10.0 + i % 300,
+            "type": "income" if i % 7 == 0 else "expense",
+            "date": (today - timedelta(days=i % 90)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def per_row(rows):
+    return [transaction_schema.load({**row, "user_id": "bench"}) for row in rows]
+
+
+def batched(rows):
+    return validate_transactions(rows, "bench")[0]
+
+
+def best_of(fn, rows, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in args.sizes:
+        rows = provider_rows(size)
+        assert per_row(rows) == batched(rows)
+        slow = best_of(per_row, rows, args.repeat)
+        fast = best_of(batched, rows, args.repeat)
+        results.append({
+            "rows": size,
+            "marshmallow_ms": round(slow * 1000, 3),
+            "batch_ms": round(fast * 1000, 3),
+            "speedup": round(slow / fast, 2) if fast else None,
+        })
+    print(json.dumps({"benchmark": "validation", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
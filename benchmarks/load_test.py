@@ -0,0 +1,285 @@
+"""Load test dos endpoints principais com relatório JSON (p50/p95/p99 e throughput).
+
+Uso:
+    # Flask test client, SQLite temporário, 10k transações em 100 usuários
+    python benchmarks/load_test.py --users 100 --transactions 10000 --requests 200
+
+    # gunicorn real (4 workers) com 8 clientes concorrentes
+    python benchmarks/load_test.py --driver gunicorn --workers 4 --concurrency 8
+
+    # sync com 3 contas × 500 transações no SimulatedProvider (sem HTTP)
+    python benchmarks/load_test.py --provider-accounts 3 --provider-transactions 500 --scenarios sync
+
+    # sync contra o stub Open Finance (HTTP, paginado) em vez do SimulatedProvider
+    python benchmarks/load_test.py --provider stub --provider-transactions 500 --page-size 100 --scenarios sync
+
+    # Postgres já populado (sem seed)
+    python benchmarks/load_test.py --db-url postgresql://... --skip-seed
+
+Cenários: list_transactions, summary, suggestions, portfolio, sync. O relatório
+vai para stdout (ou --output) para acompanhar regressões entre versões.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCENARIOS = {
+    "list_transactions": ("GET", "/api/users/{user}/transactions?page=1&per_page=50"),
+    "summary": ("GET", "/api/users/{user}/summary"),
+    "suggestions": ("GET", "/api/users/{user}/suggestions"),
+    "portfolio": ("GET", "/api/users/{user}/investments/portfolio"),
+    "sync": ("POST", "/api/users/{user}/openfinance/sync"),
+}
+
+
+# ---------------------------------------------------------------------------
+# Seed
+# ---------------------------------------------------------------------------
+def user_ids(users: int) -> List[str]:
+    import datagen
+    return datagen.user_ids(users, "bench_user")
+
+
+def seed_database(users: int, transactions: int, installments: int, investments: int, seed: int, months: int = 12,
+                  end: Optional[date] = None) -> Dict[str, int]:
+    """Popula a base com históricos sintéticos do `datagen` (COPY/executemany).
+
+    `end` padrão é hoje: summary/suggestions olham janelas relativas à data atual,
+    e um histórico terminando em datagen.DEFAULT_END deixaria essas janelas vazias.
+    """
+    import datagen
+    from backend import get_engine
+    return datagen.bulk_load(get_engine(), datagen.generate(
+        user_ids(users),
+        seed=seed,
+        end=end or date.today(),
+        months=months,
+        transactions=max(1, transactions // users),
+        installments=installments,
+        investments=investments,
+    ))
+
+
+# ---------------------------------------------------------------------------
+# Drivers
+# ---------------------------------------------------------------------------
+def client_driver() -> Callable[[str, str], int]:
+    """Chama a app em processo via Flask test client."""
+    from benchmarks.bench_app import app
+    client = app.test_client()
+    lock = threading.Lock()  # test client não é thread-safe
+
+    def call(method: str, path: str) -> int:
+        with lock:
+            return client.open(path, method=method).status_code
+    return call
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(workers: int, threads: int, port: int) -> subprocess.Popen:
+    """Sobe gunicorn com benchmarks.bench_app:app e espera o /api/health."""
+    import requests
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(workers), "--threads", str(threads),
+         "-b", f"127.0.0.1:{port}", "--log-level", "warning", "benchmarks.bench_app:app"],
+        cwd=ROOT, env=os.environ.copy(), stdout=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn encerrou durante a inicialização")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/api/health", timeout=1).ok:
+                return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("gunicorn não respondeu ao /api/health")
+
+
+def http_driver(base_url: str) -> Callable[[str, str], int]:
+    """Cliente HTTP com uma requests.Session por thread (keep-alive)."""
+    import requests
+    local = threading.local()
+
+    def call(method: str, path: str) -> int:
+        http = getattr(local, "session", None)
+        if http is None:
+            http = local.session = requests.Session()
+        return http.request(method, base_url + path, timeout=120).status_code
+    return call
+
+
+# ---------------------------------------------------------------------------
+# Execução e relatório
+# ---------------------------------------------------------------------------
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Percentil por nearest-rank."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(call, method: str, template: str, users: List[str], requests: int, concurrency: int) -> Dict:
+    paths = [template.format(user=users[i % len(users)]) for i in range(requests)]
+    latencies: List[float] = []
+    errors = 0
+    statuses: Dict[str, int] = {}
+
+    def one(path: str):
+        start = time.perf_counter()
+        status = call(method, path)
+        return time.perf_counter() - start, status
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for elapsed, status in pool.map(one, paths):
+            latencies.append(elapsed)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status >= 400:
+                errors += 1
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    ms = lambda value: round(value * 1000, 3) if value is not None else None  # noqa: E731
+    return {
+        "requests": requests,
+        "errors": errors,
+        "status_codes": statuses,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "max_ms": ms(latencies[-1]) if latencies else None,
+        "throughput_rps": round(requests / wall, 2) if wall else None,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", help="URL SQLAlchemy (padrão: SQLite temporário)")
+    parser.add_argument("--skip-seed", action="store_true", help="usa os dados já existentes na base")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--transactions", type=int, default=10_000, help="total de transações")
+    parser.add_argument("--installments-per-user", type=int, default=5)
+    parser.add_argument("--investments-per-user", type=int, default=5)
+    parser.add_argument("--months", type=int, default=12, help="meses de histórico por usuário")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end", type=date.fromisoformat, help="último dia do histórico, AAAA-MM-DD (padrão: hoje)")
+    parser.add_argument("--driver", choices=["client", "gunicorn"], default="client")
+    parser.add_argument("--workers", type=int, default=2, help="workers gunicorn")
+    parser.add_argument("--threads", type=int, default=1, help="threads por worker gunicorn")
+    parser.add_argument("--concurrency", type=int, default=1, help="clientes concorrentes")
+    parser.add_argument("--provider", choices=["simulated", "stub"], default="simulated")
+    parser.add_argument("--provider-accounts", "--stub-accounts", dest="provider_accounts", type=int, default=2,
+                        help="contas por consent (simulado ou stub)")
+    parser.add_argument("--provider-transactions", "--stub-transactions", dest="provider_transactions", type=int,
+                        default=100, help="transações por conta (simulado ou stub)")
+    parser.add_argument("--page-size", type=int, default=1000, help="page-size pedido ao stub")
+    parser.add_argument("--stub-latency-ms", type=int, default=0, help="latência do stub por request")
+    parser.add_argument("--requests", type=int, default=200, help="requests por cenário")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--output", help="grava o relatório JSON neste arquivo")
+    args = parser.parse_args(argv)
+
+    # Configuração via env ANTES de importar o backend (DB_URL e provider são lidos no import)
+    temp_db = None
+    if not args.db_url:
+        fd, temp_db = tempfile.mkstemp(prefix="gf_bench_", suffix=".db")
+        os.close(fd)
+    db_url = args.db_url or f"sqlite:///{temp_db}"
+    os.environ["DATABASE_URL"] = db_url
+    os.environ["RATELIMIT_ENABLED"] = "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    stub = None
+    if args.provider == "stub":
+        from benchmarks.stub_openfinance import default_faults, start_stub_server
+        stub = start_stub_server(0, args.provider_accounts, args.provider_transactions, args.seed,
+                                 faults=default_faults(latency_ms=args.stub_latency_ms))
+        os.environ.update({
+            "OPENFINANCE_ENABLE_REAL": "true",
+            "OPENFINANCE_BASE_URL": f"http://127.0.0.1:{stub.server_address[1]}",
+            "OPENFINANCE_CLIENT_ID": "bench",
+            "OPENFINANCE_CLIENT_SECRET": "bench",
+            "OPENFINANCE_PAGE_SIZE": str(args.page_size),
+        })
+    else:
+        os.environ.update({
+            "SIMULATED_ACCOUNTS": str(args.provider_accounts),
+            "SIMULATED_TRANSACTIONS": str(args.provider_transactions),
+            "SIMULATED_SEED": str(args.seed),
+        })
+
+    import backend  # noqa: F401  (cria as tabelas)
+
+    seed_seconds = None
+    if not args.skip_seed:
+        start = time.perf_counter()
+        seed_database(args.users, args.transactions, args.installments_per_user, args.investments_per_user,
+                      args.seed, args.months, args.end)
+        seed_seconds = round(time.perf_counter() - start, 2)
+
+    process = None
+    try:
+        if args.driver == "gunicorn":
+            port = free_port()
+            process = start_gunicorn(args.workers, args.threads, port)
+            call = http_driver(f"http://127.0.0.1:{port}")
+        else:
+            call = client_driver()
+
+        users = user_ids(args.users)
+        results = {}
+        for name in args.scenarios:
+            method, template = SCENARIOS[name]
+            results[name] = run_scenario(call, method, template, users, args.requests, args.concurrency)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        if stub is not None:
+            stub.shutdown()
+        if temp_db is not None:
+            os.remove(temp_db)
+
+    report = {
+        "benchmark": "load_test",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "driver": args.driver, "workers": args.workers if args.driver == "gunicorn" else None,
+            "threads": args.threads if args.driver == "gunicorn" else None,
+            "concurrency": args.concurrency, "provider": args.provider,
+            "provider_accounts": args.provider_accounts, "provider_transactions": args.provider_transactions,
+            "database": db_url.split(":", 1)[0], "users": args.users, "transactions": args.transactions,
+            "installments_per_user": args.installments_per_user, "investments_per_user": args.investments_per_user,
+            "seed_seconds": seed_seconds,
+        },
+        "scenarios": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Servidor stub da API Open Finance para benchmarks.
+
+Uso:
+    python benchmarks/stub_openfinance.py [--port 8790] [--accounts 2] [--transactions 100]
+
+Implementa o que o `OpenFinanceProvider` consome:
+
+- POST /oauth2/token                                → access_token
+- GET  /accounts/v1/accounts                        → contas (paginado)
+- GET  /accounts/v1/accounts/<id>/transactions      → transações determinísticas (paginado)
+
+Paginação como na especificação: `page` (1..N) e `page-size` (padrão 25, máximo
+`--max-page-size`), com `links` (self/first/prev/next/last) e `meta`
+(totalRecords/totalPages) na resposta. As transações vêm de
+`datagen.open_finance_transactions` (mesmo gerador do SimulatedProvider).
+
+As listagens exigem `Authorization: Bearer stub-token` (o token emitido) e
+respondem 401 a qualquer outro, como uma instituição com o token revogado.
+
+Também pode ser iniciado em thread pelo load test (`start_stub_server`).
+
+Injeção de falhas (`--fail-rate`, `--fail-status`, `--retry-after`, `--latency-ms`)
+para exercitar retry/backoff/circuit breaker do provider; os parâmetros ficam em
+`server.faults` e podem ser alterados com o servidor rodando.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datagen  # noqa: E402
+
+DEFAULT_PAGE_SIZE = 25
+ACCESS_TOKEN = "stub-token"
+
+
+def default_faults(fail_rate: float = 0.0, fail_status: int = 503, retry_after: Optional[int] = None,
+                   latency_ms: int = 0, fail_next: int = 0) -> Dict:
+    """Configuração de falhas: fração de respostas com erro, status, Retry-After e latência extra.
+
+    `fail_next` força erro nas próximas N respostas, independente de `fail_rate` (cenários determinísticos).
+    """
+    return {"fail_rate": fail_rate, "fail_status": fail_status, "retry_after": retry_after, "latency_ms": latency_ms,
+            "fail_next": fail_next}
+
+
+def paginate(items: List[Dict], path: str, query: Dict[str, List[str]], max_page_size: int) -> Dict:
+    """Página `page` de `items` com links/meta no formato Open Finance."""
+    try:
+        page_size = min(max(1, int(query.get("page-size", [DEFAULT_PAGE_SIZE])[0])), max_page_size)
+        page = max(1, int(query.get("page", ["1"])[0]))
+    except ValueError:
+        page_size, page = DEFAULT_PAGE_SIZE, 1
+    total_pages = max(1, -(-len(items) // page_size))
+
+    def link(number: int) -> str:
+        params = {key: values[0] for key, values in query.items()}
+        params.update({"page": number, "page-size": page_size})
+        return f"{path}?{urlencode(params)}"
+
+    links = {"self": link(page), "first": link(1), "last": link(total_pages)}
+    if page > 1:
+        links["prev"] = link(min(page - 1, total_pages))
+    if page < total_pages:
+        links["next"] = link(page + 1)
+    start = (page - 1) * page_size
+    return {
+        "data": items[start:start + page_size],
+        "links": links,
+        "meta": {"totalRecords": len(items), "totalPages": total_pages},
+    }
+
+
+def make_handler(accounts: int, transactions: int, seed: int, faults: Optional[Dict] = None,
+                 max_page_size: int = 1000):
+    cache: Dict[str, List[Dict]] = {}
+    account_list = datagen.open_finance_accounts(accounts)
+    faults = faults if faults is not None else default_faults()
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, como uma instituição real
+        disable_nagle_algorithm = True  # headers e corpo saem em writes separados: evita 40ms de delayed ACK
+
+        def log_message(self, format, *args):  # silencia o log por request
+            pass
+
+        def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None) -> None:
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _inject_fault(self) -> bool:
+            """Aplica latência e, conforme `fail_rate`, responde com erro. True se respondeu."""
+            if faults["latency_ms"]:
+                time.sleep(faults["latency_ms"] / 1000)
+            with rng_lock:
+                fail = rng.random() < faults["fail_rate"]
+                if faults.get("fail_next"):
+                    faults["fail_next"] -= 1
+                    fail = True
+            if not fail:
+                return False
+            headers = {"Retry-After": str(faults["retry_after"])} if faults["retry_after"] is not None else None
+            self._send(faults["fail_status"], b'{"error": "injected_fault"}', headers)
+            return True
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(length)
+            if self._inject_fault():
+                return
+            if self.path.startswith("/oauth2/token"):
+                return self._send(200, json.dumps({"access_token": ACCESS_TOKEN, "expires_in": 3600}).encode())
+            self._send(404, b'{"error": "not_found"}')
+
+        def do_GET(self):
+            if self._inject_fault():
+                return
+            if self.headers.get("Authorization") != f"Bearer {ACCESS_TOKEN}":
+                return self._send(401, b'{"error": "invalid_token"}')
+            url = urlsplit(self.path)
+            path, query = url.path, parse_qs(url.query)
+            if path == "/accounts/v1/accounts":
+                return self._send(200, json.dumps(paginate(account_list, path, query, max_page_size)).encode())
+            parts = path.strip("/").split("/")
+            if len(parts) == 5 and parts[:3] == ["accounts", "v1", "accounts"] and parts[4] == "transactions":
+                account_id = parts[3]
+                if account_id not in cache:
+                    cache[account_id] = datagen.open_finance_transactions(account_id, transactions, seed)
+                return self._send(200, json.dumps(paginate(cache[account_id], path, query, max_page_size)).encode())
+            self._send(404, b'{"error": "not_found"}')
+
+    return StubHandler
+
+
+def start_stub_server(port: int = 0, accounts: int = 2, transactions: int = 100, seed: int = 42,
+                      faults: Optional[Dict] = None, max_page_size: int = 1000) -> ThreadingHTTPServer:
+    """Inicia o stub em thread daemon; a porta real fica em `server.server_address[1]`."""
+    faults = faults if faults is not None else default_faults()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(accounts, transactions, seed, faults, max_page_size))
+    server.faults = faults
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--accounts", type=int, default=2)
+    parser.add_argument("--transactions", type=int, default=100, help="transações por conta")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-page-size", type=int, default=1000, help="maior page-size aceito")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fração de respostas com erro (0-1)")
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=int, help="segundos no header Retry-After das falhas")
+    parser.add_argument("--latency-ms", type=int, default=0, help="latência extra por request")
+    args = parser.parse_args(argv)
+    faults = default_faults(args.fail_rate, args.fail_status, args.retry_after, args.latency_ms)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port),
+                                 make_handler(args.accounts, args.transactions, args.seed, faults, args.max_page_size))
+    print(f"Stub Open Finance em http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
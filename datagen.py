@@ -0,0 +1,354 @@
+"""Gerador de históricos financeiros sintéticos (CLI + biblioteca).
+
+Uso:
+    python datagen.py --users 1000 --months 12 [--transactions-per-user 500] [--seed 42] [--end 2026-06-30]
+    python datagen.py --db-url postgresql://... --users 10000 --transactions-per-user 100
+
+Cada usuário recebe um perfil de renda e um histórico realista:
+
+- salário mensal (dia fixo) e, para parte dos usuários, renda extra;
+- assinaturas com valor e dia fixos (Netflix, Spotify...) e contas mensais
+  (energia, água, internet, celular), detectáveis como recorrências;
+- gastos variáveis com descrições dos keywords de categoria usados pelas
+  sugestões (restaurante, uber, supermercado...);
+- compras parceladas, investimentos e um consent Open Finance ativo.
+
+É determinístico: o mesmo seed e a mesma data final (`end`, padrão
+DEFAULT_END, fixa e não "hoje") geram exatamente os mesmos dados (cada usuário
+tem seu próprio RNG derivado de seed + user_id, então o resultado independe
+da ordem ou do número de usuários gerados). A carga usa `COPY ... FROM STDIN`
+no Postgres e executemany (INSERT em lote) nos demais bancos.
+"""
+from __future__ import annotations
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Último dia dos históricos quando `end` não é informado: fixo para que o
+# mesmo seed gere os mesmos dados em qualquer dia
+DEFAULT_END = date(2026, 6, 30)
+
+EMPLOYERS = ["Empresa XYZ Ltda", "Tech Solutions SA", "Comércio Brasil", "Prefeitura Municipal", "Hospital Central"]
+SUBSCRIPTIONS = [
+    ("Netflix assinatura", 55.90), ("Spotify Premium", 21.90), ("Amazon Prime", 19.90),
+    ("Disney+ streaming", 33.90), ("Assinatura jornal", 29.90), ("YouTube Premium streaming", 24.90),
+]
+BILLS = [  # (descrição, fração da renda, variação)
+    ("Conta de energia", 0.035, 0.25), ("Conta de água", 0.015, 0.20),
+    ("Internet fibra", 0.020, 0.0), ("Celular pós-pago", 0.012, 0.0),
+]
+VARIABLE = [  # (peso, descrições, valor mínimo, valor máximo)
+    (30, ["Restaurante Sabor", "iFood pedido", "Lanche padaria", "Almoço executivo", "Jantar pizzaria"], 15, 120),
+    (18, ["Uber viagem", "99 corrida", "Gasolina posto", "Taxi aeroporto"], 10, 250),
+    (20, ["Supermercado Bom Preço", "Mercado do bairro", "Compras atacado"], 40, 600),
+    (12, ["Farmácia Popular", "Drogaria"], 15, 180),
+    (10, ["Loja de roupas", "Magazine eletrônicos", "Livraria"], 30, 500),
+    (10, ["Cinema", "Show ingresso", "Bar com amigos"], 25, 200),
+]
+INSTALLMENT_ITEMS = ["Notebook", "Geladeira", "Smartphone", "Sofá", "Curso online", "Passagem aérea", "Televisão"]
+ASSETS = [
+    ("stocks", ["PETR4", "VALE3", "ITUB4", "WEGE3"]), ("reit", ["HGLG11", "KNRI11", "MXRF11"]),
+    ("crypto", ["Bitcoin", "Ethereum"]), ("bonds", ["Tesouro Selic", "Tesouro IPCA+"]),
+    ("funds", ["Fundo Multimercado"]), ("savings", ["Poupança"]),
+]
+
+_VARIABLE_WEIGHTS = [weight for weight, *_ in VARIABLE]
+
+
+def user_ids(count: int, prefix: str = "user") -> List[str]:
+    return [f"{prefix}_{i:07d}" for i in range(count)]
+
+
+def _monthly_dates(start: date, end: date, day: int) -> Iterator[date]:
+    """Uma data por mês no dia `day` (limitado a 28) dentro de [start, end]."""
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        candidate = date(year, month, min(day, 28))
+        if start <= candidate <= end:
+            yield candidate
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def generate_user(
+    user_id: str,
+    seed: int = 42,
+    end: Optional[date] = None,
+    months: int = 12,
+    transactions: Optional[int] = None,
+    installments: int = 3,
+    investments: int = 3,
+    variable_per_day: float = 1.2,
+) -> Dict[str, List[Dict]]:
+    """Histórico completo de um usuário.
+
+    Args:
+        user_id: ID do usuário
+        seed: Seed global (combinada com o user_id)
+        end: Último dia do histórico (padrão: DEFAULT_END)
+        months: Meses de histórico
+        transactions: Total aproximado de transações; os gastos variáveis completam
+            o que faltar após salários/assinaturas/contas (None: usa variable_per_day)
+        installments: Compras parceladas
+        investments: Investimentos
+        variable_per_day: Média de gastos variáveis por dia quando `transactions` é None
+
+    Returns:
+        {"transactions": [...], "installments": [...], "investments": [...], "consents": [...]}
+        com dicts prontos para INSERT (datas como `date`).
+    """
+    from backend import add_months, installment_end_date
+
+    rng = random.Random(f"{seed}:{user_id}")
+    end = end or DEFAULT_END
+    start = add_months(end, -months) + timedelta(days=1)
+    days = (end - start).days + 1
+    income = min(max(rng.lognormvariate(8.5, 0.5), 1500.0), 60000.0)
+    scale = income / 5000.0
+    txns: List[Dict] = []
+
+    def add(description: str, amount: float, txn_type: str, when: date) -> None:
+        txns.append({"user_id": user_id, "description": description, "amount": round(amount, 2), "type": txn_type, "date": when})
+
+    # Receitas: salário fixo + renda extra eventual
+    employer = rng.choice(EMPLOYERS)
+    salary_day = rng.choice([1, 5, 5, 10, 20])
+    for when in _monthly_dates(start, end, salary_day):
+        add(f"Salário {employer}", income * rng.uniform(0.99, 1.01), "income", when)
+    if rng.random() < 0.3:
+        for when in _monthly_dates(start, end, rng.randint(1, 28)):
+            if rng.random() < 0.4:
+                add("Freelance projeto", income * rng.uniform(0.1, 0.5), "income", when)
+
+    # Assinaturas (valor e dia fixos) e contas mensais
+    for description, price in rng.sample(SUBSCRIPTIONS, rng.randint(0, 4)):
+        day = rng.randint(1, 28)
+        for when in _monthly_dates(start, end, day):
+            add(description, price, "expense", when)
+    for description, share, variation in BILLS:
+        if rng.random() < 0.85:
+            day = rng.randint(5, 15)
+            base = income * share
+            for when in _monthly_dates(start, end, day):
+                add(description, base * rng.uniform(1 - variation, 1 + variation), "expense", when)
+
+    # Gastos variáveis completam o volume pedido
+    if transactions is not None:
+        variable_count = max(0, transactions - len(txns))
+    else:
+        variable_count = int(days * variable_per_day * rng.uniform(0.7, 1.3))
+    for _ in range(variable_count):
+        _, descriptions, low, high = rng.choices(VARIABLE, weights=_VARIABLE_WEIGHTS)[0]
+        add(rng.choice(descriptions), rng.uniform(low, high) * max(scale, 0.5) ** 0.5, "expense",
+            start + timedelta(days=rng.randrange(days)))
+    txns.sort(key=lambda row: row["date"])
+
+    installment_rows = []
+    for _ in range(installments):
+        date_added = end - timedelta(days=rng.randrange(min(days, 540)))
+        total_months = rng.choice([3, 6, 10, 12, 18, 24])
+        installment_rows.append({
+            "user_id": user_id,
+            "description": rng.choice(INSTALLMENT_ITEMS),
+            "monthly_value": round(rng.uniform(100, 3000) * scale / total_months * 3, 2),
+            "total_months": total_months,
+            "date_added": date_added,
+            "end_date": installment_end_date(date_added, total_months),
+        })
+
+    investment_rows = []
+    for _ in range(investments):
+        asset_type, names = rng.choice(ASSETS)
+        purchase_price = round(rng.uniform(5, 300), 2)
+        purchase_date = end - timedelta(days=rng.randrange(1, 900))
+        # Timestamps derivados das datas geradas (nada de datetime.now): mantém o determinismo
+        created_at = datetime.combine(purchase_date, datetime.min.time())
+        investment_rows.append({
+            "user_id": user_id,
+            "name": rng.choice(names),
+            "asset_type": asset_type,
+            "amount": round(rng.uniform(1, 200) * scale, 2),
+            "purchase_price": purchase_price,
+            "current_price": round(purchase_price * rng.uniform(0.75, 1.6), 2),
+            "purchase_date": purchase_date,
+            "target_return": round(rng.uniform(5, 20), 1),
+            "status": "active",
+            "notes": None,
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+
+    consent_rows = [{
+        "user_id": user_id,
+        "consent_id": f"consent-{user_id}",
+        "provider": "simulated",
+        "scopes": "accounts transactions",
+        "status": "active",
+        "created_at": datetime.combine(start, datetime.min.time()),
+    }]
+    return {"transactions": txns, "installments": installment_rows, "investments": investment_rows, "consents": consent_rows}
+
+
+def generate(users: Iterable[str], **kwargs) -> Iterator[Dict[str, List[Dict]]]:
+    """Gera o histórico de cada usuário (lazy; kwargs de `generate_user`)."""
+    for user_id in users:
+        yield generate_user(user_id, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# Formato Open Finance (stub HTTP e SimulatedProvider)
+# ---------------------------------------------------------------------------
+def open_finance_accounts(count: int) -> List[Dict]:
+    """Contas no formato da API Open Finance (`/accounts/v1/accounts`)."""
+    return [{"accountId": f"acc{i}", "type": "CONTA_DEPOSITO_A_VISTA", "currency": "BRL"} for i in range(count)]
+
+
+def open_finance_transactions(account_key: str, count: int, seed: int = 42, end: Optional[date] = None, days: int = 90) -> List[Dict]:
+    """Transações de uma conta no formato da API Open Finance (`.../transactions`).
+
+    Mistura créditos (PIX/salário), débitos automáticos de assinaturas e gastos
+    variáveis. O mesmo (seed, account_key, end) gera sempre a mesma lista
+    (`end` padrão: DEFAULT_END).
+    """
+    rng = random.Random(f"{seed}:{account_key}")
+    end = end or DEFAULT_END
+    items = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.05:
+            name, creditor, credit_debit, amount = "PIX RECEBIDO", rng.choice(EMPLOYERS), "CREDIT", rng.uniform(1500, 9000)
+        elif roll < 0.15:
+            creditor, amount = rng.choice(SUBSCRIPTIONS)
+            name, credit_debit = "DEBITO AUTOMATICO", "DEBIT"
+        else:
+            _, descriptions, low, high = rng.choices(VARIABLE, weights=_VARIABLE_WEIGHTS)[0]
+            name, creditor, credit_debit = rng.choice(["COMPRA CARTAO", "PIX ENVIADO"]), rng.choice(descriptions), "DEBIT"
+            amount = rng.uniform(low, high)
+        items.append({
+            "transactionId": f"{account_key}-txn{i}",
+            "transactionName": name,
+            "creditorName": creditor,
+            "creditDebitType": credit_debit,
+            "amount": f"{amount:.2f}",
+            "bookingDate": (end - timedelta(days=rng.randrange(days))).isoformat(),
+        })
+    return items
+
+
+# ---------------------------------------------------------------------------
+# Carga em lote
+# ---------------------------------------------------------------------------
+def _tables() -> Dict[str, object]:
+    from backend import Consent, Installment, Investment, Transaction
+    return {
+        "transactions": Transaction.__table__,
+        "installments": Installment.__table__,
+        "investments": Investment.__table__,
+        "consents": Consent.__table__,
+    }
+
+
+def _copy_rows(connection, table, rows: List[Dict]) -> None:
+    """COPY FROM STDIN (CSV) via psycopg2."""
+    columns = list(rows[0].keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if row[col] is None else row[col] for col in columns])
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def bulk_load(engine, histories: Iterable[Dict[str, List[Dict]]], chunk_size: int = 50_000) -> Dict[str, int]:
+    """Grava os históricos em lotes de até `chunk_size` linhas por tabela.
+
+    Postgres usa COPY; outros bancos usam INSERT executemany. Cada lote é
+    commitado, então a memória fica limitada a um lote por tabela.
+
+    Returns:
+        Linhas inseridas por tabela.
+    """
+    from sqlalchemy import insert
+
+    tables = _tables()
+    use_copy = engine.dialect.name == "postgresql"
+    pending: Dict[str, List[Dict]] = {name: [] for name in tables}
+    counts = {name: 0 for name in tables}
+
+    def flush(name: str) -> None:
+        rows = pending[name]
+        if not rows:
+            return
+        with engine.begin() as connection:
+            if use_copy:
+                _copy_rows(connection, tables[name], rows)
+            else:
+                connection.execute(insert(tables[name]), rows)
+        counts[name] += len(rows)
+        pending[name] = []
+
+    for history in histories:
+        for name, rows in history.items():
+            pending[name].extend(rows)
+            if len(pending[name]) >= chunk_size:
+                flush(name)
+    for name in tables:
+        flush(name)
+    return counts
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", help="URL SQLAlchemy (padrão: GF_DB_URL/DATABASE_URL)")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--user-prefix", default="user")
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--transactions-per-user", type=int, help="total aproximado por usuário")
+    parser.add_argument("--installments-per-user", type=int, default=3)
+    parser.add_argument("--investments-per-user", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end", type=date.fromisoformat, default=DEFAULT_END,
+                        help=f"último dia do histórico, AAAA-MM-DD (padrão: {DEFAULT_END.isoformat()})")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    args = parser.parse_args(argv)
+
+    if args.db_url:
+        os.environ["DATABASE_URL"] = args.db_url  # lido pelo backend no import
+    from backend import get_engine
+
+    start = time.perf_counter()
+    counts = bulk_load(
+        get_engine(),
+        generate(
+            user_ids(args.users, args.user_prefix),
+            seed=args.seed,
+            end=args.end,
+            months=args.months,
+            transactions=args.transactions_per_user,
+            installments=args.installments_per_user,
+            investments=args.investments_per_user,
+        ),
+        chunk_size=args.chunk_size,
+    )
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "rows": counts,
+        "seconds": round(elapsed, 2),
+        "transactions_per_second": round(counts["transactions"] / elapsed) if elapsed else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Detector de N+1 e queries lentas por request (modo debug/staging).
+
+Opt-in via `DB_PROFILING=true`. Quando ativo, listeners do SQLAlchemy contam
+os statements de cada request, agrupam repetições do mesmo SQL (padrão N+1)
+e medem o tempo de cada um. Ao fim da request:
+
+- loga warnings estruturados acima dos limites configurados;
+- opcionalmente adiciona os headers `X-DB-Queries` e `Server-Timing`.
+
+Desligado, nenhum hook é registrado (custo zero).
+"""
+from __future__ import annotations
+import os
+import re
+import time
+from collections import Counter
+
+from logger import logger
+
+ENABLED = os.getenv("DB_PROFILING", "false").lower() == "true"
+MAX_QUERIES = int(os.getenv("DB_PROFILING_MAX_QUERIES", "20"))
+MAX_REPEATS = int(os.getenv("DB_PROFILING_MAX_REPEATS", "5"))
+SLOW_QUERY_MS = float(os.getenv("DB_PROFILING_SLOW_QUERY_MS", "100"))
+EMIT_HEADERS = os.getenv("DB_PROFILING_HEADERS", "true").lower() == "true"
+
+STATEMENT_LOG_LIMIT = 500
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _compact(statement: str) -> str:
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    return statement if len(statement) <= STATEMENT_LOG_LIMIT else statement[:STATEMENT_LOG_LIMIT] + "..."
+
+
+def init_app(app, engine) -> None:
+    """Registra os listeners SQL e o relatório por request."""
+    from flask import g, has_request_context, request
+    from sqlalchemy import event
+
+    @app.before_request
+    def _db_profile_start():
+        g._db_profile = {"count": 0, "time": 0.0, "statements": Counter()}
+
+    @app.after_request
+    def _db_profile_report(response):
+        profile = g.pop("_db_profile", None)
+        if profile is None:
+            return response
+        db_ms = round(profile["time"] * 1000, 2)
+        context = {"endpoint": request.path, "method": request.method, "query_count": profile["count"], "db_ms": db_ms}
+
+        if profile["count"] > MAX_QUERIES:
+            logger.warning("Muitas queries SQL na request", extra=context)
+        for statement, repeats in profile["statements"].items():
+            if repeats >= MAX_REPEATS:
+                logger.warning(
+                    "Possível N+1: statement repetido na request",
+                    extra={**context, "repeat_count": repeats, "statement": _compact(statement)},
+                )
+
+        if EMIT_HEADERS:
+            response.headers["X-DB-Queries"] = str(profile["count"])
+            timing = f'db;dur={db_ms};desc="{profile["count"]} queries"'
+            existing = response.headers.get("Server-Timing")
+            response.headers["Server-Timing"] = f"{existing}, {timing}" if existing else timing
+        return response
+
+    # O engine é compartilhado entre apps (create_app pode rodar mais de uma vez)
+    if getattr(engine, "_db_profiler_instrumented", False):
+        return
+    engine._db_profiler_instrumented = True
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_db_profile_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["_db_profile_start"].pop()
+        if not has_request_context():
+            return
+        profile = g.get("_db_profile")
+        if profile is None:
+            return
+        profile["count"] += 1
+        profile["time"] += elapsed
+        # Mesmo SQL com parâmetros diferentes conta como repetição (N+1)
+        profile["statements"][statement] += 1
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            logger.warning(
+                "Query SQL lenta",
+                extra={
+                    "endpoint": request.path,
+                    "method": request.method,
+                    "duration_ms": round(elapsed * 1000, 2),
+                    "statement": _compact(statement),
+                },
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        # Statement que falhou não passa por after_cursor_execute: desempilha aqui
+        conn = exception_context.connection
+        stack = conn.info.get("_db_profile_start") if conn is not None else None
+        if stack:
+            stack.pop()
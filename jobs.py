@@ -0,0 +1,707 @@
+"""Jobs em lote para execução agendada (cron, Azure WebJobs, etc.).
+
+Uso:
+    python jobs.py suggestions [--workers 4] [--batch-size 500]
+    python jobs.py sync-queue [--workers 4] [--batch-size 50] [--once]
+    python jobs.py webhook-prune [--days 7]
+    python jobs.py consent-sweep [--batch-size 500] [--horizon-minutes 15]
+    python jobs.py archive [--retention-days 90] [--batch-size 1000] [--tables transactions ...]
+    python jobs.py restore --table transactions (--user-id U | --ids 1 2 3) [--undelete]
+    python jobs.py partitions [--ahead 3] [--retention-months 0]
+
+- suggestions: pré-computa as sugestões de todos os usuários com transações
+  na janela de análise e grava em `user_suggestions`, de onde o endpoint
+  `/suggestions` serve diretamente enquanto o resultado estiver fresco.
+- sync-queue: consome a fila `sync_requests` alimentada pelos webhooks,
+  sincronizando os consents de cada usuário em uma única passada.
+- webhook-prune: remove eventos de webhook e pedidos de sync antigos.
+- consent-sweep: marca como expired os consents vencidos e renova os tokens
+  dos consents com sync agendado, para que o sync não gaste chamadas com
+  consents mortos nem espere pelo endpoint de token.
+- archive / restore: move linhas com soft delete mais antigas que a retenção
+  para as tabelas `*_archive` (e de volta), mantendo as tabelas quentes
+  pequenas.
+- partitions: no Postgres com `transactions` particionada por mês (migração
+  c3f9a1e7d250), cria as partições dos próximos meses e desanexa as antigas.
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, timedelta, UTC
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, and_, or_, tuple_, select, literal, text, DateTime
+from sqlalchemy.orm import sessionmaker
+
+import backend
+from backend import (
+    Transaction, RecurringTransaction, UserSuggestion, SyncRequest, WebhookEvent, Consent, Installment, Investment,
+)
+from provider_registry import ProviderRegistry
+import recurrence
+import suggestions as suggestions_engine
+import token_cache
+from logger import logger
+
+SYNC_QUEUE_MAX_ATTEMPTS = int(os.getenv("SYNC_QUEUE_MAX_ATTEMPTS", "5"))
+SYNC_QUEUE_RETRY_SECONDS = int(os.getenv("SYNC_QUEUE_RETRY_SECONDS", "60"))  # multiplicado pela tentativa
+SYNC_QUEUE_STALE_SECONDS = int(os.getenv("SYNC_QUEUE_STALE_SECONDS", "900"))  # running abandonado (worker morreu)
+ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", "90"))
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+PARTITION_RETENTION_MONTHS = int(os.getenv("PARTITION_RETENTION_MONTHS", "0"))  # 0 = nunca desanexa
+
+# Tabelas quentes com soft delete que têm tabela de arquivo
+ARCHIVABLE = {model.__tablename__: model for model in (Transaction, Installment, Investment, Consent)}
+
+
+# ---------------------------------------------------------------------------
+# Sugestões em lote
+# ---------------------------------------------------------------------------
+def user_shards(session_db, since: date, workers: int) -> List[Tuple[str, str]]:
+    """Divide os usuários com transações na janela em faixas contíguas de user_id.
+
+    Faixas contíguas permitem que cada worker percorra o índice
+    (user_id, date) sequencialmente, sem listas IN gigantes.
+    """
+    user_ids = [
+        row[0] for row in session_db.query(Transaction.user_id).filter(
+            Transaction.deleted_at.is_(None),
+            Transaction.date >= since
+        ).distinct().order_by(Transaction.user_id)
+    ]
+    if not user_ids:
+        return []
+    size = -(-len(user_ids) // max(1, workers))  # divisão com arredondamento para cima
+    return [(user_ids[i], user_ids[min(i + size, len(user_ids)) - 1]) for i in range(0, len(user_ids), size)]
+
+
+def _store_suggestions(session_db, batch: List[UserSuggestion]) -> None:
+    """Upsert portável (SQLite/Postgres): remove e reinsere o lote."""
+    session_db.query(UserSuggestion).filter(
+        UserSuggestion.user_id.in_([s.user_id for s in batch])
+    ).delete(synchronize_session=False)
+    session_db.add_all(batch)
+    session_db.flush()
+
+
+def compute_suggestions_shard(first_user: str, last_user: str, today_iso: str, batch_size: int = 500) -> int:
+    """Calcula sugestões para a faixa [first_user, last_user] em uma única passada.
+
+    Executado em processo separado: cria engine própria em vez de herdar
+    conexões do processo pai.
+
+    Returns:
+        Quantidade de usuários processados.
+    """
+    engine = create_engine(backend.DB_URL, echo=False, future=True)
+    session_factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    today = date.fromisoformat(today_iso)
+    start, end = suggestions_engine.period_range(suggestions_engine.DEFAULT_PERIOD, today)
+    current_range, previous_range = suggestions_engine.month_ranges(today)
+    scan_start = min(start, previous_range[0])  # cobre a janela e a comparação mês a mês
+    processed = 0
+
+    session_db = session_factory()
+    try:
+        recurring = {}
+        for pattern in session_db.query(RecurringTransaction).filter(
+            RecurringTransaction.user_id >= first_user,
+            RecurringTransaction.user_id <= last_user,
+            RecurringTransaction.status == 'active',
+            RecurringTransaction.type == 'expense'
+        ):
+            if recurrence.is_current(pattern, today):
+                recurring.setdefault(pattern.user_id, []).append(pattern)
+
+        # Passada única ordenada por (user_id, date), em streaming
+        rows = session_db.query(
+            Transaction.user_id, Transaction.description, Transaction.amount, Transaction.type, Transaction.date
+        ).filter(
+            Transaction.user_id >= first_user,
+            Transaction.user_id <= last_user,
+            Transaction.deleted_at.is_(None),
+            Transaction.date >= scan_start
+        ).order_by(Transaction.user_id, Transaction.date).yield_per(5000)
+
+        batch: List[UserSuggestion] = []
+        for user_id, user_rows in itertools.groupby(rows, key=lambda row: row.user_id):
+            user_rows = list(user_rows)
+            window = [r for r in user_rows if r.date >= start]
+            if not window:
+                continue  # só aparece pela comparação mês a mês; endpoint calcula sob demanda
+            comparison = suggestions_engine.month_over_month(
+                suggestions_engine.aggregate_transactions(
+                    r for r in user_rows if current_range[0] <= r.date <= current_range[1]),
+                suggestions_engine.aggregate_transactions(
+                    r for r in user_rows if previous_range[0] <= r.date <= previous_range[1]),
+                current_range,
+                previous_range
+            )
+            payload = suggestions_engine.build_suggestions(
+                user_id, suggestions_engine.aggregate_transactions(window), recurring.get(user_id, []),
+                start, end, suggestions_engine.DEFAULT_PERIOD, comparison
+            )
+            batch.append(UserSuggestion(
+                user_id=user_id,
+                payload=json.dumps(payload, ensure_ascii=False),
+                period_end=today,
+                computed_at=datetime.now()
+            ))
+            if len(batch) >= batch_size:
+                _store_suggestions(session_db, batch)
+                processed += len(batch)
+                batch = []
+        if batch:
+            _store_suggestions(session_db, batch)
+            processed += len(batch)
+        session_db.commit()
+    except Exception:
+        session_db.rollback()
+        raise
+    finally:
+        session_db.close()
+        engine.dispose()
+    return processed
+
+
+def run_suggestions(workers: int = 1, batch_size: int = 500) -> int:
+    """Pré-computa sugestões de todos os usuários, paralelizando por faixa de usuários."""
+    start_time = time.time()
+    today = date.today()
+    if workers > 1 and backend.DB_URL.startswith("sqlite"):
+        # SQLite serializa escritas: processos paralelos só disputariam o lock
+        logger.warning("SQLite não suporta escrita paralela; executando com 1 worker")
+        workers = 1
+    session_db = backend.get_session_local()()
+    try:
+        shards = user_shards(session_db, today - timedelta(days=suggestions_engine.WINDOW_DAYS), workers)
+    finally:
+        session_db.close()
+
+    if len(shards) <= 1 or workers <= 1:
+        total = sum(compute_suggestions_shard(first, last, today.isoformat(), batch_size) for first, last in shards)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(compute_suggestions_shard, first, last, today.isoformat(), batch_size)
+                for first, last in shards
+            ]
+            total = sum(f.result() for f in futures)
+
+    duration_ms = (time.time() - start_time) * 1000
+    logger.info("Sugestões pré-computadas", extra={"users": total, "shards": len(shards), "duration_ms": round(duration_ms, 2)})
+    return total
+
+
+# ---------------------------------------------------------------------------
+# Fila de sync (webhooks)
+# ---------------------------------------------------------------------------
+def claim_sync_requests(session_db, limit: int) -> List[Tuple[int, str]]:
+    """Marca até `limit` pedidos disponíveis como running e retorna (id, user_id).
+
+    No Postgres usa FOR UPDATE SKIP LOCKED, então vários workers dividem a fila
+    sem pegar o mesmo pedido. Pedidos `running` parados há mais de
+    SYNC_QUEUE_STALE_SECONDS (worker que morreu) voltam a ser elegíveis.
+    """
+    now = datetime.now()
+    claimed = session_db.query(SyncRequest).filter(or_(
+        and_(SyncRequest.status == 'pending', SyncRequest.available_at <= now),
+        and_(SyncRequest.status == 'running', SyncRequest.updated_at < now - timedelta(seconds=SYNC_QUEUE_STALE_SECONDS)),
+    )).order_by(SyncRequest.available_at, SyncRequest.id).limit(limit).with_for_update(skip_locked=True).all()
+    for sync_request in claimed:
+        sync_request.status = 'running'
+        sync_request.attempts += 1
+        sync_request.updated_at = now
+    result = [(r.id, r.user_id) for r in claimed]
+    session_db.commit()
+    return result
+
+
+def process_user_sync(registry: ProviderRegistry, user_id: str, request_ids: List[int]) -> Dict[str, int]:
+    """Sincroniza os consents pedidos de um usuário em uma passada e atualiza a fila.
+
+    Roda em thread do pool: usa a sessão thread-local e a libera no final.
+    Todos os pedidos de um mesmo consent recebem o resultado do sync desse consent.
+
+    Returns:
+        Contagem de pedidos por status final (done / pending / failed).
+    """
+    session_factory = backend.get_session_local()
+    session_db = session_factory()
+    try:
+        requested = {r.consent_id for r in session_db.query(SyncRequest.consent_id).filter(SyncRequest.id.in_(request_ids))}
+        consents = [c for c in backend.active_consents(session_db, user_id) if c.consent_id in requested]
+        errors: Dict[str, Exception] = {}
+        if consents:
+            try:
+                result = backend.sync_open_finance(session_db, registry, user_id, consents)
+                errors = {f["consent_id"]: RuntimeError(f["error"]) for f in result["failed"]}
+            except Exception as e:
+                session_db.rollback()
+                errors = {c.consent_id: e for c in consents}
+
+        sync_requests = session_db.query(SyncRequest).filter(SyncRequest.id.in_(request_ids)).order_by(SyncRequest.id).all()
+        # Consents que já têm outro pedido pendente (webhook chegou durante o sync): esse pedido refaz o sync
+        retrying = {row[0] for row in session_db.query(SyncRequest.consent_id).filter(
+            SyncRequest.status == 'pending',
+            SyncRequest.consent_id.in_(list(errors)),
+            SyncRequest.id.notin_(request_ids)
+        )} if errors else set()
+        counts = {"done": 0, "pending": 0, "failed": 0}
+        now = datetime.now()
+        for sync_request in sync_requests:
+            error = errors.get(sync_request.consent_id)
+            if error is None:
+                # Sincronizado, ou consent não está mais ativo (nada a fazer)
+                sync_request.status, sync_request.last_error = 'done', None
+            elif sync_request.consent_id in retrying:
+                # Só cabe um pendente por consent (uq_sync_request_pending_consent)
+                sync_request.status, sync_request.last_error = 'done', f"coalesced: {error}"[:512]
+            elif sync_request.attempts < SYNC_QUEUE_MAX_ATTEMPTS:
+                delay = getattr(error, "retry_after", None) or SYNC_QUEUE_RETRY_SECONDS * sync_request.attempts
+                sync_request.status, sync_request.last_error = 'pending', str(error)[:512]
+                sync_request.available_at = now + timedelta(seconds=delay)
+                retrying.add(sync_request.consent_id)
+            else:
+                sync_request.status, sync_request.last_error = 'failed', str(error)[:512]
+            counts[sync_request.status] += 1
+        session_db.commit()
+        return counts
+    finally:
+        session_factory.remove()
+
+
+def run_sync_queue(workers: int = 4, batch_size: int = 50, once: bool = False, poll_interval: float = 5.0) -> Dict[str, int]:
+    """Consome a fila de syncs. Com `once`, para quando não houver pedido disponível."""
+    registry = ProviderRegistry.from_env()
+    totals = {"done": 0, "pending": 0, "failed": 0}
+    session_factory = backend.get_session_local()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while True:
+            start_time = time.time()
+            try:
+                claimed = claim_sync_requests(session_factory(), batch_size)
+            finally:
+                session_factory.remove()
+            if not claimed:
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+            by_user: Dict[str, List[int]] = {}
+            for request_id, user_id in claimed:
+                by_user.setdefault(user_id, []).append(request_id)
+            futures = [pool.submit(process_user_sync, registry, user_id, ids) for user_id, ids in by_user.items()]
+            for future in futures:
+                for status, count in future.result().items():
+                    totals[status] += count
+            duration_ms = (time.time() - start_time) * 1000
+            logger.info("Lote da fila de sync processado", extra={"requests": len(claimed), "users": len(by_user), "duration_ms": round(duration_ms, 2)})
+    logger.info("Fila de sync drenada", extra=totals)
+    return totals
+
+
+def prune_webhook_data(days: int = 7) -> Dict[str, int]:
+    """Remove eventos de webhook e pedidos de sync concluídos mais antigos que `days`."""
+    cutoff = datetime.now() - timedelta(days=days)
+    session_db = backend.get_session_local()()
+    try:
+        events = session_db.query(WebhookEvent).filter(WebhookEvent.received_at < cutoff).delete(synchronize_session=False)
+        requests_removed = session_db.query(SyncRequest).filter(
+            SyncRequest.status.in_(['done', 'failed']),
+            SyncRequest.updated_at < cutoff
+        ).delete(synchronize_session=False)
+        session_db.commit()
+    finally:
+        session_db.close()
+    logger.info("Limpeza de webhooks concluída", extra={"webhook_events": events, "sync_requests": requests_removed})
+    return {"webhook_events": events, "sync_requests": requests_removed}
+
+
+# ---------------------------------------------------------------------------
+# Sweep de consents
+# ---------------------------------------------------------------------------
+def expire_consents(batch_size: int = 500) -> int:
+    """Marca como expired os consents ativos com `expires_at` vencido, em lotes.
+
+    Percorre os ativos por keyset em (user_id, id), atendido pelo índice
+    idx_consent_live_user_status, com um UPDATE por lote. Pedidos de sync pendentes
+    desses consents saem da fila no mesmo commit.
+
+    Returns:
+        Quantidade de consents expirados.
+    """
+    now = backend.to_naive_utc(datetime.now(UTC))
+    session_db = backend.get_session_local()()
+    expired, last_key = 0, ("", 0)
+    try:
+        while True:
+            rows = session_db.query(Consent.id, Consent.user_id, Consent.consent_id).filter(
+                Consent.status == 'active',
+                tuple_(Consent.user_id, Consent.id) > tuple_(*last_key),
+                Consent.deleted_at.is_(None),
+                Consent.expires_at <= now
+            ).order_by(Consent.user_id, Consent.id).limit(batch_size).all()
+            if not rows:
+                break
+            last_key = (rows[-1].user_id, rows[-1].id)
+            expired += session_db.query(Consent).filter(
+                Consent.id.in_([r.id for r in rows]),
+                Consent.status == 'active'
+            ).update({Consent.status: 'expired'}, synchronize_session=False)
+            session_db.query(SyncRequest).filter(
+                SyncRequest.consent_id.in_([r.consent_id for r in rows]),
+                SyncRequest.status == 'pending'
+            ).update({SyncRequest.status: 'done', SyncRequest.last_error: 'consent_expired'}, synchronize_session=False)
+            session_db.commit()
+    finally:
+        session_db.close()
+    return expired
+
+
+def prewarm_tokens(registry: ProviderRegistry, horizon: timedelta, workers: int = 4) -> Dict[str, int]:
+    """Renova os tokens dos consents com sync agendado até `now + horizon`.
+
+    Só tem efeito fora deste processo com TOKEN_CACHE_PATH: os workers relêem o
+    arquivo antes de pedir um token. Sem ele, os tokens morreriam com o job e
+    cada renovação seria uma chamada desperdiçada, então nada é feito.
+    """
+    counts = {"warmed": 0, "skipped": 0, "failed": 0}
+    if not token_cache.TOKEN_CACHE_PATH:
+        logger.warning("TOKEN_CACHE_PATH não definido; pré-renovação de tokens ignorada",
+                       extra={"error_code": "token_prewarm_disabled"})
+        return counts
+
+    session_db = backend.get_session_local()()
+    try:
+        due = session_db.query(Consent.consent_id, Consent.provider).join(
+            SyncRequest, SyncRequest.consent_id == Consent.consent_id
+        ).filter(
+            SyncRequest.status == 'pending',
+            SyncRequest.available_at <= datetime.now() + horizon,
+            Consent.status == 'active',
+            Consent.deleted_at.is_(None),
+            backend.consent_not_expired()
+        ).distinct().all()
+    finally:
+        session_db.close()
+
+    def warm(row) -> str:
+        try:
+            return "warmed" if registry.get(row.provider).warm_token(row.consent_id) else "skipped"
+        except Exception as e:
+            logger.warning("Falha ao renovar token do consent", extra={"error": str(e), "error_code": "token_prewarm_failed"})
+            return "failed"
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for outcome in pool.map(warm, due):
+            counts[outcome] += 1
+    return counts
+
+
+def run_consent_sweep(batch_size: int = 500, horizon_minutes: int = 15, workers: int = 4,
+                      prewarm: bool = True) -> Dict[str, int]:
+    start_time = time.time()
+    result = {"expired": expire_consents(batch_size)}
+    if prewarm:
+        result.update(prewarm_tokens(ProviderRegistry.from_env(), timedelta(minutes=horizon_minutes), workers))
+    duration_ms = (time.time() - start_time) * 1000
+    logger.info("Sweep de consents concluído", extra={**result, "duration_ms": round(duration_ms, 2)})
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Arquivamento de linhas com soft delete
+# ---------------------------------------------------------------------------
+def archive_deleted(table_name: str, retention_days: int = ARCHIVE_RETENTION_DAYS, batch_size: int = 1000,
+                    max_batches: Optional[int] = None) -> int:
+    """Move para `<tabela>_archive` as linhas com `deleted_at` anterior à retenção.
+
+    Cada lote é INSERT ... SELECT + DELETE na mesma transação, então a linha
+    nunca fica nas duas tabelas nem se perde. Os lotes são pequenos para manter
+    os locks curtos. No Postgres, SKIP LOCKED deixa dois jobs rodarem juntos.
+
+    Returns:
+        Quantidade de linhas arquivadas.
+    """
+    hot = ARCHIVABLE[table_name].__table__
+    cold = backend.ARCHIVE_TABLES[table_name]
+    cutoff = backend.to_naive_utc(datetime.now(UTC)) - timedelta(days=retention_days)
+    session_db = backend.get_session_local()()
+    moved = 0
+    try:
+        for _ in (range(max_batches) if max_batches else itertools.count()):
+            ids = session_db.execute(
+                select(hot.c.id).where(hot.c.deleted_at.isnot(None), hot.c.deleted_at < cutoff)
+                .order_by(hot.c.deleted_at).limit(batch_size).with_for_update(skip_locked=True)
+            ).scalars().all()
+            if not ids:
+                break
+            archived_at = literal(datetime.now(), DateTime)
+            session_db.execute(cold.insert().from_select(
+                [c.name for c in hot.columns] + ["archived_at"],
+                select(*hot.columns, archived_at).where(hot.c.id.in_(ids))
+            ))
+            session_db.execute(hot.delete().where(hot.c.id.in_(ids)))
+            session_db.commit()
+            moved += len(ids)
+    finally:
+        session_db.close()
+    return moved
+
+
+def run_archive(tables: Optional[List[str]] = None, retention_days: int = ARCHIVE_RETENTION_DAYS,
+                batch_size: int = 1000, max_batches: Optional[int] = None) -> Dict[str, int]:
+    start_time = time.time()
+    result = {
+        table: archive_deleted(table, retention_days, batch_size, max_batches)
+        for table in (tables or list(ARCHIVABLE))
+    }
+    duration_ms = (time.time() - start_time) * 1000
+    logger.info("Arquivamento concluído", extra={**result, "duration_ms": round(duration_ms, 2)})
+    return result
+
+
+def restore_archived(table_name: str, user_id: Optional[str] = None, ids: Optional[List[int]] = None,
+                     undelete: bool = False, batch_size: int = 1000) -> Dict[str, int]:
+    """Devolve linhas de `<tabela>_archive` para a tabela quente, por usuário e/ou ids.
+
+    A linha volta com o id original. Se o id foi reusado na tabela quente (ou
+    por outra linha arquivada com o mesmo id), ela volta com id novo
+    (`renumbered`). Linhas que violariam uma coluna única (ex.: consent_id
+    recriado, ou duas versões arquivadas do mesmo consent_id) ficam no arquivo
+    (`conflicts`). Com `undelete`, `deleted_at` é limpo e a linha reaparece na API.
+    """
+    hot = ARCHIVABLE[table_name].__table__
+    cold = backend.ARCHIVE_TABLES[table_name]
+    criteria = []
+    if user_id:
+        criteria.append(cold.c.user_id == user_id)
+    if ids:
+        criteria.append(cold.c.id.in_(ids))
+    if not criteria:
+        raise ValueError("Informe user_id e/ou ids para restaurar")
+    unique_columns = [c.name for c in hot.columns if c.unique]
+    counts = {"restored": 0, "renumbered": 0, "conflicts": 0}
+    session_db = backend.get_session_local()()
+    last_archive_id = 0
+    try:
+        while True:
+            rows = session_db.execute(
+                select(cold).where(*criteria, cold.c.archive_id > last_archive_id)
+                .order_by(cold.c.archive_id).limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+            last_archive_id = rows[-1]["archive_id"]
+            taken_ids = set(session_db.execute(select(hot.c.id).where(hot.c.id.in_([r["id"] for r in rows]))).scalars())
+            taken_unique = {
+                name: set(session_db.execute(select(hot.c[name]).where(hot.c[name].in_([r[name] for r in rows]))).scalars())
+                for name in unique_columns
+            }
+            keep_id, new_id, restored = [], [], []
+            for row in rows:
+                # Os conjuntos crescem com as linhas aceitas: cobre repetições dentro do lote
+                if any(row[name] in taken_unique[name] for name in unique_columns):
+                    counts["conflicts"] += 1
+                    continue
+                for name in unique_columns:
+                    taken_unique[name].add(row[name])
+                values = {key: value for key, value in row.items() if key not in ("archive_id", "archived_at")}
+                if undelete:
+                    values["deleted_at"] = None
+                if row["id"] in taken_ids:
+                    values.pop("id")
+                    new_id.append(values)
+                else:
+                    taken_ids.add(row["id"])
+                    keep_id.append(values)
+                restored.append(row["archive_id"])
+            for batch in (keep_id, new_id):
+                if batch:
+                    session_db.execute(hot.insert(), batch)
+            if restored:
+                session_db.execute(cold.delete().where(cold.c.archive_id.in_(restored)))
+            if undelete and table_name == "transactions":
+                for restored_user in {r["user_id"] for r in rows}:
+                    backend.invalidate_suggestions(session_db, restored_user)
+            session_db.commit()
+            counts["restored"] += len(restored)
+            counts["renumbered"] += len(new_id)
+    finally:
+        session_db.close()
+    logger.info("Restauração do arquivo concluída", extra={"user_id": user_id, **counts})
+    return counts
+
+
+# ---------------------------------------------------------------------------
+# Partições mensais de transactions (Postgres)
+# ---------------------------------------------------------------------------
+_BOUND_VALUE = r"(MINVALUE|MAXVALUE|'(\d{4}-\d{2}-\d{2})')"
+_BOUND_RE = re.compile(rf"FROM \({_BOUND_VALUE}\) TO \({_BOUND_VALUE}\)")
+_MONTH_PARTITION_RE = re.compile(r"^transactions_p\d{4}_\d{2}$")
+
+
+def parse_partition_bound(expr: str) -> Tuple[Optional[date], Optional[date]]:
+    """"FOR VALUES FROM ('2026-10-01') TO (MAXVALUE)" → (date(2026, 10, 1), None)."""
+    match = _BOUND_RE.search(expr)
+    if not match:
+        raise ValueError(f"Limite de partição inesperado: {expr}")
+    lower, upper = match.group(2), match.group(4)
+    return (date.fromisoformat(lower) if lower else None, date.fromisoformat(upper) if upper else None)
+
+
+def month_partitions(start: date, end: date) -> List[Tuple[str, date, date]]:
+    """Partições mensais (nome, início, fim exclusivo) cobrindo [start, end)."""
+    result, month = [], start.replace(day=1)
+    while month < end:
+        following = backend.add_months(month, 1)
+        result.append((f"transactions_p{month:%Y_%m}", month, following))
+        month = following
+    return result
+
+
+def transaction_partitions(conn) -> Dict[str, Tuple[Optional[date], Optional[date]]]:
+    """Partições anexadas a `transactions` com seus limites; vazio se a tabela não é particionada."""
+    if conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('transactions')")).scalar() != 'p':
+        return {}
+    rows = conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = 'transactions'::regclass"
+    ))
+    return {name: parse_partition_bound(expr) for name, expr in rows}
+
+
+def extend_partitions(conn, until: date) -> List[str]:
+    """Cria as partições mensais até `until` (exclusivo), tirando o intervalo de transactions_pfuture.
+
+    A pfuture é desanexada, as linhas do intervalo novo são movidas para as
+    partições criadas e ela volta com o novo limite inferior, tudo na mesma transação.
+    """
+    lower, _ = transaction_partitions(conn)["transactions_pfuture"]
+    if lower >= until:
+        return []
+    created = month_partitions(lower, until)
+    until = created[-1][2]
+    conn.execute(text("ALTER TABLE transactions DETACH PARTITION transactions_pfuture"))
+    for name, start, end in created:
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF transactions FOR VALUES FROM ('{start}') TO ('{end}')"))
+    conn.execute(text(f"INSERT INTO transactions SELECT * FROM transactions_pfuture WHERE date < '{until}'"))
+    conn.execute(text(f"DELETE FROM transactions_pfuture WHERE date < '{until}'"))
+    conn.execute(text(f"ALTER TABLE transactions ATTACH PARTITION transactions_pfuture FOR VALUES FROM ('{until}') TO (MAXVALUE)"))
+    return [name for name, _, _ in created]
+
+
+def detach_partitions(conn, before: date) -> List[str]:
+    """Desanexa as partições mensais inteiramente anteriores a `before`.
+
+    As tabelas desanexadas continuam no banco (fora das queries da API) e podem
+    ser exportadas ou removidas com DROP. transactions_ppast passa a cobrir até
+    `before`, para lançamentos retroativos continuarem aceitos.
+    """
+    partitions = transaction_partitions(conn)
+    old = sorted(name for name, (_, upper) in partitions.items()
+                 if _MONTH_PARTITION_RE.match(name) and upper <= before)
+    if not old:
+        return []
+    for name in old:
+        conn.execute(text(f"ALTER TABLE transactions DETACH PARTITION {name}"))
+    _, past_upper = partitions["transactions_ppast"]
+    conn.execute(text("ALTER TABLE transactions DETACH PARTITION transactions_ppast"))
+    if conn.execute(text("SELECT EXISTS (SELECT 1 FROM transactions_ppast)")).scalar():
+        conn.execute(text(f"ALTER TABLE transactions_ppast RENAME TO transactions_ppast_before_{past_upper:%Y_%m}"))
+        old.append(f"transactions_ppast_before_{past_upper:%Y_%m}")
+    else:
+        conn.execute(text("DROP TABLE transactions_ppast"))
+    conn.execute(text(f"CREATE TABLE transactions_ppast PARTITION OF transactions FOR VALUES FROM (MINVALUE) TO ('{before}')"))
+    return old
+
+
+def run_partitions(ahead: int = PARTITION_MONTHS_AHEAD, retention_months: int = PARTITION_RETENTION_MONTHS) -> Dict[str, List[str]]:
+    """Manutenção das partições de transactions (no-op fora do Postgres particionado)."""
+    engine = backend.get_engine()
+    if engine.dialect.name != "postgresql":
+        logger.warning("Particionamento de transactions só existe no PostgreSQL; nada a fazer")
+        return {"created": [], "detached": []}
+    this_month = date.today().replace(day=1)
+    with engine.begin() as conn:
+        if not transaction_partitions(conn):
+            logger.warning("transactions não é particionada (migração c3f9a1e7d250 com TRANSACTIONS_PARTITIONED=true)")
+            return {"created": [], "detached": []}
+        created = extend_partitions(conn, backend.add_months(this_month, ahead + 1))
+    detached = []
+    if retention_months > 0:
+        with engine.begin() as conn:
+            detached = detach_partitions(conn, backend.add_months(this_month, -retention_months))
+    logger.info("Manutenção de partições concluída", extra={"created": created, "detached": detached})
+    return {"created": created, "detached": detached}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Jobs em lote do Gestor Financeiro")
+    subparsers = parser.add_subparsers(dest="job", required=True)
+
+    p_suggestions = subparsers.add_parser("suggestions", help="Pré-computa sugestões de todos os usuários")
+    p_suggestions.add_argument("--workers", type=int, default=1, help="Processos paralelos (um por faixa de usuários)")
+    p_suggestions.add_argument("--batch-size", type=int, default=500, help="Usuários gravados por lote")
+
+    p_queue = subparsers.add_parser("sync-queue", help="Consome a fila de syncs disparados por webhooks")
+    p_queue.add_argument("--workers", type=int, default=4, help="Usuários sincronizados em paralelo (threads)")
+    p_queue.add_argument("--batch-size", type=int, default=50, help="Pedidos reservados por vez")
+    p_queue.add_argument("--once", action="store_true", help="Sai quando a fila estiver vazia (cron)")
+    p_queue.add_argument("--poll-interval", type=float, default=5.0, help="Segundos entre consultas com a fila vazia")
+
+    p_prune = subparsers.add_parser("webhook-prune", help="Remove eventos de webhook e pedidos de sync antigos")
+    p_prune.add_argument("--days", type=int, default=7, help="Retenção em dias (janela de dedupe de reenvios)")
+
+    p_sweep = subparsers.add_parser("consent-sweep", help="Expira consents vencidos e renova tokens de syncs agendados")
+    p_sweep.add_argument("--batch-size", type=int, default=500, help="Consents por UPDATE")
+    p_sweep.add_argument("--horizon-minutes", type=int, default=15, help="Renova tokens de syncs agendados até este horizonte")
+    p_sweep.add_argument("--workers", type=int, default=4, help="Renovações de token em paralelo")
+    p_sweep.add_argument("--no-prewarm", action="store_true", help="Só expira consents")
+
+    p_archive = subparsers.add_parser("archive", help="Move linhas com soft delete antigas para as tabelas *_archive")
+    p_archive.add_argument("--retention-days", type=int, default=ARCHIVE_RETENTION_DAYS, help="Dias após o soft delete antes de arquivar")
+    p_archive.add_argument("--batch-size", type=int, default=1000, help="Linhas por transação")
+    p_archive.add_argument("--max-batches", type=int, help="Limita os lotes por tabela nesta execução")
+    p_archive.add_argument("--tables", nargs="+", choices=sorted(ARCHIVABLE), help="Padrão: todas")
+
+    p_restore = subparsers.add_parser("restore", help="Devolve linhas arquivadas para a tabela quente")
+    p_restore.add_argument("--table", required=True, choices=sorted(ARCHIVABLE))
+    p_restore.add_argument("--user-id", help="Restaura as linhas arquivadas do usuário")
+    p_restore.add_argument("--ids", type=int, nargs="+", help="Restaura só estes ids")
+    p_restore.add_argument("--undelete", action="store_true", help="Limpa deleted_at (a linha volta a aparecer na API)")
+
+    p_partitions = subparsers.add_parser("partitions", help="Cria partições futuras e desanexa antigas (Postgres)")
+    p_partitions.add_argument("--ahead", type=int, default=PARTITION_MONTHS_AHEAD, help="Meses futuros com partição própria")
+    p_partitions.add_argument("--retention-months", type=int, default=PARTITION_RETENTION_MONTHS,
+                              help="Desanexa partições mais antigas que isso (0 = nunca)")
+
+    args = parser.parse_args(argv)
+    if args.job == "restore" and not (args.user_id or args.ids):
+        parser.error("restore: informe --user-id e/ou --ids")
+    if args.job == "suggestions":
+        run_suggestions(workers=args.workers, batch_size=args.batch_size)
+    elif args.job == "sync-queue":
+        run_sync_queue(workers=args.workers, batch_size=args.batch_size, once=args.once, poll_interval=args.poll_interval)
+    elif args.job == "webhook-prune":
+        prune_webhook_data(days=args.days)
+    elif args.job == "consent-sweep":
+        run_consent_sweep(batch_size=args.batch_size, horizon_minutes=args.horizon_minutes,
+                          workers=args.workers, prewarm=not args.no_prewarm)
+    elif args.job == "archive":
+        run_archive(tables=args.tables, retention_days=args.retention_days,
+                    batch_size=args.batch_size, max_batches=args.max_batches)
+    elif args.job == "restore":
+        restore_archived(args.table, user_id=args.user_id, ids=args.ids, undelete=args.undelete)
+    elif args.job == "partitions":
+        run_partitions(ahead=args.ahead, retention_months=args.retention_months)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,217 @@
 """Módulo de logging estruturado em JSON para ambiente de produção.
 
 Fornece formatação JSON com campos contextuais (user_id, endpoint, duration, error_code).
+
+Modos opcionais (via env):
+- `LOG_ASYNC=true`: o request thread só enfileira o record (QueueHandler); a
+  formatação e a escrita em stdout acontecem em um thread QueueListener,
+  iniciado no primeiro log de cada processo (workers forkados incluídos).
+- `LOG_SAMPLING="INFO=0.1"`: mantém apenas a fração indicada dos logs de cada
+  nível listado (níveis não listados, como WARNING/ERROR, nunca são amostrados).
+
+Campos de contexto (request_id, user_id, endpoint...) vêm de um `ContextVar`
+preenchido por request (`bind_log_context`) e injetado por `ContextFilter`.
 """
+import atexit
 import logging
 import json
+import queue
+import random
 import sys
+import threading
 from datetime import datetime, UTC
-from typing import Optional
+from logging.handlers import QueueHandler, QueueListener
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Optional, TextIO
 import os
 
+# Atributos próprios do LogRecord; todo o resto (campos de `extra=` e do
+# contexto) vai para o JSON
+_RECORD_ATTRS = frozenset(logging.LogRecord("", logging.INFO, "", 0, "", None, None).__dict__) | {
+    "message", "asctime", "taskName",
+}
+
+
+def parse_sampling(spec: str) -> Dict[int, float]:
+    """Converte "INFO=0.1,DEBUG=0" em {logging.INFO: 0.1, logging.DEBUG: 0.0}."""
+    rates: Dict[int, float] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        level_name, _, rate = item.partition("=")
+        level = logging.getLevelName(level_name.strip().upper())
+        if isinstance(level, int) and rate:
+            rates[level] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+LOG_ASYNC = os.getenv("LOG_ASYNC", "false").lower() == "true"
+LOG_SAMPLING = parse_sampling(os.getenv("LOG_SAMPLING", ""))
+
+
 class StructuredFormatter(logging.Formatter):
-    """Formata logs como JSON estruturado."""
+    """Formata logs como JSON estruturado.
+
+    Usa `record.created` (instante do log, não da formatação) e reaproveita o
+    prefixo do timestamp dentro do mesmo segundo; o encoder JSON é criado uma vez.
+    """
+
+    _encode = json.JSONEncoder(ensure_ascii=False, default=str).encode
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._second_cache = (None, "")
+
+    def _timestamp(self, created: float) -> str:
+        second = int(created)
+        cached_second, prefix = self._second_cache
+        if cached_second != second:
+            prefix = datetime.fromtimestamp(second, UTC).strftime("%Y-%m-%dT%H:%M:%S")
+            self._second_cache = (second, prefix)
+        return f"{prefix}.{int((created - second) * 1_000_000):06d}+00:00"
 
     def format(self, record: logging.LogRecord) -> str:
         log_obj = {
-            "timestamp": datetime.now(UTC).isoformat(),
+            "timestamp": self._timestamp(record.created),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
         }
         
-        # Adiciona campos customizados se presentes em record.__dict__
-        custom_fields = ["user_id", "endpoint", "method", "status_code", "duration_ms", "error_code"]
-        for field in custom_fields:
-            if hasattr(record, field):
-                value = getattr(record, field, None)
-                if value is not None:
-                    log_obj[field] = value
+        # Campos de `extra=`/contexto: tudo que não é atributo padrão do record
+        for field, value in record.__dict__.items():
+            if value is not None and field not in _RECORD_ATTRS and field not in log_obj:
+                log_obj[field] = value
         
         # Inclui exceção se houver
         if record.exc_info:
             log_obj["exception"] = self.formatException(record.exc_info)
         
-        return json.dumps(log_obj, ensure_ascii=False)
+        return self._encode(log_obj)
+
+
+# Contexto de log da request/tarefa atual. contextvars isola threads (gthread)
+# e tarefas; o dict nunca é mutado, cada bind cria uma cópia.
+_log_context: ContextVar[Dict[str, Any]] = ContextVar("log_context", default={})
+
+
+def bind_log_context(**fields) -> Token:
+    """Acrescenta campos ao contexto de log atual; devolve o token para `reset_log_context`."""
+    return _log_context.set({**_log_context.get(), **fields})
+
+
+def reset_log_context(token: Token) -> None:
+    _log_context.reset(token)
+
+
+def get_log_context() -> Dict[str, Any]:
+    return dict(_log_context.get())
+
+
+class ContextFilter(logging.Filter):
+    """Injeta os campos do contexto atual em cada record (sem sobrescrever `extra=`)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        if context:
+            fields = record.__dict__
+            for key, value in context.items():
+                if key not in fields:
+                    fields[key] = value
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Descarta aleatoriamente logs dos níveis configurados (ex.: INFO de alto volume)."""
+
+    def __init__(self, rates: Dict[int, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.levelno)
+        return rate is None or random.random() < rate
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """QueueHandler que não formata no thread chamador e tem um listener por processo.
+
+    O `QueueHandler` padrão formata o record em `prepare` (pensado para filas
+    entre processos); aqui a fila é em memória, então só resolvemos a mensagem
+    e deixamos a formatação JSON para o listener.
+
+    O thread do listener não sobrevive a um fork (workers gunicorn com preload):
+    no primeiro log de cada processo, fila e listener são criados de novo.
+    """
+
+    def __init__(self, target: logging.Handler):
+        super().__init__(queue.SimpleQueue())
+        self.target = target
+        self.listener: Optional[QueueListener] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.stop_listener)
+
+    def _ensure_listener(self) -> None:
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            self.queue = queue.SimpleQueue()  # a fila herdada pode ter ficado com lock preso no fork
+            self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+            self.listener.start()
+            self._pid = pid
+
+    def _at_fork_reinit(self) -> None:
+        # logging chama isto no filho após o fork; o lock de partida pode ter sido herdado preso
+        super()._at_fork_reinit()
+        self._start_lock = threading.Lock()
+
+    def stop_listener(self) -> None:
+        """Drena a fila e para o listener deste processo (idempotente)."""
+        with self._start_lock:
+            if self._pid == os.getpid() and self.listener is not None:
+                self.listener.stop()
+            self.listener = None
+            self._pid = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self._ensure_listener()
+        super().emit(record)
+
+
+def configure_logger(
+    logger: logging.Logger,
+    stream: TextIO = sys.stdout,
+    async_mode: bool = LOG_ASYNC,
+    sampling: Optional[Dict[int, float]] = None,
+) -> Optional[_InProcessQueueHandler]:
+    """Anexa o handler JSON ao logger (direto ou via fila) e o filtro de amostragem.
+
+    Returns:
+        Em modo assíncrono, o handler de fila (`stop_listener()` drena a fila;
+        também chamado no atexit), senão None.
+    """
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(StructuredFormatter())
+
+    queue_handler = None
+    if async_mode:
+        queue_handler = _InProcessQueueHandler(handler)
+        logger.addHandler(queue_handler)
+    else:
+        logger.addHandler(handler)
+
+    if sampling:
+        logger.addFilter(SamplingFilter(sampling))
+    # Filtros do logger rodam no thread chamador, onde o contexto da request existe
+    logger.addFilter(ContextFilter())
+    return queue_handler
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -54,10 +233,8 @@ def get_logger(name: str) -> logging.Logger:
     level_str = os.getenv("LOG_LEVEL", "INFO").upper()
     logger.setLevel(getattr(logging, level_str, logging.INFO))
     
-    # Handler para stdout (production-friendly)
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(StructuredFormatter())
-    logger.addHandler(handler)
+    # Handler para stdout (production-friendly), síncrono ou via fila
+    configure_logger(logger, sys.stdout, LOG_ASYNC, LOG_SAMPLING)
     
     # Evita propagação para root logger
     logger.propagate = False
@@ -68,26 +245,16 @@ def get_logger(name: str) -> logging.Logger:
 class LogContext:
     """Context manager para adicionar campos estruturados ao log."""
     
-    def __init__(self, logger: logging.Logger, **fields):
+    def __init__(self, logger: Optional[logging.Logger] = None, **fields):
         self.logger = logger
         self.fields = fields
     
     def __enter__(self):
-        # Adiciona fields ao logger para próximo log
-        self._original_factory = logging.getLogRecordFactory()
-        
-        def custom_factory(*args, **kwargs):
-            record = self._original_factory(*args, **kwargs)
-            for key, value in self.fields.items():
-                setattr(record, key, value)
-            return record
-        
-        logging.setLogRecordFactory(custom_factory)
+        self._token = bind_log_context(**self.fields)
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        # Restaura factory original
-        logging.setLogRecordFactory(self._original_factory)
+        reset_log_context(self._token)
 
 
 # Logger padrão para backend
@@ -0,0 +1,270 @@
+"""Métricas da aplicação no formato texto do Prometheus.
+
+Registra latência por rota, quantidade/tempo de queries SQL por request e
+latência das chamadas HTTP aos provedores Open Finance, expostas em `/metrics`.
+
+Multi-processo (gunicorn): com `METRICS_MULTIPROC_DIR` definido, cada worker
+grava periodicamente um snapshot (`metrics_<pid>.json`) nesse diretório e o
+`/metrics` de qualquer worker agrega todos os snapshots. Sem a variável, as
+métricas são apenas do processo atual.
+"""
+from __future__ import annotations
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL_SECONDS", "5"))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> List:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """Valor instantâneo; entre processos, /metrics reporta o máximo."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def snapshot(self) -> List:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [contagens por bucket (não cumulativas) + overflow, soma]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def snapshot(self) -> List:
+        with self._lock:
+            return [[list(key), [list(state[0]), state[1]]] for key, state in self._values.items()]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._last_flush = 0.0
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, List]:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    # ------------------------------------------------------------------
+    # Multi-processo
+    # ------------------------------------------------------------------
+    def flush(self, force: bool = False) -> None:
+        """Grava o snapshot do processo em METRICS_MULTIPROC_DIR (no máximo a cada FLUSH_INTERVAL)."""
+        if not MULTIPROC_DIR:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        path = os.path.join(MULTIPROC_DIR, f"metrics_{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)  # escrita atômica
+
+    def _collect(self) -> List[Dict[str, List]]:
+        if not MULTIPROC_DIR:
+            return [self.snapshot()]
+        self.flush(force=True)
+        snapshots = []
+        for path in glob.glob(os.path.join(MULTIPROC_DIR, "metrics_*.json")):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # arquivo sendo substituído; próximo scrape lê
+        return snapshots
+
+    def render(self) -> str:
+        """Exposição no formato texto do Prometheus (agregando todos os processos)."""
+        snapshots = self._collect()
+        lines: List[str] = []
+        for name, metric in self._metrics.items():
+            merged: Dict[Tuple[str, ...], object] = {}
+            for snapshot in snapshots:
+                for key, value in snapshot.get(name, []):
+                    key = tuple(key)
+                    if isinstance(metric, Histogram):
+                        state = merged.setdefault(key, [[0] * (len(metric.buckets) + 1), 0.0])
+                        state[0] = [a + b for a, b in zip(state[0], value[0])]
+                        state[1] += value[1]
+                    elif isinstance(metric, Gauge):
+                        merged[key] = max(merged.get(key, value), value)
+                    else:
+                        merged[key] = merged.get(key, 0.0) + value
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(merged.items()):
+                labels = list(zip(metric.labelnames, key))
+                if isinstance(metric, Histogram):
+                    cumulative = 0
+                    for bound, count in zip(list(metric.buckets) + ["+Inf"], value[0]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labels + [('le', _fmt(bound))])} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_fmt(value[1])}")
+                    lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {_fmt(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _fmt(value) -> str:
+    if isinstance(value, str):
+        return value
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: List[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+REGISTRY = Registry()
+if MULTIPROC_DIR:
+    atexit.register(REGISTRY.flush, True)
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "Requests HTTP atendidas", ("method", "endpoint", "status"))
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "Latência das requests HTTP", ("method", "endpoint"))
+DB_QUERIES = REGISTRY.histogram(
+    "http_request_db_queries", "Queries SQL por request", ("endpoint",), COUNT_BUCKETS)
+DB_TIME = REGISTRY.histogram(
+    "http_request_db_duration_seconds", "Tempo total em SQL por request", ("endpoint",))
+PROVIDER_LATENCY = REGISTRY.histogram(
+    "provider_http_request_duration_seconds", "Latência das chamadas HTTP a provedores Open Finance",
+    ("provider", "operation", "status"))
+
+
+def _endpoint_label(request) -> str:
+    # Template da rota (ex.: /api/users/<user_id>/summary) mantém a cardinalidade baixa
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def init_app(app, engine) -> None:
+    """Registra hooks de latência por rota e listeners SQL de contagem/tempo."""
+    from flask import g, has_request_context, request
+    from sqlalchemy import event
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_start = time.perf_counter()
+        g._db_queries = 0
+        g._db_time = 0.0
+
+    @app.after_request
+    def _metrics_observe(response):
+        start = g.get("_metrics_start")
+        if start is None:
+            return response
+        endpoint = _endpoint_label(request)
+        HTTP_REQUESTS.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+        HTTP_LATENCY.observe(time.perf_counter() - start, method=request.method, endpoint=endpoint)
+        DB_QUERIES.observe(g._db_queries, endpoint=endpoint)
+        DB_TIME.observe(g._db_time, endpoint=endpoint)
+        REGISTRY.flush()
+        return response
+
+    # O engine é compartilhado entre apps (create_app pode rodar mais de uma vez)
+    if getattr(engine, "_metrics_instrumented", False):
+        return
+    engine._metrics_instrumented = True
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["_metrics_query_start"].pop()
+        if has_request_context() and "_metrics_start" in g:
+            g._db_queries += 1
+            g._db_time += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        # Statement que falhou não passa por after_cursor_execute: desempilha aqui
+        conn = exception_context.connection
+        stack = conn.info.get("_metrics_query_start") if conn is not None else None
+        if stack:
+            elapsed = time.perf_counter() - stack.pop()
+            if has_request_context() and "_metrics_start" in g:
+                g._db_queries += 1
+                g._db_time += elapsed
+
+
+def observe_provider_call(provider: str, operation: str, status, seconds: float) -> None:
+    """Registra a latência de uma chamada HTTP a um provedor."""
+    PROVIDER_LATENCY.observe(seconds, provider=provider, operation=operation, status=status)
@@ -0,0 +1,115 @@
+"""Profiling sob demanda de requests em produção (cProfile).
+
+Opt-in via `PROFILING_ENABLED=true`. Com o modo ligado, uma request é
+perfilada quando:
+
+- um usuário autorizado (admin) envia `X-Profile: 1` ou `?profile=1`; ou
+- cai na amostragem aleatória `PROFILING_SAMPLE_RATE` (0.0 a 1.0).
+
+O perfil cobre a view (e os demais hooks de request) e guarda as top-N
+funções por tempo cumulativo em um ring buffer em memória, por processo,
+lido pelos endpoints de admin. Desligado, nenhum hook é registrado.
+"""
+from __future__ import annotations
+import cProfile
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, UTC
+from typing import Callable, Dict, List, Optional
+
+ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+TOP_N = int(os.getenv("PROFILING_TOP_N", "25"))
+BUFFER_SIZE = int(os.getenv("PROFILING_BUFFER_SIZE", "50"))
+
+_profiles: deque = deque(maxlen=BUFFER_SIZE)
+_profiles_lock = threading.Lock()
+_ids = itertools.count(1)
+
+
+def _top_functions(profiler: cProfile.Profile, limit: int) -> List[Dict]:
+    """Top-N funções por tempo cumulativo (equivalente a pstats sort_stats('cumulative'))."""
+    profiler.create_stats()
+    rows = sorted(profiler.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "ncalls": ncalls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        }
+        for (filename, line, name), (_, ncalls, tottime, cumtime, _) in rows
+    ]
+
+
+def recent(limit: int = BUFFER_SIZE) -> List[Dict]:
+    """Resumo dos perfis mais recentes (sem a lista de funções)."""
+    with _profiles_lock:
+        items = list(_profiles)[-limit:]
+    return [{key: value for key, value in item.items() if key != "top"} for item in reversed(items)]
+
+
+def get(profile_id: int) -> Optional[Dict]:
+    with _profiles_lock:
+        return next((item for item in _profiles if item["id"] == profile_id), None)
+
+
+def init_app(app, is_authorized: Callable[[], bool]) -> None:
+    """Registra os hooks de profiling.
+
+    Args:
+        app: Aplicação Flask
+        is_authorized: Retorna True se o usuário da request pode pedir profiling explícito
+    """
+    from flask import g, request
+
+    def _trigger() -> Optional[str]:
+        if request.headers.get("X-Profile") == "1" or request.args.get("profile") == "1":
+            return "explicit" if is_authorized() else None
+        if SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE:
+            return "sample"
+        return None
+
+    @app.before_request
+    def _profile_start():
+        trigger = _trigger()
+        if trigger is None:
+            return
+        profiler = cProfile.Profile()
+        g._profile = (profiler, trigger, time.perf_counter())
+        profiler.enable()
+
+    @app.after_request
+    def _profile_stop(response):
+        state = g.pop("_profile", None)
+        if state is None:
+            return response
+        profiler, trigger, start = state
+        profiler.disable()
+        duration_ms = round((time.perf_counter() - start) * 1000, 2)
+        entry = {
+            "id": next(_ids),
+            "timestamp": datetime.now(UTC).isoformat(),
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.url_rule.rule if request.url_rule is not None else None,
+            "status_code": response.status_code,
+            "duration_ms": duration_ms,
+            "trigger": trigger,
+            "top": _top_functions(profiler, TOP_N),
+        }
+        with _profiles_lock:
+            _profiles.append(entry)
+        response.headers["X-Profile-Id"] = str(entry["id"])
+        return response
+
+    @app.teardown_request
+    def _profile_cleanup(exc):
+        # Request abortada antes do after_request: garante que o profiler seja desligado
+        state = g.pop("_profile", None)
+        if state is not None:
+            state[0].disable()
@@ -0,0 +1,106 @@
+"""Registro de provedores Open Finance por instituição.
+
+`Consent.provider` identifica a instituição do consentimento; o registro mapeia
+esse nome para uma instância configurada de `BaseProvider`, cada uma com sua
+própria `requests.Session` (pool de conexões), certificados mTLS e, se
+configurado, limite de taxa.
+
+Configuração (OPENFINANCE_PROVIDERS): JSON inline ou caminho de um arquivo JSON::
+
+    {
+      "banco_a": {"base_url": "https://api.banco-a.com.br/open-banking",
+                  "client_id": "...", "client_secret": "...",
+                  "cert_path": "/certs/a.pem", "key_path": "/certs/a.key",
+                  "rate_limit": 10, "rate_burst": 20},
+      "simulated": {"type": "simulated", "accounts": 2, "transactions": 500}
+    }
+
+Sem OPENFINANCE_PROVIDERS, vale a configuração antiga: um único provider
+(OPENFINANCE_ENABLE_REAL / OPENFINANCE_BASE_URL...) atende qualquer consent.
+"""
+from __future__ import annotations
+import json
+import os
+from typing import Dict, Optional
+
+from logger import logger
+from providers import BaseProvider, OpenFinanceProvider, SimulatedProvider
+from upstream_limiter import UpstreamLimiter
+
+
+class UnknownProviderError(KeyError):
+    """Consent aponta para uma instituição sem configuração."""
+
+    def __str__(self) -> str:
+        return f"Provider Open Finance não configurado: {self.args[0]}"
+
+
+class ProviderRegistry:
+    """Mapa nome → provider, com fallback opcional para nomes não configurados.
+
+    Args:
+        providers: Providers por nome (valor de `Consent.provider`)
+        fallback: Provider usado para nomes desconhecidos; None levanta UnknownProviderError
+    """
+
+    def __init__(self, providers: Dict[str, BaseProvider], fallback: Optional[BaseProvider] = None):
+        self.providers = dict(providers)
+        self.fallback = fallback
+
+    def get(self, name: str) -> BaseProvider:
+        provider = self.providers.get(name, self.fallback)
+        if provider is None:
+            raise UnknownProviderError(name)
+        return provider
+
+    def names(self):
+        return sorted(self.providers)
+
+    @classmethod
+    def from_env(cls) -> "ProviderRegistry":
+        raw = os.getenv("OPENFINANCE_PROVIDERS")
+        if raw:
+            registry = cls({name: build_provider(name, spec) for name, spec in load_config(raw).items()})
+            logger.info("Providers Open Finance configurados", extra={"providers": registry.names()})
+            return registry
+        return cls({}, fallback=legacy_provider())
+
+
+def load_config(raw: str) -> Dict[str, Dict]:
+    """JSON inline ou caminho de arquivo JSON."""
+    if raw.lstrip().startswith("{"):
+        return json.loads(raw)
+    with open(raw, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_provider(name: str, spec: Dict) -> BaseProvider:
+    if spec.get("type", "open_finance") == "simulated":
+        return SimulatedProvider(**{key: int(spec[key]) for key in ("accounts", "transactions", "seed", "latency_ms") if key in spec})
+    rate_limiter = None
+    if spec.get("rate_limit"):
+        rate_limiter = UpstreamLimiter(rate=float(spec["rate_limit"]), burst=spec.get("rate_burst"))
+    return OpenFinanceProvider(
+        base_url=spec.get("base_url"),
+        client_id=spec.get("client_id"),
+        client_secret=spec.get("client_secret"),
+        certificate_path=spec.get("cert_path"),
+        private_key_path=spec.get("key_path"),
+        rate_limiter=rate_limiter,
+        name=name,
+    )
+
+
+def legacy_provider() -> BaseProvider:
+    """Provider único a partir das variáveis OPENFINANCE_* (configuração anterior ao registro)."""
+    if os.getenv("OPENFINANCE_ENABLE_REAL", "false").lower() == "true":
+        logger.info("Open Finance real provider inicializado")
+        return OpenFinanceProvider(
+            base_url=os.getenv("OPENFINANCE_BASE_URL"),
+            client_id=os.getenv("OPENFINANCE_CLIENT_ID"),
+            client_secret=os.getenv("OPENFINANCE_CLIENT_SECRET"),
+            certificate_path=os.getenv("OPENFINANCE_CERT_PATH"),
+            private_key_path=os.getenv("OPENFINANCE_KEY_PATH")
+        )
+    logger.info("Open Finance simulated provider inicializado (modo desenvolvimento)")
+    return SimulatedProvider()
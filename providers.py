@@ -6,32 +6,82 @@ OpenFinanceProvider implementa integração real com APIs do Open Finance Brasil
 """
 from __future__ import annotations
 from typing import List, Dict, Optional
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
+from urllib.parse import urljoin
 import requests
+from requests.adapters import HTTPAdapter
 import os
+import time
 from logger import logger
+import datagen
+import metrics
+import resilience
+import tracing
+from token_cache import TokenCache, default_cache
+from upstream_limiter import UpstreamLimiter, default_limiter
+
+POOL_SIZE = int(os.getenv("OPENFINANCE_POOL_SIZE", "10"))  # conexões por instituição
+PAGE_SIZE = int(os.getenv("OPENFINANCE_PAGE_SIZE", "1000"))  # máximo da especificação
+MAX_PAGES = int(os.getenv("OPENFINANCE_MAX_PAGES", "100"))  # proteção contra links.next em loop
+
+SIMULATED_ACCOUNTS = int(os.getenv("SIMULATED_ACCOUNTS", "1"))
+SIMULATED_TRANSACTIONS = int(os.getenv("SIMULATED_TRANSACTIONS", "0"))  # por conta; 0 = lista fixa
+SIMULATED_SEED = int(os.getenv("SIMULATED_SEED", "42"))
+SIMULATED_LATENCY_MS = int(os.getenv("SIMULATED_LATENCY_MS", "0"))
 
 
 class BaseProvider:
     name: str = "base"
 
-    def fetch_transactions(self, local_user_id: str) -> List[Dict]:
+    def fetch_transactions(self, local_user_id: str, consent_id: Optional[str] = None) -> List[Dict]:
         """Retorna lista de transações no formato dict.
         Cada dict deve conter: description, amount, type, date (YYYY-MM-DD).
         """
         raise NotImplementedError
 
-    def sync(self, local_user_id: str) -> Dict:
+    def sync(self, local_user_id: str, consent_id: Optional[str] = None) -> Dict:
         """Orquestra a sincronização retornando estrutura padronizada."""
-        txns = self.fetch_transactions(local_user_id)
+        txns = self.fetch_transactions(local_user_id, consent_id)
         return {"transactions": txns, "source": self.name}
 
+    def warm_token(self, consent_id: str) -> bool:
+        """Deixa um token válido em cache para o consent. False se o provider não usa token."""
+        return False
+
 
 class SimulatedProvider(BaseProvider):
+    """Provider sem rede para desenvolvimento e load test.
+    
+    Com `transactions` > 0, gera `accounts` × `transactions` transações
+    determinísticas por consent (mesmo gerador do stub Open Finance, normalizadas
+    como no provider real); senão retorna as 3 transações fixas de demonstração.
+    
+    Args:
+        accounts: Contas por consent
+        transactions: Transações por conta (0: lista fixa)
+        seed: Seed do gerador
+        latency_ms: Latência simulada por sync (ex.: medir o fan-out entre instituições)
+    """
     name = "open_finance_simulated"
 
-    def fetch_transactions(self, local_user_id: str) -> List[Dict]:
-        # Ignora local_user_id na simulação; em produção usar para mapear external IDs.
+    def __init__(self, accounts: int = SIMULATED_ACCOUNTS, transactions: int = SIMULATED_TRANSACTIONS,
+                 seed: int = SIMULATED_SEED, latency_ms: int = SIMULATED_LATENCY_MS):
+        self.accounts = accounts
+        self.transactions = transactions
+        self.seed = seed
+        self.latency_ms = latency_ms
+
+    def fetch_transactions(self, local_user_id: str, consent_id: Optional[str] = None) -> List[Dict]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if self.transactions > 0:
+            owner = consent_id or local_user_id
+            return [
+                OpenFinanceProvider.normalize_transaction(of_txn)
+                for i in range(self.accounts)
+                for of_txn in datagen.open_finance_transactions(f"{owner}-acc{i}", self.transactions, self.seed)
+            ]
+        # Lista fixa: ignora local_user_id e consent_id
         today = date.today().isoformat()
         return [
             {"description": "Depósito Open Finance", "amount": 987.65, "type": "income", "date": today},
@@ -55,7 +105,10 @@ class OpenFinanceProvider(BaseProvider):
         client_id: Optional[str] = None,
         client_secret: Optional[str] = None,
         certificate_path: Optional[str] = None,
-        private_key_path: Optional[str] = None
+        private_key_path: Optional[str] = None,
+        token_cache: Optional[TokenCache] = None,
+        rate_limiter: Optional[UpstreamLimiter] = None,
+        name: Optional[str] = None
     ):
         """
         Inicializa provider do Open Finance.
@@ -66,6 +119,9 @@ class OpenFinanceProvider(BaseProvider):
             client_secret: Client Secret do aplicativo
             certificate_path: Caminho para certificado mTLS (.pem)
             private_key_path: Caminho para chave privada mTLS (.key)
+            token_cache: Cache de tokens por (base_url, consent_id); padrão: cache do processo
+            rate_limiter: Token bucket por instituição; padrão: limiter do processo
+            name: Nome da instituição no registro de providers (rótulo das métricas)
         """
         self.base_url = base_url or os.getenv("OPENFINANCE_BASE_URL")
         self.client_id = client_id or os.getenv("OPENFINANCE_CLIENT_ID")
@@ -80,8 +136,17 @@ class OpenFinanceProvider(BaseProvider):
                 extra={"missing_configs": self._get_missing_configs()}
             )
         
-        self._access_token: Optional[str] = None
-        self._token_expires_at: Optional[datetime] = None
+        if name:
+            self.name = name
+        self.token_cache = token_cache or default_cache()
+        self.rate_limiter = rate_limiter or default_limiter()
+        
+        # Sessão própria por instituição: keep-alive e pool de conexões entre syncs
+        self.session = requests.Session()
+        self.session.cert = self._get_cert_tuple()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
     
     def _get_missing_configs(self) -> List[str]:
         """Retorna lista de configurações faltantes."""
@@ -100,15 +165,95 @@ class OpenFinanceProvider(BaseProvider):
             return (self.certificate_path, self.private_key_path)
         return None
     
-    def _is_token_valid(self) -> bool:
-        """Verifica se token de acesso ainda é válido."""
-        if not self._access_token or not self._token_expires_at:
-            return False
-        return datetime.now() < self._token_expires_at
+    def _request(self, method: str, url: str, operation: str, **kwargs) -> requests.Response:
+        """
+        Executa uma chamada HTTP à instituição com limite de taxa, timeouts, retry e circuit breaker.
+        
+        Falhas de conexão/timeout e status 429/502/503/504 são repetidas até
+        OPENFINANCE_MAX_RETRIES vezes com backoff exponencial + jitter (respeitando
+        `Retry-After`). Falhas de conexão e 5xx contam para o circuit breaker da
+        instituição; com o circuito aberto a chamada falha na hora. Qualquer outra
+        exceção libera a chamada de teste do half-open antes de propagar.
+        
+        Args:
+            method: Método HTTP (GET, POST...)
+            url: URL completa
+            operation: Nome curto da operação para métricas (token, accounts, transactions)
+            **kwargs: Repassados a `Session.request` (timeout tem default; cert vem da sessão)
+            
+        Returns:
+            Resposta HTTP da última tentativa (sem raise_for_status)
+            
+        Raises:
+            resilience.CircuitOpenError: Circuito aberto para a instituição
+            upstream_limiter.BudgetExhaustedError: Cota de requests esgotada além da espera máxima
+            requests.RequestException: Falha de rede após esgotar as tentativas
+        """
+        kwargs.setdefault("timeout", resilience.timeouts())
+        breaker = resilience.breaker_for(self.base_url)
+        with tracing.span(
+            f"{method} {operation}", tracing.KIND_CLIENT,
+            **{"http.method": method, "http.url": url, "provider": self.name},
+        ) as span:
+            if span is not None:
+                # Propaga o trace para a instituição (W3C Trace Context)
+                kwargs["headers"] = {**(kwargs.get("headers") or {}), "traceparent": span.traceparent}
+            attempt = 0
+            while True:
+                breaker.before_call()  # circuito aberto falha antes de consumir cota
+                try:
+                    self.rate_limiter.acquire(self.base_url, operation)  # cota da instituição, inclusive nos retries
+                except BaseException:
+                    breaker.release_probe()
+                    raise
+                start = time.perf_counter()
+                status = "error"
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                    status = response.status_code
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    breaker.record_failure()
+                    delay = resilience.backoff_delay(attempt) if attempt < resilience.MAX_RETRIES else None
+                    if delay is None:
+                        raise
+                    reason = "timeout" if isinstance(e, requests.Timeout) else "connection"
+                except requests.RequestException:
+                    breaker.record_failure()
+                    raise
+                except BaseException:
+                    # Erro local (interrupção, bug): não conta contra a instituição, mas
+                    # não pode deixar a chamada de teste do half-open presa para sempre
+                    breaker.release_probe()
+                    raise
+                else:
+                    if status >= 500:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()  # 429 é limitação, não indisponibilidade
+                    delay = None
+                    if status in resilience.RETRY_STATUSES and attempt < resilience.MAX_RETRIES:
+                        retry_after = resilience.parse_retry_after(response.headers.get("Retry-After"))
+                        delay = resilience.backoff_delay(attempt, retry_after)
+                    if delay is None:
+                        if span is not None:
+                            span.set_attribute("http.status_code", status)
+                            span.set_attribute("http.attempts", attempt + 1)
+                        return response
+                    reason = str(status)
+                    response.close()
+                finally:
+                    metrics.observe_provider_call(self.name, operation, status, time.perf_counter() - start)
+                resilience.record_retry(breaker.institution, reason)
+                logger.warning(
+                    f"Nova tentativa {operation} em {delay:.2f}s",
+                    extra={"endpoint": url, "error_code": f"retry_{reason}"},
+                )
+                time.sleep(delay)
+                attempt += 1
     
     def _get_access_token(self, consent_id: str) -> str:
         """
-        Obtém access token via OAuth 2.0 Client Credentials.
+        Obtém access token do consent, reaproveitando o cache por (base_url, consent_id).
         
         Args:
             consent_id: ID do consentimento ativo
@@ -119,10 +264,28 @@ class OpenFinanceProvider(BaseProvider):
         Raises:
             requests.HTTPError: Se falhar autenticação
         """
-        # Se token ainda é válido, reutilizar
-        if self._is_token_valid():
-            return self._access_token
+        return self.token_cache.get(
+            (self.base_url, consent_id),
+            lambda: self._fetch_access_token(consent_id)
+        )
+    
+    def warm_token(self, consent_id: str) -> bool:
+        """Obtém/renova o token do consent antes do sync (ver `jobs.py consent-sweep`)."""
+        if not all([self.base_url, self.client_id, self.client_secret]):
+            raise ValueError(f"Open Finance não configurado. Configurações faltantes: {', '.join(self._get_missing_configs())}")
+        self._get_access_token(consent_id)
+        return True
+    
+    def _fetch_access_token(self, consent_id: str) -> tuple:
+        """
+        Pede um novo access token via OAuth 2.0 Client Credentials.
         
+        Args:
+            consent_id: ID do consentimento ativo
+            
+        Returns:
+            (access_token, expires_in em segundos)
+        """
         logger.info("Obtendo novo access token", extra={"consent_id": consent_id})
         
         token_url = f"{self.base_url}/oauth2/token"
@@ -134,28 +297,53 @@ class OpenFinanceProvider(BaseProvider):
         }
         
         try:
-            response = requests.post(
+            response = self._request(
+                "POST",
                 token_url,
+                "token",
                 data=payload,
                 auth=(self.client_id, self.client_secret),
-                cert=self._get_cert_tuple(),
-                timeout=30,
                 headers={"Content-Type": "application/x-www-form-urlencoded"}
             )
             response.raise_for_status()
             
             data = response.json()
-            self._access_token = data["access_token"]
             expires_in = data.get("expires_in", 3600)  # Default 1 hora
-            self._token_expires_at = datetime.now() + timedelta(seconds=expires_in - 60)  # 1 min buffer
             
             logger.info("Access token obtido com sucesso", extra={"expires_in": expires_in})
-            return self._access_token
+            return data["access_token"], expires_in
             
         except requests.exceptions.RequestException as e:
             logger.error("Erro ao obter access token", extra={"error": str(e)})
             raise
     
+    def _get_paginated(self, url: str, operation: str, headers: Dict, params: Dict) -> List[Dict]:
+        """
+        Percorre uma listagem paginada seguindo `links.next` até a última página.
+        
+        Args:
+            url: URL da primeira página
+            operation: Nome da operação para métricas
+            headers: Headers de autenticação
+            params: Query da primeira página (`page-size` é adicionado)
+            
+        Returns:
+            Itens de `data` de todas as páginas
+        """
+        items: List[Dict] = []
+        params = {**params, "page-size": PAGE_SIZE}
+        for _ in range(MAX_PAGES):
+            response = self._request("GET", url, operation, headers=headers, params=params)
+            response.raise_for_status()
+            body = response.json()
+            items.extend(body.get("data", []))
+            next_url = (body.get("links") or {}).get("next")
+            if not next_url:
+                return items
+            url, params = urljoin(url, next_url), None  # o link já traz a query completa
+        logger.warning("Paginação interrompida no limite de páginas", extra={"endpoint": url, "error_code": "max_pages"})
+        return items
+    
     def _get_accounts(self, access_token: str) -> List[Dict]:
         """
         Lista contas do usuário.
@@ -174,23 +362,14 @@ class OpenFinanceProvider(BaseProvider):
         }
         
         try:
-            response = requests.get(
-                accounts_url,
-                headers=headers,
-                cert=self._get_cert_tuple(),
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            data = response.json()
-            accounts = data.get("data", [])
+            accounts = self._get_paginated(accounts_url, "accounts", headers, {})
             
             logger.info("Contas obtidas", extra={"count": len(accounts)})
             return accounts
             
         except requests.exceptions.RequestException as e:
             logger.error("Erro ao buscar contas", extra={"error": str(e)})
-            return []
+            raise
     
     def _get_account_transactions(
         self,
@@ -230,17 +409,7 @@ class OpenFinanceProvider(BaseProvider):
         }
         
         try:
-            response = requests.get(
-                transactions_url,
-                headers=headers,
-                params=params,
-                cert=self._get_cert_tuple(),
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            data = response.json()
-            transactions = data.get("data", [])
+            transactions = self._get_paginated(transactions_url, "transactions", headers, params)
             
             logger.info(
                 "Transações obtidas",
@@ -253,9 +422,10 @@ class OpenFinanceProvider(BaseProvider):
                 "Erro ao buscar transações",
                 extra={"account_id": account_id, "error": str(e)}
             )
-            return []
+            raise
     
-    def _normalize_transaction(self, of_transaction: Dict) -> Dict:
+    @staticmethod
+    def normalize_transaction(of_transaction: Dict) -> Dict:
         """
         Converte transação do formato Open Finance para formato interno.
         
@@ -303,7 +473,7 @@ class OpenFinanceProvider(BaseProvider):
             "date": booking_date
         }
     
-    def fetch_transactions(self, local_user_id: str, consent_id: str) -> List[Dict]:
+    def fetch_transactions(self, local_user_id: str, consent_id: Optional[str] = None) -> List[Dict]:
         """
         Busca transações do Open Finance para um usuário.
         
@@ -319,37 +489,18 @@ class OpenFinanceProvider(BaseProvider):
             raise ValueError(f"Open Finance não configurado. Configurações faltantes: {', '.join(self._get_missing_configs())}")
         
         try:
-            # 1. Obter access token
-            access_token = self._get_access_token(consent_id)
-            
-            # 2. Listar contas do usuário
-            accounts = self._get_accounts(access_token)
-            
-            if not accounts:
-                logger.warning("Nenhuma conta encontrada", extra={"user_id": local_user_id})
-                return []
-            
-            # 3. Buscar transações de todas as contas
-            all_transactions = []
-            
-            for account in accounts:
-                account_id = account.get("accountId")
-                if not account_id:
-                    continue
-                
-                of_transactions = self._get_account_transactions(access_token, account_id)
-                
-                # 4. Normalizar transações
-                for of_txn in of_transactions:
-                    try:
-                        normalized = self._normalize_transaction(of_txn)
-                        all_transactions.append(normalized)
-                    except Exception as e:
-                        logger.warning(
-                            "Erro ao normalizar transação",
-                            extra={"error": str(e), "transaction": of_txn}
-                        )
-                        continue
+            for attempt in range(2):
+                # 1. Obter access token
+                access_token = self._get_access_token(consent_id)
+                try:
+                    all_transactions = self._fetch_with_token(local_user_id, access_token)
+                    break
+                except requests.HTTPError as e:
+                    # Token revogado/expirado antes do prazo: descarta do cache e tenta uma vez com um novo
+                    if attempt or e.response is None or e.response.status_code != 401:
+                        raise
+                    logger.warning("Token rejeitado pela instituição, renovando", extra={"consent_id": consent_id, "error_code": "token_rejected"})
+                    self.token_cache.invalidate((self.base_url, consent_id))
             
             logger.info(
                 "Sincronização Open Finance concluída",
@@ -365,7 +516,52 @@ class OpenFinanceProvider(BaseProvider):
             )
             raise
     
-    def sync(self, local_user_id: str, consent_id: str) -> Dict:
+    def _fetch_with_token(self, local_user_id: str, access_token: str) -> List[Dict]:
+        """
+        Lista as contas e busca/normaliza as transações de todas elas.
+        
+        Args:
+            local_user_id: ID do usuário no sistema local
+            access_token: Token OAuth do consent
+            
+        Returns:
+            Lista de transações normalizadas
+            
+        Raises:
+            requests.HTTPError: Resposta de erro da instituição (ex.: 401 com token revogado)
+        """
+        # 2. Listar contas do usuário
+        accounts = self._get_accounts(access_token)
+        
+        if not accounts:
+            logger.warning("Nenhuma conta encontrada", extra={"user_id": local_user_id})
+            return []
+        
+        # 3. Buscar transações de todas as contas
+        all_transactions = []
+        
+        for account in accounts:
+            account_id = account.get("accountId")
+            if not account_id:
+                continue
+            
+            of_transactions = self._get_account_transactions(access_token, account_id)
+            
+            # 4. Normalizar transações
+            for of_txn in of_transactions:
+                try:
+                    normalized = self.normalize_transaction(of_txn)
+                    all_transactions.append(normalized)
+                except Exception as e:
+                    logger.warning(
+                        "Erro ao normalizar transação",
+                        extra={"error": str(e), "transaction": of_txn}
+                    )
+                    continue
+        
+        return all_transactions
+    
+    def sync(self, local_user_id: str, consent_id: Optional[str] = None) -> Dict:
         """
         Sincroniza transações do Open Finance.
         
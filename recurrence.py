@@ -0,0 +1,223 @@
+"""Detecção de transações recorrentes (assinaturas, salários, contas fixas).
+
+Agrupa transações por tipo, descrição normalizada e valor (com tolerância) e
+reconhece periodicidade semanal ou mensal. O detector é incremental: recebe os
+padrões já conhecidos e apenas as transações novas, atualizando o estado sem
+reprocessar o histórico (exceto grupos que recebem linhas retroativas, ver
+`backdated_keys`).
+"""
+from __future__ import annotations
+import calendar
+import re
+import unicodedata
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+AMOUNT_TOLERANCE = 0.10  # Variação relativa aceita no valor (10%)
+MIN_OCCURRENCES = 3  # Ocorrências necessárias para confirmar a recorrência
+MAX_MISSED = 2  # Ocorrências que podem faltar sem quebrar o padrão
+
+# Periodicidade: (intervalo nominal em dias, tolerância em dias)
+PERIODS: Dict[str, Tuple[int, int]] = {
+    "weekly": (7, 1),
+    "monthly": (30, 3),  # 27..33 dias cobre meses de 28 a 31 dias
+}
+
+_NON_WORD = re.compile(r"[^a-z ]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_description(description: str) -> str:
+    """Normaliza descrição para agrupamento.
+
+    Remove acentos, dígitos (datas, parcelas, finais de cartão) e pontuação.
+    Ex.: "NETFLIX.COM 12/05" e "Netflix.com 13/06" → "netflix com".
+    """
+    text = unicodedata.normalize("NFKD", description or "")
+    text = text.encode("ascii", "ignore").decode("ascii").lower()
+    text = _NON_WORD.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()[:128]
+
+
+def amount_matches(reference: float, amount: float) -> bool:
+    """Verifica se `amount` está dentro da tolerância em relação a `reference`."""
+    if reference <= 0:
+        return amount == reference
+    return abs(amount - reference) <= reference * AMOUNT_TOLERANCE
+
+
+def classify_gap(gap_days: int) -> Optional[str]:
+    """Classifica o intervalo entre duas ocorrências consecutivas."""
+    for period, (nominal, tolerance) in PERIODS.items():
+        if abs(gap_days - nominal) <= tolerance:
+            return period
+    return None
+
+
+def cycles_between(gap_days: int, period: str) -> Optional[int]:
+    """Número de ciclos do período contidos em `gap_days` (None se não encaixa)."""
+    nominal, tolerance = PERIODS[period]
+    for cycles in range(1, MAX_MISSED + 2):
+        if abs(gap_days - nominal * cycles) <= tolerance * cycles:
+            return cycles
+    return None
+
+
+def shift(d: date, period: str, cycles: int = 1) -> date:
+    """Avança `cycles` ocorrências a partir de `d` (mensal preserva o dia do mês)."""
+    if period == "weekly":
+        return d + timedelta(days=7 * cycles)
+    month_index = d.month - 1 + cycles
+    year = d.year + month_index // 12
+    month = month_index % 12 + 1
+    return date(year, month, min(d.day, calendar.monthrange(year, month)[1]))
+
+
+def is_current(pattern, today: date) -> bool:
+    """Padrão confirmado e ainda vigente (não faltaram mais de MAX_MISSED ocorrências)."""
+    if pattern.status != "active" or not pattern.period:
+        return False
+    nominal, tolerance = PERIODS[pattern.period]
+    return (today - pattern.last_date).days <= (nominal + tolerance) * (MAX_MISSED + 1)
+
+
+def monthly_equivalent(pattern) -> float:
+    """Valor do padrão convertido para base mensal."""
+    if pattern.period == "weekly":
+        return float(pattern.amount) * 52 / 12
+    return float(pattern.amount)
+
+
+def _restart(pattern, row, amount: float) -> None:
+    pattern.period = None
+    pattern.occurrences = 1
+    pattern.amount = amount
+    pattern.first_date = row.date
+    pattern.last_date = row.date
+    pattern.next_date = None
+    pattern.status = "candidate"
+
+
+def _observe(pattern, row, amount: float) -> None:
+    """Incorpora uma nova ocorrência ao padrão."""
+    pattern.description = row.description
+    gap = (row.date - pattern.last_date).days
+    if gap <= 0:
+        # Mesma data (ex.: duplicata) não altera a cadência; linhas retroativas
+        # não chegam aqui porque o grupo é refeito em ordem (ver backdated_keys)
+        return
+
+    if pattern.period is None:
+        period = classify_gap(gap)
+        if period is None:
+            _restart(pattern, row, amount)
+            return
+        pattern.period = period
+    elif cycles_between(gap, pattern.period) is None:
+        if is_current(pattern, row.date):
+            # Cobrança avulsa fora da cadência (ex.: segunda fatura no mês): não derruba o padrão confirmado
+            return
+        _restart(pattern, row, amount)
+        return
+
+    pattern.occurrences += 1
+    # Média móvel do valor (absorve pequenos reajustes)
+    pattern.amount = pattern.amount + (amount - pattern.amount) / pattern.occurrences
+    pattern.last_date = row.date
+    pattern.next_date = shift(row.date, pattern.period)
+    if pattern.occurrences >= MIN_OCCURRENCES:
+        pattern.status = "active"
+
+
+def group_key(row) -> Tuple[str, str]:
+    """Chave de agrupamento de uma transação: (tipo, descrição normalizada)."""
+    return row.type, normalize_description(row.description)
+
+
+def backdated_keys(patterns: Iterable, rows: Iterable) -> set:
+    """Grupos em que alguma transação nova é anterior à última ocorrência conhecida.
+
+    O detector avança por id, então uma linha inserida depois com data antiga
+    chegaria fora de ordem; esses grupos precisam ser refeitos com o histórico.
+    """
+    latest: Dict[Tuple[str, str], date] = {}
+    for pattern in patterns:
+        key = (pattern.type, pattern.description_key)
+        latest[key] = max(latest.get(key, pattern.last_date), pattern.last_date)
+    keys = set()
+    for row in rows:
+        key = group_key(row)
+        if key in latest and row.date < latest[key]:
+            keys.add(key)
+    return keys
+
+
+def update_patterns(patterns: List, rows: Iterable, new_pattern: Callable[..., object]) -> List:
+    """Atualiza padrões conhecidos com transações novas.
+
+    Args:
+        patterns: Padrões existentes do usuário (objetos com os atributos de
+            RecurringTransaction); são alterados in place.
+        rows: Transações novas (id, description, amount, type, date) ordenadas por data.
+        new_pattern: Fábrica chamada com os campos iniciais de um novo padrão.
+
+    Returns:
+        Lista de padrões criados.
+    """
+    groups: Dict[Tuple[str, str], List] = {}
+    for pattern in patterns:
+        groups.setdefault((pattern.type, pattern.description_key), []).append(pattern)
+
+    created = []
+    for row in rows:
+        txn_type, key = group_key(row)
+        if not key:
+            continue
+        amount = float(row.amount)
+        group = groups.setdefault((txn_type, key), [])
+        pattern = next((p for p in group if amount_matches(p.amount, amount)), None)
+        if pattern is None:
+            pattern = new_pattern(
+                type=row.type,
+                description_key=key,
+                description=row.description,
+                amount=amount,
+                period=None,
+                occurrences=1,
+                first_date=row.date,
+                last_date=row.date,
+                next_date=None,
+                status="candidate",
+            )
+            group.append(pattern)
+            created.append(pattern)
+            continue
+        _observe(pattern, row, amount)
+    return created
+
+
+def forecast(patterns: Iterable, start: date, end: date) -> List[Dict]:
+    """Projeta as ocorrências de padrões vigentes no intervalo [start, end].
+
+    Returns:
+        Lista ordenada por data: {date, description, amount, type, period}
+    """
+    upcoming = []
+    for pattern in patterns:
+        if not is_current(pattern, start):
+            continue
+        cycles = 1
+        occurrence = shift(pattern.last_date, pattern.period, cycles)
+        while occurrence <= end:
+            if occurrence >= start:
+                upcoming.append({
+                    "date": occurrence.isoformat(),
+                    "description": pattern.description,
+                    "amount": round(float(pattern.amount), 2),
+                    "type": pattern.type,
+                    "period": pattern.period,
+                })
+            cycles += 1
+            occurrence = shift(pattern.last_date, pattern.period, cycles)
+    upcoming.sort(key=lambda item: item["date"])
+    return upcoming
@@ -0,0 +1,172 @@
+"""Resiliência das chamadas HTTP às instituições Open Finance.
+
+- Circuit breaker por instituição (base_url): após N falhas seguidas abre e
+  rejeita chamadas imediatamente por um tempo; depois deixa passar uma
+  chamada de teste (half-open) e fecha de novo se ela funcionar.
+- Retry com backoff exponencial e jitter ("full jitter"), respeitando
+  `Retry-After` em 429/503.
+- Timeouts de conexão e leitura separados e configuráveis.
+
+Estado exposto em /metrics: `provider_circuit_state` (0 fechado, 1 half-open,
+2 aberto), `provider_retries_total` e `provider_circuit_rejections_total`.
+"""
+from __future__ import annotations
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import metrics
+from logger import logger
+
+CONNECT_TIMEOUT = float(os.getenv("OPENFINANCE_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("OPENFINANCE_READ_TIMEOUT", "30"))
+MAX_RETRIES = int(os.getenv("OPENFINANCE_MAX_RETRIES", "2"))
+BACKOFF_BASE = float(os.getenv("OPENFINANCE_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("OPENFINANCE_BACKOFF_MAX", "10"))
+RETRY_AFTER_MAX = float(os.getenv("OPENFINANCE_RETRY_AFTER_MAX", "30"))
+CIRCUIT_FAILURES = int(os.getenv("OPENFINANCE_CIRCUIT_FAILURES", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("OPENFINANCE_CIRCUIT_RESET_SECONDS", "30"))
+
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = metrics.REGISTRY.gauge(
+    "provider_circuit_state", "Estado do circuit breaker por instituição (0 fechado, 1 half-open, 2 aberto)",
+    ("institution",))
+RETRIES = metrics.REGISTRY.counter(
+    "provider_retries_total", "Novas tentativas de chamadas a provedores", ("institution", "reason"))
+REJECTIONS = metrics.REGISTRY.counter(
+    "provider_circuit_rejections_total", "Chamadas rejeitadas com o circuito aberto", ("institution",))
+
+
+class CircuitOpenError(Exception):
+    """Instituição indisponível: circuito aberto."""
+
+    def __init__(self, institution: str, retry_after: float):
+        super().__init__(f"Circuito aberto para {institution}; nova tentativa em {retry_after:.0f}s")
+        self.institution = institution
+        self.retry_after = retry_after
+
+
+def institution_of(base_url: Optional[str]) -> str:
+    return urlsplit(base_url or "").netloc or (base_url or "unknown")
+
+
+class CircuitBreaker:
+    """Circuit breaker thread-safe (closed → open → half-open → closed).
+
+    Args:
+        institution: Rótulo da instituição (métricas/logs)
+        failure_threshold: Falhas consecutivas que abrem o circuito
+        reset_timeout: Segundos aberto antes de permitir uma chamada de teste
+    """
+
+    def __init__(self, institution: str, failure_threshold: int = CIRCUIT_FAILURES, reset_timeout: float = CIRCUIT_RESET_SECONDS):
+        self.institution = institution
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(0, institution=institution)
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logger.warning(
+                "Circuit breaker mudou de estado",
+                extra={"endpoint": self.institution, "error_code": f"circuit_{state}"},
+            )
+        self.state = state
+        CIRCUIT_STATE.set(_STATE_VALUES[state], institution=self.institution)
+
+    def before_call(self) -> None:
+        """Autoriza a chamada ou levanta CircuitOpenError."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == OPEN and remaining <= 0:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True  # uma única chamada de teste
+                return
+        REJECTIONS.inc(institution=self.institution)
+        raise CircuitOpenError(self.institution, max(remaining, 0.0))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            self._set_state(CLOSED)
+
+    def release_probe(self) -> None:
+        """Libera a chamada de teste sem veredito (a falha não foi da instituição)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(base_url: Optional[str]) -> CircuitBreaker:
+    """Circuit breaker compartilhado do processo para a instituição."""
+    institution = institution_of(base_url)
+    with _breakers_lock:
+        breaker = _breakers.get(institution)
+        if breaker is None:
+            breaker = _breakers[institution] = CircuitBreaker(institution)
+        return breaker
+
+
+def timeouts() -> Tuple[float, float]:
+    """(connect, read) para `requests`."""
+    return CONNECT_TIMEOUT, READ_TIMEOUT
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Segundos de um header Retry-After (delta-seconds ou HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+    """Espera antes da tentativa `attempt + 1` (attempt começa em 0).
+
+    Full jitter: uniforme em [0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt)].
+    Com Retry-After, espera pelo menos o pedido pela instituição; se ele passar
+    de RETRY_AFTER_MAX, retorna None (não vale a pena segurar o worker).
+    """
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+    if retry_after is not None:
+        if retry_after > RETRY_AFTER_MAX:
+            return None
+        delay = max(delay, retry_after)
+    return delay
+
+
+def record_retry(institution: str, reason: str) -> None:
+    RETRIES.inc(institution=institution, reason=reason)
@@ -0,0 +1,79 @@
+"""Serialização rápida para endpoints de listagem.
+
+Em vez de carregar objetos ORM e serializar com `Schema.dump`, os endpoints
+selecionam apenas as colunas do schema (Row tuples) e convertem cada linha
+com uma função gerada uma única vez por schema. A saída é idêntica à do
+marshmallow (datas em ISO 8601, floats como float).
+
+Se `orjson` estiver instalado, as respostas são codificadas com ele; caso
+contrário, usa o `jsonify` do Flask.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Sequence
+
+from flask import Response, jsonify
+from marshmallow import Schema, fields
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional
+    orjson = None
+
+
+def _converter(field: fields.Field) -> str:
+    """Expressão Python equivalente ao `_serialize` do campo (sobre `v`)."""
+    if isinstance(field, (fields.Date, fields.DateTime)):
+        return "v.isoformat()"
+    if isinstance(field, fields.Float):
+        return "float(v)"
+    if isinstance(field, fields.Integer):
+        return "int(v)"
+    return "v"
+
+
+class RowSerializer:
+    """Converte Row tuples nas mesmas estruturas produzidas por `schema.dump`.
+
+    Args:
+        model: Classe ORM de onde vêm as colunas
+        schema: Schema marshmallow de referência (define campos e ordem)
+    """
+
+    def __init__(self, model, schema: Schema):
+        self.fields: List[str] = [name for name, field in schema.dump_fields.items()]
+        self.columns = [getattr(model, name) for name in self.fields]
+        self._to_dict = self._compile(schema)
+
+    def _compile(self, schema: Schema) -> Callable[[Sequence], Dict[str, Any]]:
+        # Gera `def to_dict(row): ...` com acesso posicional e conversões inline
+        lines = ["def to_dict(row):"]
+        items = []
+        for index, name in enumerate(self.fields):
+            conversion = _converter(schema.dump_fields[name])
+            if conversion == "v":
+                items.append(f"{name!r}: row[{index}]")
+            else:
+                lines.append(f"    v = row[{index}]")
+                lines.append(f"    c{index} = None if v is None else {conversion}")
+                items.append(f"{name!r}: c{index}")
+        lines.append("    return {" + ", ".join(items) + "}")
+        namespace: Dict[str, Any] = {}
+        exec(compile("\n".join(lines), f"<serializer {type(schema).__name__}>", "exec"), namespace)
+        return namespace["to_dict"]
+
+    def query(self, session_db):
+        """Query que seleciona apenas as colunas do schema."""
+        return session_db.query(*self.columns)
+
+    def dump(self, rows) -> List[Dict[str, Any]]:
+        to_dict = self._to_dict
+        return [to_dict(row) for row in rows]
+
+
+def json_response(payload: Any, status: int = 200) -> Response:
+    """Resposta JSON via orjson (se instalado) ou `jsonify`."""
+    if orjson is not None:
+        return Response(orjson.dumps(payload), status=status, mimetype="application/json")
+    response = jsonify(payload)
+    response.status_code = status
+    return response
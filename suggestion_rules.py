@@ -0,0 +1,257 @@
+"""Regras de sugestão declaradas como dados (JSON) e compiladas em closures.
+
+Cada regra é um objeto JSON:
+
+    {
+      "id": "food_high",
+      "priority": "medium",
+      "let": {"food_pct": ["*", ["/", "cat_alimentacao", "income"], 100]},
+      "when": ["and", [">", "income", 0], [">", "food_pct", 30]],
+      "values": {"potential_savings": ["*", "cat_alimentacao", 0.3]},
+      "suggestion": {"type": "tip", "title": "...", "description": "R$ {cat_alimentacao:.2f}"}
+    }
+
+Expressões usam notação prefixa: números são constantes, strings são nomes
+de features (ou de variáveis `let`) e listas são `[operador, *argumentos]`.
+Features ausentes valem 0, o que torna regras sobre categorias sem gastos
+naturalmente falsas. Strings em `suggestion` são templates `str.format`
+avaliados com features + variáveis `let` somente quando a regra dispara; os
+campos dos templates são conferidos na compilação contra as features conhecidas
+e as variáveis `let` (erro de digitação vira RuleError, não KeyError em produção).
+
+As regras são compiladas uma única vez por versão do arquivo (mtime), de modo
+que editar o JSON altera o comportamento sem redeploy.
+"""
+from __future__ import annotations
+import json
+import operator
+import os
+import string
+import threading
+from collections import ChainMap
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from logger import logger
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "suggestion_rules.json")
+
+Evaluator = Callable[[Dict[str, Any], Dict[str, Any]], Any]
+
+
+def _safe_div(a, b):
+    return a / b if b else 0.0
+
+
+_BINARY_OPS = {
+    "-": operator.sub,
+    "/": _safe_div,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+_VARIADIC_OPS = {
+    "+": sum,
+    "min": min,
+    "max": max,
+}
+
+
+class RuleError(ValueError):
+    """Regra inválida (operador desconhecido, aridade incorreta, etc.)."""
+
+
+def compile_expression(expr, let_names: frozenset = frozenset()) -> Evaluator:
+    """Compila uma expressão em uma closure `fn(features, lets)`."""
+    if isinstance(expr, bool) or isinstance(expr, (int, float)):
+        value = expr
+        return lambda features, lets: value
+
+    if isinstance(expr, str):
+        name = expr
+        if name in let_names:
+            return lambda features, lets: lets[name]
+        return lambda features, lets: features.get(name, 0.0)
+
+    if not isinstance(expr, list) or not expr or not isinstance(expr[0], str):
+        raise RuleError(f"Expressão inválida: {expr!r}")
+
+    op, args = expr[0], [compile_expression(arg, let_names) for arg in expr[1:]]
+
+    if op in _BINARY_OPS:
+        if len(args) != 2:
+            raise RuleError(f"Operador '{op}' exige 2 argumentos")
+        fn, (a, b) = _BINARY_OPS[op], args
+        return lambda features, lets: fn(a(features, lets), b(features, lets))
+
+    if op in _VARIADIC_OPS:
+        if not args:
+            raise RuleError(f"Operador '{op}' exige argumentos")
+        fn = _VARIADIC_OPS[op]
+        return lambda features, lets: fn([arg(features, lets) for arg in args])
+
+    if op == "*":
+        def product(features, lets):
+            result = 1.0
+            for arg in args:
+                result *= arg(features, lets)
+            return result
+        return product
+
+    if op == "and":
+        return lambda features, lets: all(arg(features, lets) for arg in args)
+    if op == "or":
+        return lambda features, lets: any(arg(features, lets) for arg in args)
+
+    if op in ("not", "abs"):
+        if len(args) != 1:
+            raise RuleError(f"Operador '{op}' exige 1 argumento")
+        (a,) = args
+        if op == "not":
+            return lambda features, lets: not a(features, lets)
+        return lambda features, lets: abs(a(features, lets))
+
+    if op == "if":
+        if len(args) != 3:
+            raise RuleError("Operador 'if' exige 3 argumentos")
+        cond, then, otherwise = args
+        return lambda features, lets: then(features, lets) if cond(features, lets) else otherwise(features, lets)
+
+    raise RuleError(f"Operador desconhecido: '{op}'")
+
+
+def _template_fields(template: str):
+    """Nomes de campo de um template `str.format`, incluindo os aninhados no format spec."""
+    for _, field_name, format_spec, _ in string.Formatter().parse(template):
+        if field_name is not None:
+            yield field_name
+        if format_spec and "{" in format_spec:
+            yield from _template_fields(format_spec)
+
+
+def _compile_template(value, names: Optional[frozenset] = None):
+    """Compila campos da sugestão: strings com `{}` viram templates.
+
+    Com `names`, rejeita campos fora do escopo (features + `let`), posicionais
+    e com acesso a atributo/índice (`{x.attr}`, `{x[0]}`).
+    """
+    if isinstance(value, dict):
+        items = [(key, _compile_template(v, names)) for key, v in value.items()]
+        return lambda scope: {key: render(scope) for key, render in items}
+    if isinstance(value, str) and "{" in value:
+        try:
+            fields = list(_template_fields(value))
+        except ValueError as e:
+            raise RuleError(f"Template inválido {value!r}: {e}") from e
+        if names is not None:
+            for field in fields:
+                if not field.isidentifier() or field not in names:
+                    raise RuleError(f"Campo desconhecido '{{{field}}}' no template {value!r}")
+        return lambda scope: value.format_map(scope)
+    return lambda scope: value
+
+
+class CompiledRule:
+    """Regra pronta para avaliação."""
+    __slots__ = ("id", "lets", "when", "values", "render")
+
+    def __init__(self, definition: Dict, features: Optional[frozenset] = None):
+        self.id = definition.get("id", "<sem id>")
+        try:
+            lets: List[Tuple[str, Evaluator]] = []
+            known = set()
+            for name, expr in (definition.get("let") or {}).items():
+                lets.append((name, compile_expression(expr, frozenset(known))))
+                known.add(name)
+            let_names = frozenset(known)
+            self.lets = tuple(lets)
+            self.when = compile_expression(definition.get("when", True), let_names)
+            self.values = tuple(
+                (name, compile_expression(expr, let_names))
+                for name, expr in (definition.get("values") or {}).items()
+            )
+            suggestion = dict(definition["suggestion"])
+            suggestion.setdefault("priority", definition.get("priority", "low"))
+            names = None if features is None else features | let_names
+            self.render = _compile_template(suggestion, names)
+        except (KeyError, TypeError, RuleError) as e:
+            raise RuleError(f"Regra '{self.id}' inválida: {e}") from e
+
+    def evaluate(self, features: Dict[str, Any]) -> Optional[Dict]:
+        """Retorna a sugestão se a regra disparar, senão None."""
+        lets: Dict[str, Any] = {}
+        for name, fn in self.lets:
+            lets[name] = fn(features, lets)
+        if not self.when(features, lets):
+            return None
+        suggestion = self.render(ChainMap(lets, features))
+        for name, fn in self.values:
+            suggestion[name] = fn(features, lets)
+        return suggestion
+
+
+def compile_rules(definitions: List[Dict], features: Optional[frozenset] = None) -> List[CompiledRule]:
+    """Compila definições de regras (ignora regras com `"enabled": false`).
+
+    `features` são os nomes de features disponíveis aos templates; None desativa a checagem.
+    """
+    return [CompiledRule(d, features) for d in definitions if d.get("enabled", True)]
+
+
+def evaluate_rules(rules: List[CompiledRule], features: Dict[str, Any]) -> List[Dict]:
+    """Avalia todas as regras sobre o vetor de features em uma única passada."""
+    suggestions = []
+    for rule in rules:
+        suggestion = rule.evaluate(features)
+        if suggestion is not None:
+            suggestions.append(suggestion)
+    return suggestions
+
+
+_cache_lock = threading.Lock()
+_cache: Dict[Tuple[str, Optional[frozenset]], Tuple[Optional[float], List[CompiledRule]]] = {}
+
+
+def get_rules(path: Optional[str] = None, features: Optional[frozenset] = None) -> List[CompiledRule]:
+    """Retorna as regras compiladas, recompilando apenas se o arquivo mudou.
+
+    O caminho vem de `SUGGESTION_RULES_PATH` (padrão: suggestion_rules.json).
+    O cache é por (caminho, features), já que `features` muda a validação dos
+    templates. Se a nova versão do arquivo for inválida, mantém a última versão
+    válida; sem versão válida (arquivo ausente ou inválido já na primeira
+    carga), nenhuma regra é aplicada até o arquivo ser corrigido.
+    """
+    path = path or os.getenv("SUGGESTION_RULES_PATH") or DEFAULT_RULES_PATH
+    key = (path, features)
+    try:
+        mtime: Optional[float] = os.stat(path).st_mtime
+    except OSError:
+        mtime = None  # ausente: a leitura abaixo falha e é tratada como versão inválida
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        try:
+            with open(path, encoding="utf-8") as f:
+                rules = compile_rules(json.load(f)["rules"], features)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if cached is None:
+                logger.error("Regras de sugestão inválidas; nenhuma regra carregada",
+                             extra={"path": path, "error": str(e)})
+                rules = []
+            else:
+                logger.error("Regras de sugestão inválidas; mantendo versão anterior",
+                             extra={"path": path, "error": str(e)})
+                rules = cached[1]
+            _cache[key] = (mtime, rules)
+            return rules
+        _cache[key] = (mtime, rules)
+        logger.info("Regras de sugestão compiladas", extra={"count": len(rules)})
+        return rules
@@ -0,0 +1,253 @@
+"""Motor de sugestões financeiras.
+
+Calcula sugestões personalizadas a partir dos totais de um período.
+Não depende de Flask nem da sessão do banco: é usado tanto pelo endpoint
+`/suggestions` quanto pelo job em lote (`jobs.py suggestions`).
+
+A entrada são agregados `(type, category, total, count)`, obtidos em SQL com
+um único GROUP BY (`category_expression`) ou em Python a partir de linhas
+(`aggregate_transactions`). Os agregados viram um vetor de features
+(`build_features`) e as sugestões vêm das regras declaradas em
+`suggestion_rules.json` (ver `suggestion_rules.py`).
+"""
+from __future__ import annotations
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func, or_
+
+import recurrence
+import suggestion_rules
+
+# Janelas de análise aceitas em ?period= (dias; None = desde 1º de janeiro)
+PERIODS = {"7d": 7, "30d": 30, "90d": 90, "ytd": None}
+DEFAULT_PERIOD = "30d"
+WINDOW_DAYS = PERIODS[DEFAULT_PERIOD]  # Janela do job em lote
+
+Aggregate = Tuple[str, str, float, int]  # (type, category, total, count)
+
+# Categorias informais por palavras-chave (avaliadas em ordem)
+CATEGORY_KEYWORDS = [
+    ('alimentacao', ['restaurante', 'ifood', 'uber eats', 'almoço', 'jantar', 'lanche']),
+    ('transporte', ['uber', 'taxi', '99', 'gasolina', 'combustível']),
+    ('assinaturas', ['netflix', 'spotify', 'amazon', 'assinatura', 'streaming']),
+    ('supermercado', ['supermercado', 'mercado', 'compras']),
+    ('contas', ['energia', 'água', 'internet', 'celular', 'conta']),
+]
+
+CATEGORY_LABELS = {
+    'alimentacao': 'Alimentação',
+    'transporte': 'Transporte',
+    'assinaturas': 'Assinaturas',
+    'supermercado': 'Supermercado',
+    'contas': 'Contas Fixas',
+    'outros': 'Outros'
+}
+
+# Nomes produzidos por `build_features` (escopo dos templates das regras)
+FEATURE_NAMES = frozenset(
+    ["user_id", "days", "income", "expense", "balance", "income_count", "expense_count", "count",
+     "top_category", "top_category_label", "top_category_total",
+     "recurring_expense_count", "recurring_expense_monthly"]
+    + [f"{prefix}_{category}" for category in CATEGORY_LABELS for prefix in ("cat", "n")]
+)
+
+
+def categorize(description: str) -> str:
+    """Categoriza uma despesa pela descrição (palavras-chave)."""
+    desc = description.lower()
+    for category, keywords in CATEGORY_KEYWORDS:
+        if any(word in desc for word in keywords):
+            return category
+    return 'outros'
+
+
+# Letras não-ASCII das palavras-chave: lower() do SQLite só trata ASCII, então
+# as maiúsculas correspondentes são trocadas com replace() antes do LIKE
+_NON_ASCII_KEYWORD_CHARS = sorted({
+    ch for _, keywords in CATEGORY_KEYWORDS for word in keywords for ch in word if not ch.isascii()
+})
+
+
+def category_expression(description):
+    """Equivalente SQL de `categorize` (CASE sobre LIKE), para agrupar no banco.
+
+    lower() cobre ASCII em qualquer banco; as maiúsculas acentuadas usadas nas
+    palavras-chave (Ç, Í, Á...) são convertidas com replace(), de modo que o
+    resultado coincide com `categorize` também no SQLite.
+    """
+    lowered = func.lower(description)
+    for ch in _NON_ASCII_KEYWORD_CHARS:
+        lowered = func.replace(lowered, ch.upper(), ch)
+    return case(
+        *[(or_(*[lowered.like(f"%{word}%") for word in keywords]), category)
+          for category, keywords in CATEGORY_KEYWORDS],
+        else_='outros'
+    )
+
+
+def period_range(period: str, today: date) -> Tuple[date, date]:
+    """Intervalo [start, end] de uma janela de PERIODS (KeyError se inválida)."""
+    days = PERIODS[period]
+    if days is None:
+        return date(today.year, 1, 1), today
+    return today - timedelta(days=days), today
+
+
+def month_ranges(today: date) -> Tuple[Tuple[date, date], Tuple[date, date]]:
+    """Mês corrente até hoje e o mesmo trecho do mês anterior (comparação justa)."""
+    previous_end = recurrence.shift(today, "monthly", -1)
+    return (today.replace(day=1), today), (previous_end.replace(day=1), previous_end)
+
+
+def aggregate_transactions(txns: Iterable) -> List[Aggregate]:
+    """Agrega linhas (description, amount, type) por (type, category) em Python."""
+    groups: Dict[Tuple[str, str], List] = {}
+    for txn in txns:
+        group = groups.setdefault((txn.type, categorize(txn.description)), [0.0, 0])
+        group[0] += float(txn.amount)
+        group[1] += 1
+    return [(txn_type, category, total, count) for (txn_type, category), (total, count) in groups.items()]
+
+
+def _delta(current: float, previous: float) -> Dict:
+    return {
+        "current": round(current, 2),
+        "previous": round(previous, 2),
+        "delta": round(current - previous, 2),
+        "delta_pct": round((current - previous) / previous * 100, 1) if previous else None
+    }
+
+
+def month_over_month(current: Iterable[Aggregate], previous: Iterable[Aggregate],
+                     current_range: Tuple[date, date], previous_range: Tuple[date, date]) -> Dict:
+    """Variação mês a mês de receitas, despesas e despesas por categoria."""
+    totals = []
+    for aggregates in (current, previous):
+        bucket = {"income": 0.0, "expense": 0.0}
+        for txn_type, category, total, _count in aggregates:
+            total = float(total or 0)
+            if txn_type == "income":
+                bucket["income"] += total
+            elif txn_type == "expense":
+                bucket["expense"] += total
+                bucket[category] = bucket.get(category, 0.0) + total
+        totals.append(bucket)
+    cur, prev = totals
+    return {
+        "current": {"start": current_range[0].isoformat(), "end": current_range[1].isoformat()},
+        "previous": {"start": previous_range[0].isoformat(), "end": previous_range[1].isoformat()},
+        "income": _delta(cur["income"], prev["income"]),
+        "expense": _delta(cur["expense"], prev["expense"]),
+        "categories": {
+            category: _delta(cur.get(category, 0.0), prev.get(category, 0.0))
+            for category in CATEGORY_LABELS
+            if category in cur or category in prev
+        }
+    }
+
+
+def build_features(user_id: str, aggregates: Iterable[Aggregate], recurring_expenses: Iterable, start: date, end: date) -> Dict:
+    """
+    Reduz os agregados do período a um vetor de features em uma única passada.
+
+    Features: income, expense, balance, income_count, expense_count, count,
+    cat_<categoria> (total) e n_<categoria> (quantidade) por categoria de despesa,
+    top_category/top_category_label/top_category_total, recurring_expense_count,
+    recurring_expense_monthly, além de user_id e days para os templates.
+    """
+    income = expense = 0.0
+    income_count = expense_count = 0
+    category_totals = {category: 0.0 for category in CATEGORY_LABELS}
+    category_counts = {category: 0 for category in CATEGORY_LABELS}
+
+    for txn_type, category, total, count in aggregates:
+        total = float(total or 0)
+        if txn_type == "income":
+            income += total
+            income_count += count
+        elif txn_type == "expense":
+            expense += total
+            expense_count += count
+            category_totals[category] += total
+            category_counts[category] += count
+
+    features = {
+        "user_id": user_id,
+        "days": (end - start).days,
+        "income": income,
+        "expense": expense,
+        "balance": income - expense,
+        "income_count": income_count,
+        "expense_count": expense_count,
+        "count": income_count + expense_count,
+    }
+    for category in CATEGORY_LABELS:
+        features[f"cat_{category}"] = category_totals[category]
+        features[f"n_{category}"] = category_counts[category]
+
+    present = [c for c in CATEGORY_LABELS if category_counts[c]]
+    top_category = max(present, key=lambda c: category_totals[c]) if present else "outros"
+    features["top_category"] = top_category
+    features["top_category_label"] = CATEGORY_LABELS[top_category]
+    features["top_category_total"] = category_totals[top_category]
+
+    recurring_expenses = list(recurring_expenses)
+    features["recurring_expense_count"] = len(recurring_expenses)
+    features["recurring_expense_monthly"] = sum(recurrence.monthly_equivalent(p) for p in recurring_expenses)
+    return features
+
+
+def build_suggestions(user_id: str, aggregates: List[Aggregate], recurring_expenses: Iterable,
+                      start: date, end: date, period: str = DEFAULT_PERIOD,
+                      comparison: Optional[Dict] = None) -> Dict:
+    """
+    Gera sugestões personalizadas para um usuário.
+
+    Args:
+        user_id: ID do usuário (usado nos links de ação)
+        aggregates: Totais do período por (type, category) — ver aggregate_transactions
+        recurring_expenses: Padrões de despesa recorrente vigentes (ver recurrence.is_current)
+        start: Início do período analisado
+        end: Fim do período analisado
+        period: Nome da janela (chave de PERIODS)
+        comparison: Variação mês a mês (ver month_over_month), incluída na resposta
+
+    Returns:
+        Payload da resposta de `/suggestions`
+    """
+    if not aggregates:
+        return {"suggestions": [{
+            "type": "info",
+            "category": "getting_started",
+            "title": "Comece a registrar suas transações",
+            "description": "Adicione suas receitas e despesas para receber sugestões personalizadas",
+            "priority": "high",
+            "icon": "📊"
+        }]}
+
+    features = build_features(user_id, aggregates, recurring_expenses, start, end)
+    suggestions = suggestion_rules.evaluate_rules(suggestion_rules.get_rules(features=FEATURE_NAMES), features)
+
+    # Ordenar por prioridade
+    priority_order = {"high": 0, "medium": 1, "low": 2}
+    suggestions.sort(key=lambda x: priority_order.get(x.get("priority", "low"), 2))
+
+    result = {
+        "suggestions": suggestions,
+        "period": {
+            "name": period,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "days": features["days"]
+        },
+        "summary": {
+            "total_income": round(features["income"], 2),
+            "total_expense": round(features["expense"], 2),
+            "balance": round(features["balance"], 2),
+            "transactions_count": features["count"]
+        }
+    }
+    if comparison is not None:
+        result["comparison"] = comparison
+    return result
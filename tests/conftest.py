@@ -0,0 +1,55 @@
+"""Configuração comum dos testes.
+
+Aponta GF_DB_URL para um SQLite temporário antes de qualquer import de
+`backend`, para os testes nunca tocarem data.db nem a base de DATABASE_URL.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("RATELIMIT_ENABLED", "false")
+# Resiliência com tempos curtos (lidos no import de resilience)
+os.environ.setdefault("OPENFINANCE_CONNECT_TIMEOUT", "0.5")
+os.environ.setdefault("OPENFINANCE_READ_TIMEOUT", "0.5")
+os.environ.setdefault("OPENFINANCE_MAX_RETRIES", "3")
+os.environ.setdefault("OPENFINANCE_BACKOFF_BASE", "0.01")
+os.environ.setdefault("OPENFINANCE_BACKOFF_MAX", "0.05")
+os.environ.setdefault("OPENFINANCE_CIRCUIT_FAILURES", "3")
+os.environ.setdefault("OPENFINANCE_CIRCUIT_RESET_SECONDS", "0.2")
+os.environ.pop("DATABASE_URL", None)
+_fd, _TEST_DB = tempfile.mkstemp(prefix="gf_test_", suffix=".db")
+os.close(_fd)
+os.environ["GF_DB_URL"] = f"sqlite:///{_TEST_DB}"
+
+
+@pytest.fixture
+def session_db():
+    """Sessão em uma base com as tabelas recriadas a cada teste."""
+    import backend
+
+    engine = backend.get_engine()
+    backend.Base.metadata.create_all(engine)
+    session_factory = backend.get_session_local()
+    yield session_factory()
+    session_factory.remove()
+    backend.Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def client(session_db, monkeypatch):
+    """Cliente HTTP do app em modo de teste (sem login), na base de `session_db`."""
+    import backend
+
+    monkeypatch.setitem(backend.app.config, "TESTING", True)
+    return backend.app.test_client()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if os.path.exists(_TEST_DB):
+        os.remove(_TEST_DB)
@@ -0,0 +1,46 @@
+from datetime import date, datetime
+
+import jobs
+from backend import ARCHIVE_TABLES, Consent, Transaction
+
+DELETED_AT = datetime(2020, 1, 1)
+
+
+def archive_deleted_transaction(session_db, description):
+    session_db.add(Transaction(user_id="user-1", description=description, amount=10.0, type="expense",
+                               date=date(2020, 1, 1), deleted_at=DELETED_AT))
+    session_db.commit()
+    assert jobs.archive_deleted("transactions", retention_days=0) == 1
+
+
+def archive_deleted_consent(session_db, consent_id):
+    session_db.add(Consent(user_id="user-1", consent_id=consent_id, provider="simulated", scopes="x",
+                           status="revoked", created_at=DELETED_AT, deleted_at=DELETED_AT))
+    session_db.commit()
+    assert jobs.archive_deleted("consents", retention_days=0) == 1
+
+
+def test_reused_ids_can_be_archived_and_restored(session_db):
+    # Tabela quente vazia: o SQLite reusa o id 1 para a segunda linha
+    archive_deleted_transaction(session_db, "Primeira")
+    archive_deleted_transaction(session_db, "Segunda")
+    cold = ARCHIVE_TABLES["transactions"]
+    assert [row.id for row in session_db.execute(cold.select())] == [1, 1]
+
+    counts = jobs.restore_archived("transactions", user_id="user-1", undelete=True)
+
+    assert counts == {"restored": 2, "renumbered": 1, "conflicts": 0}
+    restored = session_db.query(Transaction.description).filter_by(user_id="user-1").order_by(Transaction.id).all()
+    assert [d for (d,) in restored] == ["Primeira", "Segunda"]
+    assert session_db.execute(cold.select()).first() is None
+
+
+def test_restore_detects_unique_conflicts_within_a_batch(session_db):
+    archive_deleted_consent(session_db, "c-1")
+    archive_deleted_consent(session_db, "c-1")
+
+    counts = jobs.restore_archived("consents", user_id="user-1")
+
+    assert counts == {"restored": 1, "renumbered": 0, "conflicts": 1}
+    assert session_db.query(Consent).filter_by(consent_id="c-1").count() == 1
+    assert len(session_db.execute(ARCHIVE_TABLES["consents"].select()).all()) == 1
@@ -0,0 +1,102 @@
+import json
+from datetime import date, datetime, timedelta
+
+import backend
+import jobs
+import suggestions
+from backend import RecurringTransaction, Transaction, UserSuggestion
+
+USERS = ("user-a", "user-b", "user-c")
+
+
+def add_transactions(session_db, user_id, rows):
+    today = date.today()
+    for days_ago, description, amount, txn_type in rows:
+        session_db.add(Transaction(user_id=user_id, description=description, amount=amount,
+                                   type=txn_type, date=today - timedelta(days=days_ago)))
+
+
+def seed(session_db):
+    """Três usuários com receitas, despesas em várias categorias e o mês anterior."""
+    add_transactions(session_db, "user-a", [
+        (1, "Salário", 5000.0, "income"), (2, "iFood", 80.0, "expense"), (3, "Restaurante Centro", 120.0, "expense"),
+        (5, "Uber viagem", 35.0, "expense"), (9, "Netflix", 39.9, "expense"), (12, "Supermercado Dia", 450.0, "expense"),
+        (20, "iFood", 95.0, "expense"), (40, "Restaurante Centro", 60.0, "expense"), (45, "Salário", 5000.0, "income"),
+    ])
+    add_transactions(session_db, "user-b", [
+        (2, "Salário", 2000.0, "income"), (4, "COMBUSTÍVEL posto", 300.0, "expense"),
+        (8, "Farmácia", 150.0, "expense"), (35, "Farmácia", 40.0, "expense"),
+    ])
+    add_transactions(session_db, "user-c", [(6, "Conta de Água", 90.0, "expense")])
+    today = date.today()
+    session_db.add(RecurringTransaction(
+        user_id="user-a", type="expense", description_key="netflix", description="Netflix", amount=39.9,
+        period="monthly", occurrences=3, first_date=today - timedelta(days=69), last_date=today - timedelta(days=9),
+        next_date=today + timedelta(days=21), status="active",
+    ))
+    session_db.commit()
+
+
+def stored_payloads(session_db):
+    session_db.expire_all()
+    return {s.user_id: json.loads(s.payload) for s in session_db.query(UserSuggestion)}
+
+
+def test_batch_payload_matches_endpoint(session_db, client):
+    seed(session_db)
+    live = {user_id: client.get(f"/api/users/{user_id}/suggestions").get_json() for user_id in USERS}
+
+    assert jobs.run_suggestions(workers=1) == len(USERS)
+
+    assert stored_payloads(session_db) == live
+    assert live["user-a"]["comparison"]  # a comparação mês a mês faz parte do payload comparado
+
+
+def test_shards_cover_each_user_once(session_db):
+    seed(session_db)
+    add_transactions(session_db, "user-0", [(70, "Farmácia", 10.0, "expense")])  # fora da janela
+    session_db.commit()
+    today = date.today()
+    since = today - timedelta(days=suggestions.WINDOW_DAYS)
+
+    shards = jobs.user_shards(session_db, since, workers=2)
+    assert shards == [("user-a", "user-b"), ("user-c", "user-c")]
+
+    # batch_size=1 grava a cada usuário: o groupby não pode misturar linhas entre lotes
+    processed = sum(jobs.compute_suggestions_shard(first, last, today.isoformat(), batch_size=1)
+                    for first, last in shards)
+    assert processed == len(USERS)
+    payloads = stored_payloads(session_db)
+    assert set(payloads) == set(USERS)
+    assert payloads["user-b"]["summary"]["transactions_count"] == 3
+    assert payloads["user-c"]["summary"]["total_expense"] == 90.0
+
+
+def test_endpoint_serves_fresh_batch_result_until_invalidated(session_db, client):
+    seed(session_db)
+    jobs.run_suggestions(workers=1)
+    cached = session_db.get(UserSuggestion, "user-c")
+    cached.payload = json.dumps({"suggestions": [], "source": "batch"})
+    session_db.commit()
+
+    assert client.get("/api/users/user-c/suggestions").get_json()["source"] == "batch"
+    # Outros períodos sempre calculam sob demanda
+    assert "source" not in client.get("/api/users/user-c/suggestions?period=7d").get_json()
+
+    backend.invalidate_suggestions(session_db, "user-c")
+    session_db.commit()
+    assert session_db.get(UserSuggestion, "user-c") is None
+    assert "source" not in client.get("/api/users/user-c/suggestions").get_json()
+
+
+def test_suggestion_freshness():
+    today = date.today()
+    fresh = UserSuggestion(user_id="u", payload="{}", period_end=today, computed_at=datetime.now())
+    assert backend.is_suggestion_fresh(fresh, today)
+
+    fresh.period_end = today - timedelta(days=1)
+    assert not backend.is_suggestion_fresh(fresh, today)
+
+    old = UserSuggestion(user_id="u", payload="{}", period_end=today,
+                         computed_at=datetime.now() - backend.SUGGESTIONS_MAX_AGE - timedelta(minutes=1))
+    assert not backend.is_suggestion_fresh(old, today)
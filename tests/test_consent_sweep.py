@@ -0,0 +1,123 @@
+from datetime import UTC, datetime, timedelta
+
+import backend
+import jobs
+import token_cache
+from backend import Consent, SyncRequest
+
+NOW = backend.to_naive_utc(datetime.now(UTC))
+PAST, FUTURE = NOW - timedelta(days=1), NOW + timedelta(days=30)
+
+
+def add_consent(session_db, consent_id, user_id="user-1", expires_at=None, status="active", deleted=False):
+    session_db.add(Consent(user_id=user_id, consent_id=consent_id, provider="static", scopes="x", status=status,
+                           expires_at=expires_at, created_at=datetime.now(),
+                           deleted_at=datetime.now() if deleted else None))
+
+
+def add_request(session_db, consent_id, status="pending", user_id="user-1"):
+    now = datetime.now()
+    session_db.add(SyncRequest(user_id=user_id, consent_id=consent_id, reason="webhook", status=status,
+                               attempts=0, available_at=now, created_at=now))
+
+
+def consent_statuses(session_db):
+    session_db.expire_all()
+    return {c.consent_id: c.status for c in session_db.query(Consent)}
+
+
+def test_expire_consents_in_keyset_batches(session_db):
+    # 5 vencidos espalhados entre usuários: com batch_size=2 são 3 lotes
+    for user_id, consent_id in [("user-b", "b-1"), ("user-a", "a-1"), ("user-c", "c-1"), ("user-a", "a-2"), ("user-b", "b-2")]:
+        add_consent(session_db, consent_id, user_id, expires_at=PAST)
+    add_consent(session_db, "future", expires_at=FUTURE)
+    add_consent(session_db, "no-expiry")
+    add_consent(session_db, "revoked", expires_at=PAST, status="revoked")
+    add_consent(session_db, "deleted", expires_at=PAST, deleted=True)
+    add_request(session_db, "a-1", user_id="user-a")
+    add_request(session_db, "b-2", status="running", user_id="user-b")
+    add_request(session_db, "future")
+    session_db.commit()
+
+    assert jobs.expire_consents(batch_size=2) == 5
+
+    assert consent_statuses(session_db) == {
+        "a-1": "expired", "a-2": "expired", "b-1": "expired", "b-2": "expired", "c-1": "expired",
+        "future": "active", "no-expiry": "active", "revoked": "revoked", "deleted": "active",
+    }
+    requests = {r.consent_id: (r.status, r.last_error) for r in session_db.query(SyncRequest)}
+    assert requests == {
+        "a-1": ("done", "consent_expired"),
+        "b-2": ("running", None),  # em andamento: o worker resolve pelo active_consents
+        "future": ("pending", None),
+    }
+    assert jobs.expire_consents(batch_size=2) == 0
+
+
+def test_consent_not_expired_filter(session_db):
+    add_consent(session_db, "past", expires_at=PAST)
+    add_consent(session_db, "future", expires_at=FUTURE)
+    add_consent(session_db, "none")
+    session_db.commit()
+
+    def live(now=None):
+        return sorted(c.consent_id for c in session_db.query(Consent).filter(backend.consent_not_expired(now)))
+
+    assert live() == ["future", "none"]
+    assert live(NOW - timedelta(days=2)) == ["future", "none", "past"]
+    assert live(FUTURE) == ["none"]  # expires_at igual a now já conta como vencido
+
+
+def test_active_consents_skip_expired_before_the_sweep(session_db):
+    add_consent(session_db, "past", expires_at=PAST)  # ainda 'active': o sweep não rodou
+    add_consent(session_db, "future", expires_at=FUTURE)
+    add_consent(session_db, "none")
+    add_consent(session_db, "revoked", status="revoked")
+    add_consent(session_db, "other-user", user_id="user-2")
+    session_db.commit()
+
+    assert [c.consent_id for c in backend.active_consents(session_db, "user-1")] == ["future", "none"]
+    assert backend.active_consents(session_db, "user-1", "past") == []
+
+
+class WarmingProvider:
+    def __init__(self):
+        self.warmed = []
+
+    def warm_token(self, consent_id):
+        self.warmed.append(consent_id)
+        return True
+
+
+class StaticRegistry:
+    def __init__(self, provider):
+        self.provider = provider
+
+    def get(self, name):
+        return self.provider
+
+
+def seed_due(session_db):
+    add_consent(session_db, "due")
+    add_consent(session_db, "due-expired", expires_at=PAST)
+    add_request(session_db, "due")
+    add_request(session_db, "due-expired")
+    session_db.commit()
+
+
+def test_prewarm_is_skipped_without_token_cache_path(session_db, monkeypatch):
+    seed_due(session_db)
+    monkeypatch.setattr(token_cache, "TOKEN_CACHE_PATH", None)
+    provider = WarmingProvider()
+
+    assert jobs.prewarm_tokens(StaticRegistry(provider), timedelta(minutes=15)) == {"warmed": 0, "skipped": 0, "failed": 0}
+    assert provider.warmed == []
+
+
+def test_prewarm_renews_tokens_of_due_live_consents(session_db, monkeypatch, tmp_path):
+    seed_due(session_db)
+    monkeypatch.setattr(token_cache, "TOKEN_CACHE_PATH", str(tmp_path / "tokens.json"))
+    provider = WarmingProvider()
+
+    assert jobs.prewarm_tokens(StaticRegistry(provider), timedelta(minutes=15)) == {"warmed": 1, "skipped": 0, "failed": 0}
+    assert provider.warmed == ["due"]
@@ -0,0 +1,18 @@
+from datetime import date
+
+import datagen
+
+
+def test_generate_user_defaults_to_a_fixed_end():
+    history = datagen.generate_user("user-1", seed=7, months=3)
+
+    assert history == datagen.generate_user("user-1", seed=7, months=3, end=datagen.DEFAULT_END)
+    assert max(t["date"] for t in history["transactions"]) <= datagen.DEFAULT_END
+    assert history != datagen.generate_user("user-1", seed=7, months=3, end=date(2025, 1, 31))
+
+
+def test_open_finance_transactions_default_to_the_fixed_end():
+    items = datagen.open_finance_transactions("acc0", 20, seed=7)
+
+    assert items == datagen.open_finance_transactions("acc0", 20, seed=7, end=datagen.DEFAULT_END)
+    assert max(item["bookingDate"] for item in items) <= datagen.DEFAULT_END.isoformat()
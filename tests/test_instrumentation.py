@@ -0,0 +1,27 @@
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+import db_profiler
+import metrics
+
+
+def test_metrics_listener_pops_start_on_failed_statement():
+    engine = create_engine("sqlite://")
+    metrics.init_app(Flask(__name__), engine)
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing_table"))
+        assert conn.info["_metrics_query_start"] == []
+        conn.execute(text("SELECT 1"))
+        assert conn.info["_metrics_query_start"] == []
+
+
+def test_db_profiler_listener_pops_start_on_failed_statement():
+    engine = create_engine("sqlite://")
+    db_profiler.init_app(Flask(__name__), engine)
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing_table"))
+        assert conn.info["_db_profile_start"] == []
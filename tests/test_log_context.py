@@ -0,0 +1,104 @@
+import logging
+import threading
+
+import pytest
+
+import backend
+from logger import ContextFilter, bind_log_context, get_log_context, reset_log_context
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def captured():
+    """Records do logger do backend (o ContextFilter roda antes dos handlers)."""
+    handler = ListHandler()
+    backend.logger.addHandler(handler)
+    yield handler.records
+    backend.logger.removeHandler(handler)
+
+
+def test_reset_restores_outer_context():
+    outer = bind_log_context(job="sweep", user_id="u-outer")
+    inner = bind_log_context(user_id="u-inner", consent_id="c-1")
+    assert get_log_context() == {"job": "sweep", "user_id": "u-inner", "consent_id": "c-1"}
+
+    reset_log_context(inner)
+    assert get_log_context() == {"job": "sweep", "user_id": "u-outer"}
+    reset_log_context(outer)
+    assert get_log_context() == {}
+
+
+def test_threads_log_with_their_own_context():
+    log = logging.getLogger("tests.log_context.threads")
+    log.propagate = False
+    handler = ListHandler()
+    log.addHandler(handler)
+    log.addFilter(ContextFilter())
+    both_bound = threading.Barrier(2)
+
+    def work(user_id):
+        token = bind_log_context(user_id=user_id)
+        both_bound.wait()  # os dois contextos estão ativos ao mesmo tempo
+        log.warning("primeiro")
+        both_bound.wait()
+        log.warning("segundo")
+        reset_log_context(token)
+        log.warning("depois")
+
+    threads = [threading.Thread(target=work, args=(user_id,)) for user_id in ("u-1", "u-2")]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        log.removeHandler(handler)
+        log.filters.clear()
+
+    by_thread = {}
+    for record in handler.records:
+        by_thread.setdefault(record.thread, []).append((record.getMessage(), getattr(record, "user_id", None)))
+    assert sorted(by_thread.values()) == [
+        [("primeiro", "u-1"), ("segundo", "u-1"), ("depois", None)],
+        [("primeiro", "u-2"), ("segundo", "u-2"), ("depois", None)],
+    ]
+
+
+def test_requests_in_parallel_threads_keep_their_request_id(client, captured):
+    ready = threading.Barrier(2)
+    statuses = []
+
+    def call(request_id):
+        ready.wait()
+        # /auth/login sem OAuth configurado loga um erro dentro da request
+        statuses.append(client.get("/auth/login", headers={"X-Request-ID": request_id}).status_code)
+
+    threads = [threading.Thread(target=call, args=(request_id,)) for request_id in ("req-a", "req-b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses == [500, 500]
+    assert sorted((r.request_id, r.endpoint) for r in captured) == [("req-a", "/auth/login"), ("req-b", "/auth/login")]
+
+
+def test_request_context_is_reset_to_the_outer_context(client, captured):
+    token = bind_log_context(job="cli")
+    try:
+        response = client.get("/auth/login", headers={"X-Request-ID": "req-outer"})
+        assert get_log_context() == {"job": "cli"}
+    finally:
+        reset_log_context(token)
+
+    assert response.headers["X-Request-ID"] == "req-outer"
+    [record] = captured
+    assert (record.request_id, record.job, record.method) == ("req-outer", "cli", "GET")
@@ -0,0 +1,133 @@
+import io
+import json
+import logging
+import os
+import sys
+from datetime import date
+
+import pytest
+
+import logger as logger_module
+from logger import LogContext, SamplingFilter, StructuredFormatter, configure_logger
+
+
+@pytest.fixture
+def make_logger(request):
+    """Logger isolado (sem propagação) com handlers/filtros limpos ao final."""
+    created = []
+
+    def factory(**kwargs):
+        stream = io.StringIO()
+        log = logging.getLogger(f"tests.{request.node.name}.{len(created)}")
+        log.setLevel(logging.DEBUG)
+        log.propagate = False
+        queue_handler = configure_logger(log, stream, **kwargs)
+        created.append((log, queue_handler))
+        return log, stream, queue_handler
+
+    yield factory
+    for log, queue_handler in created:
+        if queue_handler is not None:
+            queue_handler.stop_listener()
+        log.handlers.clear()
+        log.filters.clear()
+
+
+def lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_formatter_outputs_every_extra_field():
+    record = logging.LogRecord("app", logging.WARNING, __file__, 1, "Sync %s", ("ok",), None)
+    record.__dict__.update({"user_id": "u1", "consent_id": "c-9", "retry_in": 1.5, "day": date(2026, 1, 2),
+                            "missing": None, "level": "sobrescrita"})
+
+    log_obj = json.loads(StructuredFormatter().format(record))
+
+    assert log_obj["message"] == "Sync ok"
+    assert log_obj["level"] == "WARNING"  # extra não sobrescreve os campos base
+    assert {k: log_obj[k] for k in ("user_id", "consent_id", "retry_in", "day")} == {
+        "user_id": "u1", "consent_id": "c-9", "retry_in": 1.5, "day": "2026-01-02",
+    }
+    assert "missing" not in log_obj
+    assert not {"args", "msg", "pathname", "thread", "process"} & set(log_obj)
+
+
+def test_formatter_includes_exception():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord("app", logging.ERROR, __file__, 1, "falhou", None, sys.exc_info())
+
+    log_obj = json.loads(StructuredFormatter().format(record))
+
+    assert "ValueError: boom" in log_obj["exception"]
+
+
+def test_context_fields_are_logged_and_extra_wins(make_logger):
+    log, stream, _ = make_logger(async_mode=False)
+
+    with LogContext(log, user_id="ctx-user", request_id="r-1"):
+        log.info("dentro", extra={"user_id": "extra-user"})
+    log.info("fora")
+
+    inside, outside = lines(stream)
+    assert (inside["user_id"], inside["request_id"]) == ("extra-user", "r-1")
+    assert "request_id" not in outside
+
+
+def test_sampling_filter(monkeypatch):
+    sampler = SamplingFilter({logging.INFO: 0.25})
+    info = logging.LogRecord("app", logging.INFO, __file__, 1, "x", None, None)
+    warning = logging.LogRecord("app", logging.WARNING, __file__, 1, "x", None, None)
+
+    monkeypatch.setattr(logger_module.random, "random", lambda: 0.1)
+    assert sampler.filter(info)
+    monkeypatch.setattr(logger_module.random, "random", lambda: 0.9)
+    assert not sampler.filter(info)
+    assert sampler.filter(warning)  # níveis não listados nunca são amostrados
+
+
+def test_configured_sampling_drops_only_listed_levels(make_logger):
+    log, stream, _ = make_logger(async_mode=False, sampling=logger_module.parse_sampling("INFO=0,DEBUG=1"))
+
+    log.debug("debug")
+    log.info("info")
+    log.error("error")
+
+    assert [line["message"] for line in lines(stream)] == ["debug", "error"]
+
+
+def test_queue_mode_formats_in_listener_with_caller_context(make_logger):
+    log, stream, queue_handler = make_logger(async_mode=True)
+    assert queue_handler.listener is None  # listener só nasce no primeiro log
+
+    with LogContext(log, request_id="r-async"):
+        log.info("valor %d", 42, extra={"duration_ms": 3.2})
+    queue_handler.stop_listener()
+
+    [line] = lines(stream)
+    assert (line["message"], line["request_id"], line["duration_ms"]) == ("valor 42", "r-async", 3.2)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requer os.fork")
+def test_queue_mode_starts_a_listener_in_forked_child(make_logger, tmp_path):
+    log, _, queue_handler = make_logger(async_mode=True)
+    log.info("pai")  # listener do processo pai já rodando antes do fork
+    output = tmp_path / "child.log"
+
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover - processo filho
+        code = 1
+        try:
+            with open(output, "w") as stream:
+                queue_handler.target.setStream(stream)
+                log.info("filho")
+                queue_handler.stop_listener()
+                code = 0
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.WEXITSTATUS(status) == 0
+    assert [json.loads(line)["message"] for line in output.read_text().splitlines()] == ["filho"]
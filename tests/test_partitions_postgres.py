@@ -0,0 +1,113 @@
+"""Round trip da migração c3f9a1e7d250 + `jobs.py partitions` num PostgreSQL real.
+
+Roda só com TEST_POSTGRES_URL apontando para uma base descartável (o schema
+public é recriado) e com o pacote alembic instalado; senão é pulado.
+"""
+import os
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, insert, text
+
+import backend
+import jobs
+from backend import Transaction
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+pytestmark = pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL não definida")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PARTIAL_INDEXES = {
+    "idx_transaction_live_user_date": "deleted_at IS NULL",
+    "idx_transaction_soft_deleted": "deleted_at IS NOT NULL",
+}
+
+
+@pytest.fixture
+def pg_engine():
+    engine = create_engine(POSTGRES_URL)
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    Transaction.__table__.create(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def alembic_config():
+    alembic_config_module = pytest.importorskip("alembic.config")
+    config = alembic_config_module.Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+    config.set_main_option("sqlalchemy.url", POSTGRES_URL.replace("%", "%%"))
+    return config
+
+
+def relkind(conn) -> str:
+    return conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('transactions')")).scalar()
+
+
+def owned_sequence(conn) -> str:
+    return conn.execute(text("SELECT pg_get_serial_sequence('transactions', 'id')")).scalar()
+
+
+def index_definitions(conn) -> dict:
+    return dict(conn.execute(text("SELECT indexname, indexdef FROM pg_indexes WHERE tablename = 'transactions'")).all())
+
+
+def assert_indexes(conn) -> None:
+    definitions = index_definitions(conn)
+    for name in ("ix_transactions_user_id", "idx_transaction_date", "idx_transaction_type"):
+        assert name in definitions
+    for name, predicate in PARTIAL_INDEXES.items():
+        assert f"WHERE ({predicate})" in definitions[name]
+
+
+def insert_transaction(conn, day: date) -> int:
+    return conn.execute(insert(Transaction).returning(Transaction.id), {
+        "user_id": "user-1", "description": "Teste", "amount": 10.0, "type": "expense", "date": day,
+    }).scalar()
+
+
+def test_partition_round_trip(pg_engine, alembic_config, monkeypatch):
+    from alembic import command
+
+    this_month = date.today().replace(day=1)
+    old_month = backend.add_months(this_month, -30)
+    with pg_engine.begin() as conn:
+        for day in (old_month, backend.add_months(this_month, -1), this_month):
+            insert_transaction(conn, day)
+    command.stamp(alembic_config, "b8e1f4c2d697")
+
+    monkeypatch.setenv("TRANSACTIONS_PARTITIONED", "true")
+    monkeypatch.setenv("PARTITION_MONTHS_AHEAD", "1")
+    command.upgrade(alembic_config, "c3f9a1e7d250")
+    with pg_engine.begin() as conn:
+        assert relkind(conn) == "p"
+        partitions = jobs.transaction_partitions(conn)
+        assert {"transactions_ppast", "transactions_pfuture", f"transactions_p{old_month:%Y_%m}"} <= set(partitions)
+        assert partitions["transactions_pfuture"][0] == backend.add_months(this_month, 2)
+        assert owned_sequence(conn) == "public.transactions_id_seq"
+        assert insert_transaction(conn, this_month) == 4
+        assert_indexes(conn)
+
+    monkeypatch.setattr(backend, "get_engine", lambda: pg_engine)
+    result = jobs.run_partitions(ahead=3, retention_months=24)
+    assert result["created"] == [f"transactions_p{backend.add_months(this_month, n):%Y_%m}" for n in (2, 3)]
+    assert f"transactions_p{old_month:%Y_%m}" in result["detached"]
+    with pg_engine.begin() as conn:
+        partitions = jobs.transaction_partitions(conn)
+        assert partitions["transactions_pfuture"][0] == backend.add_months(this_month, 4)
+        assert partitions["transactions_ppast"][1] == backend.add_months(this_month, -24)
+        assert conn.execute(text("SELECT count(*) FROM transactions")).scalar() == 3
+        insert_transaction(conn, backend.add_months(this_month, -28))  # retroativo cai em transactions_ppast
+
+    command.downgrade(alembic_config, "b8e1f4c2d697")
+    with pg_engine.begin() as conn:
+        assert relkind(conn) == "r"
+        assert owned_sequence(conn) == "public.transactions_id_seq"
+        assert insert_transaction(conn, this_month) == 6
+        assert conn.execute(text("SELECT count(*) FROM transactions")).scalar() == 5
+        assert_indexes(conn)
+        # Partição desanexada continua no banco, fora da tabela
+        assert conn.execute(text(f"SELECT count(*) FROM transactions_p{old_month:%Y_%m}")).scalar() == 1
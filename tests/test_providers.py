@@ -0,0 +1,146 @@
+import time
+
+import pytest
+import requests
+
+import resilience
+from benchmarks.stub_openfinance import ACCESS_TOKEN, default_faults, start_stub_server
+from providers import OpenFinanceProvider
+from token_cache import TokenCache
+
+
+@pytest.fixture
+def stub():
+    server = start_stub_server(accounts=1, transactions=5, faults=default_faults())
+    yield server
+    server.shutdown()
+    server.server_close()
+    # Um breaker por porta: não deixa estado para um stub futuro na mesma porta
+    resilience._breakers.pop(f"127.0.0.1:{server.server_address[1]}", None)
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.acquired = []
+
+    def acquire(self, base_url, operation):
+        self.acquired.append((base_url, operation))
+
+
+def make_provider(server) -> OpenFinanceProvider:
+    return OpenFinanceProvider(
+        base_url=f"http://127.0.0.1:{server.server_address[1]}",
+        client_id="test", client_secret="test", token_cache=TokenCache(),
+    )
+
+
+def retries_for(provider: OpenFinanceProvider) -> float:
+    institution = resilience.institution_of(provider.base_url)
+    return sum(value for key, value in resilience.RETRIES.snapshot() if key[0] == institution)
+
+
+def open_circuit(stub, provider: OpenFinanceProvider) -> resilience.CircuitBreaker:
+    stub.faults["fail_rate"] = 1.0
+    with pytest.raises((resilience.CircuitOpenError, requests.HTTPError)):
+        provider.sync("user-1", "consent-1")
+    breaker = resilience.breaker_for(provider.base_url)
+    assert breaker.state == resilience.OPEN
+    return breaker
+
+
+def test_revoked_cached_token_is_invalidated_and_refetched(stub):
+    provider = make_provider(stub)
+    key = (provider.base_url, "consent-1")
+    provider.token_cache.get(key, lambda: ("revoked-token", 3600))
+
+    result = provider.sync("user-1", "consent-1")
+
+    assert len(result["transactions"]) == 5
+    assert provider.token_cache.get(key, lambda: pytest.fail("token deveria estar em cache")) == ACCESS_TOKEN
+
+
+def test_transient_errors_are_retried(stub):
+    provider = make_provider(stub)
+    stub.faults["fail_next"] = 2
+
+    result = provider.sync("user-1", "consent-1")
+
+    assert len(result["transactions"]) == 5
+    assert retries_for(provider) == 2
+    assert resilience.breaker_for(provider.base_url).state == resilience.CLOSED
+
+
+def test_retry_after_is_respected(stub):
+    provider = make_provider(stub)
+    stub.faults.update(fail_next=1, fail_status=429, retry_after=1)
+
+    start = time.perf_counter()
+    result = provider.sync("user-1", "consent-1")
+
+    assert len(result["transactions"]) == 5
+    assert time.perf_counter() - start >= 1.0
+    assert retries_for(provider) == 1
+
+
+def test_circuit_opens_and_fails_fast(stub):
+    provider = make_provider(stub)
+    open_circuit(stub, provider)
+
+    stub.faults["fail_rate"] = 0.0
+    start = time.perf_counter()
+    with pytest.raises(resilience.CircuitOpenError):
+        provider.sync("user-1", "consent-1")
+    assert time.perf_counter() - start < 0.1
+
+
+def test_open_circuit_does_not_consume_rate_limit_budget(stub):
+    provider = make_provider(stub)
+    open_circuit(stub, provider)
+    provider.rate_limiter = CountingLimiter()
+
+    with pytest.raises(resilience.CircuitOpenError):
+        provider.sync("user-1", "consent-1")
+    assert provider.rate_limiter.acquired == []
+
+
+def test_half_open_probe_closes_circuit_on_success(stub):
+    provider = make_provider(stub)
+    breaker = open_circuit(stub, provider)
+
+    stub.faults["fail_rate"] = 0.0
+    time.sleep(breaker.reset_timeout)
+    result = provider.sync("user-1", "consent-1")
+
+    assert len(result["transactions"]) == 5
+    assert breaker.state == resilience.CLOSED
+
+
+def test_half_open_probe_failure_reopens_circuit(stub):
+    provider = make_provider(stub)
+    breaker = open_circuit(stub, provider)
+
+    time.sleep(breaker.reset_timeout)
+    with pytest.raises((resilience.CircuitOpenError, requests.HTTPError)):
+        provider.sync("user-1", "consent-1")
+    assert breaker.state == resilience.OPEN
+
+
+def test_unexpected_error_releases_half_open_probe(stub, monkeypatch):
+    provider = make_provider(stub)
+    breaker = open_circuit(stub, provider)
+    stub.faults["fail_rate"] = 0.0
+    time.sleep(breaker.reset_timeout)
+
+    def broken_request(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as patch:
+        patch.setattr(provider.session, "request", broken_request)
+        with pytest.raises(KeyboardInterrupt):
+            provider.sync("user-1", "consent-1")
+    assert breaker.state == resilience.HALF_OPEN
+
+    result = provider.sync("user-1", "consent-1")
+
+    assert len(result["transactions"]) == 5
+    assert breaker.state == resilience.CLOSED
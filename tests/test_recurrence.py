@@ -0,0 +1,123 @@
+from datetime import date
+from types import SimpleNamespace
+
+import backend
+import recurrence
+
+
+def new_pattern(**fields):
+    return SimpleNamespace(**fields)
+
+
+def txn(day, description="NETFLIX.COM", amount=39.9, txn_type="expense", txn_id=0):
+    return SimpleNamespace(id=txn_id, description=description, amount=amount, type=txn_type, date=day)
+
+
+def monthly_rows(start, count, **kwargs):
+    return [txn(recurrence.shift(start, "monthly", n), **kwargs) for n in range(count)]
+
+
+def test_classify_gap():
+    assert recurrence.classify_gap(7) == "weekly"
+    assert recurrence.classify_gap(8) == "weekly"
+    assert recurrence.classify_gap(28) == "monthly"
+    assert recurrence.classify_gap(31) == "monthly"
+    assert recurrence.classify_gap(15) is None
+    assert recurrence.classify_gap(45) is None
+
+
+def test_cycles_between():
+    assert recurrence.cycles_between(30, "monthly") == 1
+    assert recurrence.cycles_between(61, "monthly") == 2  # uma ocorrência faltou
+    assert recurrence.cycles_between(21, "weekly") == 3
+    assert recurrence.cycles_between(45, "monthly") is None
+    assert recurrence.cycles_between(10, "weekly") is None
+
+
+def test_shift_clamps_month_end():
+    assert recurrence.shift(date(2026, 1, 31), "monthly") == date(2026, 2, 28)
+    assert recurrence.shift(date(2026, 12, 15), "monthly") == date(2027, 1, 15)
+    assert recurrence.shift(date(2026, 3, 31), "monthly", 3) == date(2026, 6, 30)
+    assert recurrence.shift(date(2026, 1, 1), "weekly", 2) == date(2026, 1, 15)
+
+
+def test_update_patterns_confirms_after_min_occurrences():
+    patterns = []
+    rows = monthly_rows(date(2026, 1, 5), 2)
+    patterns += recurrence.update_patterns(patterns, rows, new_pattern)
+    assert [(p.status, p.period, p.occurrences) for p in patterns] == [("candidate", "monthly", 2)]
+
+    created = recurrence.update_patterns(patterns, [txn(date(2026, 3, 5), amount=41.0)], new_pattern)
+    assert created == []
+    pattern = patterns[0]
+    assert (pattern.status, pattern.occurrences, pattern.next_date) == ("active", 3, date(2026, 4, 5))
+    assert round(pattern.amount, 2) == 40.27
+
+
+def test_outlier_does_not_restart_active_pattern():
+    patterns = recurrence.update_patterns([], monthly_rows(date(2026, 1, 5), 3), new_pattern)
+    pattern = patterns[0]
+
+    recurrence.update_patterns(patterns, [txn(date(2026, 3, 20))], new_pattern)
+
+    assert (pattern.status, pattern.occurrences, pattern.last_date) == ("active", 3, date(2026, 3, 5))
+    recurrence.update_patterns(patterns, [txn(date(2026, 4, 5))], new_pattern)
+    assert (pattern.occurrences, pattern.next_date) == (4, date(2026, 5, 5))
+
+
+def test_off_cadence_row_restarts_stale_pattern():
+    patterns = recurrence.update_patterns([], monthly_rows(date(2026, 1, 5), 3), new_pattern)
+    pattern = patterns[0]
+
+    recurrence.update_patterns(patterns, [txn(date(2026, 8, 20))], new_pattern)
+
+    assert (pattern.status, pattern.occurrences, pattern.first_date) == ("candidate", 1, date(2026, 8, 20))
+
+
+def test_backdated_keys():
+    patterns = recurrence.update_patterns([], monthly_rows(date(2026, 2, 5), 2), new_pattern)
+    rows = [txn(date(2026, 1, 5)), txn(date(2026, 4, 5), description="Spotify"), txn(date(2026, 1, 5), txn_type="income")]
+
+    assert recurrence.backdated_keys(patterns, rows) == {("expense", "netflix com")}
+
+
+def add_transaction(session_db, day, description="NETFLIX.COM", amount=39.9):
+    session_db.add(backend.Transaction(user_id="user-1", description=description, amount=amount,
+                                       type="expense", date=day))
+    session_db.commit()
+
+
+def user_patterns(session_db):
+    return session_db.query(backend.RecurringTransaction).filter_by(user_id="user-1").all()
+
+
+def test_detect_recurrences_advances_cursor(session_db):
+    for day in (date(2026, 1, 5), date(2026, 2, 5)):
+        add_transaction(session_db, day)
+    assert backend.detect_recurrences(session_db, "user-1") == 2
+    assert backend.detect_recurrences(session_db, "user-1") == 0
+
+    add_transaction(session_db, date(2026, 3, 5))
+    assert backend.detect_recurrences(session_db, "user-1") == 1
+    [pattern] = user_patterns(session_db)
+    assert (pattern.status, pattern.occurrences) == ("active", 3)
+    assert session_db.get(backend.RecurrenceCursor, "user-1").last_transaction_id == 3
+
+
+def test_detect_recurrences_rebuilds_group_for_backdated_rows(session_db):
+    for day in (date(2026, 3, 5), date(2026, 4, 5)):
+        add_transaction(session_db, day)
+    add_transaction(session_db, date(2026, 4, 10), description="Spotify", amount=21.9)
+    backend.detect_recurrences(session_db, "user-1")
+
+    # Importação tardia de meses anteriores: ids novos, datas antigas
+    for day in (date(2026, 1, 5), date(2026, 2, 5)):
+        add_transaction(session_db, day)
+    assert backend.detect_recurrences(session_db, "user-1") == 2
+
+    patterns = {p.description_key: p for p in user_patterns(session_db)}
+    netflix = patterns["netflix com"]
+    assert (netflix.status, netflix.occurrences) == ("active", 4)
+    assert (netflix.first_date, netflix.last_date) == (date(2026, 1, 5), date(2026, 4, 5))
+    assert netflix.next_date == date(2026, 5, 5)
+    assert patterns["spotify"].occurrences == 1
@@ -0,0 +1,110 @@
+import json
+import os
+
+import pytest
+
+import suggestion_rules
+from suggestion_rules import RuleError, compile_expression, compile_rules, get_rules
+from suggestions import FEATURE_NAMES
+
+
+def evaluate(expr, features=None):
+    return compile_expression(expr)(features or {}, {})
+
+
+@pytest.mark.parametrize("expr, expected", [
+    (["+", 1, 2, 3], 6),
+    (["-", 10, 4], 6),
+    (["*", 2, 3, 0.5], 3.0),
+    (["/", 9, 3], 3.0),
+    (["/", 9, 0], 0.0),
+    (["min", 4, 2, 8], 2),
+    (["max", 4, 2, 8], 8),
+    (["abs", -5], 5),
+    (["if", [">", "income", 0], "income", -1], 100.0),
+    (["and", [">=", "income", 100], ["!=", "expense", 0]], False),
+    (["or", ["<", "income", 0], ["==", "missing", 0]], True),
+    (["not", ["<=", "income", 50]], True),
+])
+def test_compile_expression_operators(expr, expected):
+    assert evaluate(expr, {"income": 100.0, "expense": 0.0}) == expected
+
+
+def test_let_names_resolve_from_lets():
+    fn = compile_expression(["*", "pct", 2], frozenset({"pct"}))
+    assert fn({"pct": 1.0}, {"pct": 10.0}) == 20.0
+
+
+@pytest.mark.parametrize("expr, message", [
+    (["-", 1], "exige 2 argumentos"),
+    (["<", 1, 2, 3], "exige 2 argumentos"),
+    (["abs", 1, 2], "exige 1 argumento"),
+    (["if", 1, 2], "exige 3 argumentos"),
+    (["max"], "exige argumentos"),
+    (["pow", 2, 3], "Operador desconhecido"),
+    ([], "Expressão inválida"),
+    ({"op": "+"}, "Expressão inválida"),
+])
+def test_compile_expression_errors(expr, message):
+    with pytest.raises(RuleError, match=message):
+        compile_expression(expr)
+
+
+def rule(description, **extra):
+    return {"id": "r", "let": {"pct": ["*", "income", 0.1]}, "suggestion": {"description": description}, **extra}
+
+
+def test_template_fields_are_checked_against_features_and_lets():
+    features = frozenset({"income", "days"})
+    [compiled] = compile_rules([rule("R$ {income:.2f} ({pct:.{days}f}%)")], features)
+    assert compiled.evaluate({"income": 200.0, "days": 1})["description"] == "R$ 200.00 (20.0%)"
+
+    for template in ("{incme}", "{income.real}", "{income[0]}", "{0}", "{pct:{width}}"):
+        with pytest.raises(RuleError, match="Campo desconhecido"):
+            compile_rules([rule(template)], features)
+    with pytest.raises(RuleError, match="Template inválido"):
+        compile_rules([rule("{income")], features)
+    # Sem features conhecidas a checagem fica desligada
+    assert len(compile_rules([rule("{qualquer}")])) == 1
+
+
+def test_disabled_rules_are_skipped():
+    assert compile_rules([rule("x", enabled=False)]) == []
+
+
+def test_bundled_rules_compile_against_feature_names():
+    with open(suggestion_rules.DEFAULT_RULES_PATH, encoding="utf-8") as f:
+        definitions = json.load(f)["rules"]
+    assert len(compile_rules(definitions, FEATURE_NAMES)) == sum(d.get("enabled", True) for d in definitions)
+
+
+def write_rules(path, content, mtime):
+    path.write_text(content if isinstance(content, str) else json.dumps({"rules": content}), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_get_rules_invalid_first_load_yields_no_rules(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, "{ não é json", 1_000)
+    assert get_rules(str(path)) == []
+
+    write_rules(path, [rule("ok")], 2_000)
+    assert [r.id for r in get_rules(str(path))] == ["r"]
+
+    # Versão inválida depois de uma válida: mantém a anterior
+    write_rules(path, [{"id": "quebrada", "when": ["pow", 1, 2], "suggestion": {}}], 3_000)
+    assert [r.id for r in get_rules(str(path))] == ["r"]
+
+    assert get_rules(str(tmp_path / "ausente.json")) == []
+
+
+def test_get_rules_cache_is_keyed_by_features(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, [rule("{income}")], 1_000)
+
+    unchecked = get_rules(str(path))
+    assert get_rules(str(path)) is unchecked
+    assert [r.id for r in get_rules(str(path), frozenset({"income"}))] == ["r"]
+    # Com features que não cobrem o template a compilação falha (sem versão válida para essa chave)
+    assert get_rules(str(path), frozenset({"expense"})) == []
+    assert get_rules(str(path)) is unchecked
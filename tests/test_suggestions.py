@@ -0,0 +1,17 @@
+from sqlalchemy import create_engine, literal, select
+
+from suggestions import categorize, category_expression
+
+DESCRIPTIONS = [
+    "Restaurante Centro", "ALMOÇO executivo", "Almoço", "iFood", "UBER EATS",
+    "Uber viagem", "COMBUSTÍVEL posto", "Netflix", "ÁGUA e esgoto", "Conta de Água",
+    "Supermercado Dia", "Farmácia", "",
+]
+
+
+def test_category_expression_matches_categorize_on_sqlite():
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        for description in DESCRIPTIONS:
+            sql_category = conn.execute(select(category_expression(literal(description)))).scalar()
+            assert sql_category == categorize(description), description
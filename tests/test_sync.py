@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+import backend
+
+
+class StaticProvider:
+    """Provider que devolve linhas fixas por consent."""
+
+    def __init__(self, rows_by_consent):
+        self.rows_by_consent = rows_by_consent
+
+    def sync(self, local_user_id, consent_id=None):
+        return {"transactions": self.rows_by_consent[consent_id], "source": "static"}
+
+
+class StaticRegistry:
+    def __init__(self, provider):
+        self.provider = provider
+
+    def get(self, name):
+        return self.provider
+
+
+def row(description, amount, txn_type="expense", day="2026-01-05"):
+    return {"description": description, "amount": amount, "type": txn_type, "date": day}
+
+
+def test_invalid_rows_fail_only_their_consent(session_db):
+    registry = StaticRegistry(StaticProvider({
+        "c-bad": [row("Mercado", 10.0), row("Sem valor", 0)],
+        "c-good": [row("Salário", 100.0, "income"), row("Padaria", 5.5)],
+    }))
+    consents = [SimpleNamespace(consent_id="c-bad", provider="static"),
+                SimpleNamespace(consent_id="c-good", provider="static")]
+
+    result = backend.sync_open_finance(session_db, registry, "user-1", consents)
+
+    assert sorted(t.description for t in result["inserted"]) == ["Mercado", "Padaria", "Salário"]
+    assert result["failed"] == [{
+        "consent_id": "c-bad", "provider": "static", "error": "invalid_provider_data",
+        "errors": {1: {"amount": ["Must be greater than 0."]}},
+    }]
+    assert session_db.query(backend.Transaction).filter_by(user_id="user-1").count() == 3
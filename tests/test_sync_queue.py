@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import backend
+import jobs
+from backend import Consent, SyncRequest
+
+
+class StaticProvider:
+    def __init__(self, error=None):
+        self.error = error
+
+    def sync(self, local_user_id, consent_id=None):
+        if self.error is not None:
+            raise self.error
+        return {"transactions": [{"description": "Mercado", "amount": 10.0, "type": "expense",
+                                  "date": "2026-01-05"}], "source": "static"}
+
+
+class StaticRegistry:
+    def __init__(self, provider):
+        self.provider = provider
+
+    def get(self, name):
+        return self.provider
+
+
+def add_consent(session_db, consent_id="c-1", user_id="user-1"):
+    session_db.add(Consent(user_id=user_id, consent_id=consent_id, provider="static", scopes="x",
+                           status="active", created_at=datetime.now()))
+    session_db.commit()
+
+
+def add_request(session_db, status, consent_id="c-1", attempts=0, updated_at=None):
+    now = datetime.now()
+    sync_request = SyncRequest(user_id="user-1", consent_id=consent_id, reason="webhook", status=status,
+                               attempts=attempts, available_at=now, created_at=now, updated_at=updated_at or now)
+    session_db.add(sync_request)
+    session_db.commit()
+    return sync_request.id
+
+
+def claim_duplicates(session_db):
+    """Um pedido pendente e um running abandonado do mesmo consent, reclamados juntos."""
+    add_consent(session_db)
+    stale = datetime.now() - timedelta(seconds=jobs.SYNC_QUEUE_STALE_SECONDS + 60)
+    ids = [add_request(session_db, "running", attempts=1, updated_at=stale), add_request(session_db, "pending")]
+    claimed = jobs.claim_sync_requests(session_db, limit=10)
+    assert sorted(request_id for request_id, _ in claimed) == ids
+    return ids
+
+
+def statuses(session_db, ids):
+    session_db.expire_all()
+    return [(r.status, r.last_error) for r in session_db.query(SyncRequest).filter(SyncRequest.id.in_(ids)).order_by(SyncRequest.id)]
+
+
+def test_every_request_of_a_consent_gets_its_outcome(session_db):
+    ids = claim_duplicates(session_db)
+
+    counts = jobs.process_user_sync(StaticRegistry(StaticProvider()), "user-1", ids)
+
+    assert counts == {"done": 2, "pending": 0, "failed": 0}
+    assert statuses(session_db, ids) == [("done", None), ("done", None)]
+    assert session_db.query(backend.Transaction).count() == 1
+
+
+def test_failed_duplicates_leave_a_single_pending_retry(session_db):
+    ids = claim_duplicates(session_db)
+
+    counts = jobs.process_user_sync(StaticRegistry(StaticProvider(RuntimeError("fora do ar"))), "user-1", ids)
+
+    assert counts == {"done": 1, "pending": 1, "failed": 0}
+    assert statuses(session_db, ids) == [("pending", "fora do ar"), ("done", "coalesced: fora do ar")]
+
+
+def test_failure_defers_to_a_request_enqueued_during_the_sync(session_db):
+    add_consent(session_db)
+    claimed = add_request(session_db, "pending")
+    jobs.claim_sync_requests(session_db, limit=10)
+    newer = add_request(session_db, "pending")  # webhook chegou enquanto o sync rodava
+
+    counts = jobs.process_user_sync(StaticRegistry(StaticProvider(RuntimeError("timeout"))), "user-1", [claimed])
+
+    assert counts == {"done": 1, "pending": 0, "failed": 0}
+    assert statuses(session_db, [claimed, newer]) == [("done", "coalesced: timeout"), ("pending", None)]
+
+
+def test_concurrent_enqueue_keeps_one_pending_request(session_db):
+    add_consent(session_db)
+    other = Session(backend.get_engine())
+    try:
+        # As duas transações consultam a fila antes de qualquer commit
+        assert backend.enqueue_syncs(session_db, {"c-1": "user-1"}, reason="webhook") == 1
+        assert backend.enqueue_syncs(other, {"c-1": "user-1"}, reason="webhook") == 1
+        session_db.commit()
+        with pytest.raises(IntegrityError):
+            other.commit()
+        other.rollback()
+        assert backend.enqueue_syncs(other, {"c-1": "user-1"}, reason="webhook") == 0
+    finally:
+        other.close()
+    assert session_db.query(SyncRequest).filter_by(status="pending").count() == 1
@@ -0,0 +1,164 @@
+import json
+
+import pytest
+import requests
+
+import backend
+import tracing
+from providers import OpenFinanceProvider
+from token_cache import TokenCache
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def export_path(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "_exporter", tracing.FileExporter(str(path)))
+    return path
+
+
+@pytest.fixture
+def traced_client(session_db, export_path, monkeypatch):
+    """App criado com tracing ligado, exportando para `export_path`."""
+    monkeypatch.setattr(tracing, "ENABLED", True)
+    app = backend.create_app()
+    app.config["TESTING"] = True
+    return app.test_client()
+
+
+def exported(path):
+    """Spans de cada linha exportada: [[span, ...], ...]."""
+    traces = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        [resource_spans] = json.loads(line)["resourceSpans"]
+        [scope_spans] = resource_spans["scopeSpans"]
+        traces.append(scope_spans["spans"])
+    return traces
+
+
+def attributes(span):
+    return {a["key"]: next(iter(a["value"].values())) for a in span["attributes"]}
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("abc-123_x.y:z", "abc-123_x.y:z"),
+    ("a" * 128, "a" * 128),
+    ("a" * 129, None),
+    ("tem espaço", None),
+    ("quebra\nde linha", None),
+    ("", None),
+    (None, None),
+])
+def test_clean_request_id(value, expected):
+    assert tracing.clean_request_id(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    (f"00-{TRACE_ID}-{PARENT_ID}-01", (TRACE_ID, PARENT_ID)),
+    (f"00-{'0' * 32}-{PARENT_ID}-01", None),
+    (f"00-{TRACE_ID}-{'0' * 16}-01", None),
+    (f"01-{TRACE_ID}-{PARENT_ID}-01", None),
+    (f"00-{TRACE_ID.upper()}-{PARENT_ID}-01", None),
+    (None, None),
+])
+def test_parse_traceparent(value, expected):
+    assert tracing.parse_traceparent(value) == expected
+
+
+def test_spans_are_parented_and_exported_as_otlp_json(export_path):
+    with tracing.trace("job", job="sweep") as root:
+        with tracing.span("outer", tracing.KIND_CLIENT, retries=2, ratio=0.5, dry_run=False) as outer:
+            with tracing.span("inner") as inner:
+                assert tracing.current_span() is inner
+            assert tracing.current_span() is outer
+        with pytest.raises(ValueError):
+            with tracing.span("falha"):
+                raise ValueError("boom")
+    assert tracing.current_span() is None
+
+    [spans] = exported(export_path)
+    by_name = {s["name"]: s for s in spans}
+    assert [s["name"] for s in spans] == ["inner", "outer", "falha", "job"]  # ordem de término
+    assert {s["traceId"] for s in spans} == {root.trace_id}
+    assert "parentSpanId" not in by_name["job"]
+    assert by_name["outer"]["parentSpanId"] == root.span_id
+    assert by_name["inner"]["parentSpanId"] == outer.span_id
+    assert by_name["falha"]["status"] == {"code": tracing.STATUS_ERROR, "message": "ValueError: boom"}
+    assert by_name["outer"]["status"] == {"code": tracing.STATUS_OK}
+    assert by_name["outer"]["kind"] == tracing.KIND_CLIENT
+    assert by_name["outer"]["attributes"] == [
+        {"key": "retries", "value": {"intValue": "2"}},
+        {"key": "ratio", "value": {"doubleValue": 0.5}},
+        {"key": "dry_run", "value": {"boolValue": False}},
+    ]
+    assert int(by_name["job"]["endTimeUnixNano"]) >= int(by_name["job"]["startTimeUnixNano"])
+
+
+def test_span_outside_a_trace_is_a_noop(export_path):
+    with tracing.span("solto") as span:
+        assert span is None
+    assert not export_path.exists()
+
+
+class RecordingSession:
+    """Sessão HTTP falsa que guarda os headers enviados."""
+
+    def __init__(self):
+        self.headers = []
+
+    def request(self, method, url, **kwargs):
+        self.headers.append(kwargs.get("headers") or {})
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+
+def test_provider_calls_propagate_traceparent(export_path):
+    provider = OpenFinanceProvider(base_url="http://banco.test", client_id="test", client_secret="test",
+                                   token_cache=TokenCache())
+    provider.session = RecordingSession()
+
+    provider._request("GET", "http://banco.test/accounts", "accounts")  # fora de trace: sem header
+    with tracing.trace("sync"):
+        provider._request("GET", "http://banco.test/accounts", "accounts", headers={"Accept": "application/json"})
+
+    [untraced, traced] = provider.session.headers
+    assert "traceparent" not in untraced
+    [spans] = exported(export_path)
+    client_span = next(s for s in spans if s["name"] == "GET accounts")
+    assert traced == {"Accept": "application/json",
+                      "traceparent": f"00-{client_span['traceId']}-{client_span['spanId']}-01"}
+    assert attributes(client_span)["http.status_code"] == "200"
+
+
+def test_request_trace_is_exported_with_sql_spans(traced_client, export_path):
+    response = traced_client.get("/api/users/user-1/transactions",
+                                 headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01", "X-Request-ID": "req-1"})
+
+    assert response.status_code == 200
+    assert response.headers["X-Request-ID"] == "req-1"
+    [spans] = exported(export_path)
+    [server] = [s for s in spans if s["kind"] == tracing.KIND_SERVER]
+    assert server["name"] == "GET /api/users/<user_id>/transactions"
+    assert (server["traceId"], server["parentSpanId"]) == (TRACE_ID, PARENT_ID)
+    server_attributes = attributes(server)
+    assert (server_attributes["request.id"], server_attributes["http.status_code"]) == ("req-1", "200")
+    sql = [s for s in spans if s["kind"] == tracing.KIND_CLIENT]
+    assert sql and all(s["parentSpanId"] == server["spanId"] and s["traceId"] == TRACE_ID for s in sql)
+    assert any(attributes(s)["db.statement"].startswith("SELECT") for s in sql)
+
+
+def test_request_id_becomes_the_trace_id_or_is_replaced(traced_client, export_path):
+    hex_id = "0123456789abcdef0123456789abcdef"
+    first = traced_client.get("/api/health", headers={"X-Request-ID": hex_id})
+    second = traced_client.get("/api/health", headers={"X-Request-ID": "inválido com espaço"})
+
+    assert first.headers["X-Request-ID"] == hex_id
+    generated = second.headers["X-Request-ID"]
+    assert tracing._HEX32.match(generated)  # id inválido descartado: gera um novo
+    [first_trace], [second_trace] = exported(export_path)
+    assert first_trace["traceId"] == hex_id
+    assert "parentSpanId" not in first_trace
+    assert attributes(second_trace)["request.id"] == generated
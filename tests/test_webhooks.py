@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import backend
+from backend import Consent, SyncRequest, WebhookEvent
+
+
+def add_consent(session_db, consent_id="c-1", user_id="user-1"):
+    session_db.add(Consent(user_id=user_id, consent_id=consent_id, provider="simulated", scopes="x",
+                           status="active", created_at=datetime.now()))
+    session_db.commit()
+
+
+def test_events_with_the_same_id_are_deduplicated(session_db):
+    add_consent(session_db)
+    event = {"event_id": "evt-1", "event": "transaction.created", "consent_id": "c-1"}
+
+    first = backend.ingest_webhook_events(session_db, [event, dict(event)])
+    again = backend.ingest_webhook_events(session_db, [dict(event)])
+
+    assert (first["processed"], first["duplicates"], first["queued"]) == (1, 1, 1)
+    assert (again["processed"], again["duplicates"]) == (0, 1)
+    assert session_db.query(WebhookEvent).count() == 1
+
+
+def test_identical_events_without_id_are_not_dropped(session_db):
+    add_consent(session_db)
+    event = {"event": "transaction.created", "consent_id": "c-1"}
+
+    first = backend.ingest_webhook_events(session_db, [event, dict(event)])
+    session_db.query(SyncRequest).update({SyncRequest.status: "done"})
+    session_db.commit()
+    later = backend.ingest_webhook_events(session_db, [dict(event)])
+
+    assert (first["processed"], first["duplicates"], first["queued"]) == (2, 0, 1)
+    assert (later["processed"], later["duplicates"], later["queued"]) == (1, 0, 1)
+    assert session_db.query(WebhookEvent).count() == 0
+
+
+def test_status_changes_follow_arrival_order_in_mixed_batches(session_db):
+    add_consent(session_db, "c-1")
+    add_consent(session_db, "c-2")
+    events = [
+        {"event": "consent.revoked", "consent_id": "c-1"},
+        {"event_id": "evt-1", "event": "consent.expired", "consent_id": "c-1"},
+        {"event_id": "evt-2", "event": "consent.expired", "consent_id": "c-2"},
+        {"event": "consent.revoked", "consent_id": "c-2"},
+    ]
+
+    result = backend.ingest_webhook_events(session_db, events)
+
+    session_db.expire_all()
+    assert {c.consent_id: c.status for c in session_db.query(Consent)} == {"c-1": "expired", "c-2": "revoked"}
+    assert (result["processed"], result["status_changes"]) == (4, 2)
+    assert sorted(e.event_id for e in session_db.query(WebhookEvent)) == ["evt-1", "evt-2"]
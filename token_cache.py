@@ -0,0 +1,151 @@
+"""Cache de access tokens Open Finance por (base_url, consent_id).
+
+- Expiração por entrada, com refresh proativo `refresh_margin` segundos antes
+  de expirar: um único thread renova enquanto os demais seguem usando o token
+  ainda válido.
+- Single-flight: com o token expirado, apenas um thread por chave chama o
+  endpoint de token; os outros esperam o lock da chave e reaproveitam o resultado.
+- Persistência opcional em JSON (permissão 0600, escrita atômica) para que
+  restarts/novos workers não disparem uma rajada de pedidos de token. Antes de
+  pedir um token, o arquivo é relido: tokens renovados por outro processo
+  (workers, sweep de consents) são reaproveitados.
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from logger import logger
+
+TokenKey = Tuple[str, str]  # (base_url, consent_id)
+
+REFRESH_MARGIN = float(os.getenv("TOKEN_REFRESH_MARGIN_SECONDS", "60"))
+TOKEN_CACHE_PATH = os.getenv("TOKEN_CACHE_PATH")
+
+
+def _serialize_key(key: TokenKey) -> str:
+    return json.dumps(list(key))
+
+
+class TokenCache:
+    """Cache thread-safe de tokens com refresh proativo e single-flight.
+
+    Args:
+        refresh_margin: Segundos antes da expiração em que o token é renovado
+        persist_path: Arquivo JSON opcional para sobreviver a restarts
+    """
+
+    def __init__(self, refresh_margin: float = REFRESH_MARGIN, persist_path: Optional[str] = None):
+        self.refresh_margin = refresh_margin
+        self.persist_path = persist_path
+        self._entries: Dict[TokenKey, Tuple[str, float, float]] = {}  # chave → (token, expira_em, renovar_em)
+        self._locks: Dict[TokenKey, threading.Lock] = {}
+        self._guard = threading.Lock()
+        if persist_path:
+            self._entries.update(self._read_file())
+
+    def _lock_for(self, key: TokenKey) -> threading.Lock:
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def get(self, key: TokenKey, fetch: Callable[[], Tuple[str, float]]) -> str:
+        """Token válido para a chave, chamando `fetch` (→ (token, expires_in)) se preciso."""
+        entry = self._entries.get(key)
+        now = time.time()
+        if entry is not None and now < entry[2]:
+            return entry[0]
+
+        lock = self._lock_for(key)
+        if entry is not None and now < entry[1]:
+            # Ainda válido, mas perto de expirar: só um thread renova, os outros não esperam
+            if not lock.acquire(blocking=False):
+                return entry[0]
+        else:
+            lock.acquire()
+        try:
+            # Outro thread pode ter renovado enquanto esperávamos o lock
+            entry = self._entries.get(key)
+            if entry is not None and time.time() < entry[2]:
+                return entry[0]
+            if self.persist_path:
+                # Outro processo (ex.: `jobs.py consent-sweep`) pode já ter renovado no arquivo
+                stored = self._read_file().get(key)
+                if stored is not None and time.time() < stored[2]:
+                    self._entries[key] = stored
+                    return stored[0]
+            try:
+                token, expires_in = fetch()
+            except Exception:
+                if entry is not None and time.time() < entry[1]:
+                    return entry[0]  # falha no refresh proativo: usa o token ainda válido
+                raise
+            expires_in = float(expires_in)
+            now = time.time()
+            # Tokens curtos: renova na metade da vida em vez de ficar sempre "perto de expirar"
+            refresh_in = max(expires_in - self.refresh_margin, expires_in / 2)
+            self._entries[key] = (token, now + expires_in, now + refresh_in)
+            if self.persist_path:
+                self._persist(key)
+            return token
+        finally:
+            lock.release()
+
+    def invalidate(self, key: TokenKey) -> None:
+        """Remove o token (ex.: 401 da instituição)."""
+        self._entries.pop(key, None)
+        if self.persist_path:
+            self._persist(key)
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+    def _read_file(self) -> Dict[TokenKey, Tuple[str, float, float]]:
+        try:
+            with open(self.persist_path, encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Cache de tokens ilegível, ignorando", extra={"error": str(e)})
+            return {}
+        now = time.time()
+        return {
+            tuple(json.loads(key)): (token, expires_at, refresh_at)
+            for key, (token, expires_at, refresh_at) in raw.items()
+            if expires_at > now
+        }
+
+    def _persist(self, key: TokenKey) -> None:
+        """Mescla a entrada com o arquivo atual (outros workers) e grava de forma atômica."""
+        with self._guard:
+            merged = self._read_file()
+            if key in self._entries:
+                merged[key] = self._entries[key]
+            else:
+                merged.pop(key, None)
+            tmp_path = f"{self.persist_path}.{os.getpid()}.tmp"
+            try:
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({_serialize_key(k): list(v) for k, v in merged.items()}, f)
+                os.replace(tmp_path, self.persist_path)
+            except OSError as e:
+                logger.warning("Falha ao persistir cache de tokens", extra={"error": str(e)})
+
+
+_default_cache: Optional[TokenCache] = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> TokenCache:
+    """Cache compartilhado pelo processo (TOKEN_CACHE_PATH / TOKEN_REFRESH_MARGIN_SECONDS)."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = TokenCache(REFRESH_MARGIN, TOKEN_CACHE_PATH)
+        return _default_cache
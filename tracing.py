@@ -0,0 +1,267 @@
+"""Tracing leve: request-id, spans e exportação OTLP/JSON em arquivo.
+
+Com `TRACE_EXPORT_PATH` definido, cada request gera um trace com:
+
+- span SERVER da view (`GET /api/users/<user_id>/summary`);
+- span CLIENT por statement SQL (listeners do SQLAlchemy);
+- span CLIENT por chamada HTTP do `OpenFinanceProvider` (que também propaga
+  o header W3C `traceparent` para a instituição).
+
+Ao fim da request, os spans são gravados como uma linha JSON no formato
+OTLP/JSON (`resourceSpans`), importável por coletores OpenTelemetry
+(`otelcol` filelog/otlpjsonfile) ou lida com `jq`. Sem a variável, nenhum hook
+é registrado e `span()` é um no-op.
+
+O trace usa o `traceparent` recebido, ou o `X-Request-ID` se já for um id de
+32 hex, ou um id novo; o request-id fica como atributo `request.id`.
+"""
+from __future__ import annotations
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH")
+ENABLED = bool(TRACE_EXPORT_PATH)
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "gestor-financeiro")
+
+# SpanKind do OTLP
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_OK, STATUS_ERROR = 1, 2
+
+STATEMENT_LIMIT = 1000
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+_HEX32 = re.compile(r"^[0-9a-f]{32}$")
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+def clean_request_id(value: Optional[str]) -> Optional[str]:
+    """Aceita um X-Request-ID recebido apenas se for curto e sem caracteres de controle."""
+    return value if value and _REQUEST_ID.match(value) else None
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace_id, parent_span_id) de um header W3C `traceparent` válido."""
+    match = _TRACEPARENT.match(value or "")
+    if not match or set(match.group(1)) == {"0"} or set(match.group(2)) == {"0"}:
+        return None
+    return match.group(1), match.group(2)
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "kind", "attributes",
+                 "start_ns", "end_ns", "error", "_finished")
+
+    def __init__(self, trace_id: str, parent_span_id: Optional[str], name: str, kind: int,
+                 attributes: Dict[str, Any], finished: List["Span"]):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+        self._finished = finished  # lista compartilhada pelos spans do mesmo trace
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def child(self, name: str, kind: int = KIND_INTERNAL, **attributes) -> "Span":
+        return Span(self.trace_id, self.span_id, name, kind, attributes, self._finished)
+
+    def finish(self, error: Optional[str] = None) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error:
+            self.error = error
+        self._finished.append(self)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        data = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": STATUS_ERROR, "message": self.error} if self.error else {"code": STATUS_OK},
+        }
+        if self.parent_span_id:
+            data["parentSpanId"] = self.parent_span_id
+        return data
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attributes) -> Iterator[Optional[Span]]:
+    """Span filho do span atual; no-op (yield None) fora de um trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = parent.child(name, kind, **attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.finish(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        child.finish()
+        _current_span.reset(token)
+
+
+def start_trace(name: str, kind: int = KIND_INTERNAL, trace_id: Optional[str] = None,
+                parent_span_id: Optional[str] = None, **attributes) -> Tuple[Span, Token]:
+    """Abre o span raiz de um trace e o torna o span atual."""
+    root = Span(trace_id or secrets.token_hex(16), parent_span_id, name, kind, attributes, [])
+    return root, _current_span.set(root)
+
+
+def finish_trace(root: Span, token: Token, error: Optional[str] = None) -> None:
+    """Fecha o span raiz, restaura o contexto e exporta todos os spans do trace."""
+    root.finish(error)
+    _current_span.reset(token)
+    _exporter.export(root._finished)
+
+
+@contextmanager
+def trace(name: str, **attributes) -> Iterator[Span]:
+    """Trace raiz fora de requests (jobs, CLI)."""
+    root, token = start_trace(name, KIND_INTERNAL, **attributes)
+    error = None
+    try:
+        yield root
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        finish_trace(root, token, error)
+
+
+class FileExporter:
+    """Grava um documento OTLP/JSON (`resourceSpans`) por trace, uma linha por trace."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        if not self.path or not spans:
+            return
+        line = json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [_attribute("service.name", SERVICE_NAME), _attribute("process.pid", os.getpid())]},
+                "scopeSpans": [{"scope": {"name": "gestor_financeiro"}, "spans": [s.to_otlp() for s in spans]}],
+            }]
+        }, ensure_ascii=False)
+        # Uma única escrita em modo append por trace: linhas de workers diferentes não se misturam
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+_exporter = FileExporter(TRACE_EXPORT_PATH)
+
+
+def init_app(app, engine) -> None:
+    """Registra o span SERVER por request e os spans de statements SQL.
+
+    Deve ser chamado depois do hook que define `g.request_id`.
+    """
+    from flask import g, request
+    from sqlalchemy import event
+
+    @app.before_request
+    def _trace_start():
+        request_id = g.get("request_id")
+        parent = parse_traceparent(request.headers.get("traceparent"))
+        if parent:
+            trace_id, parent_span_id = parent
+        else:
+            trace_id = request_id if request_id and _HEX32.match(request_id) else None
+            parent_span_id = None
+        route = request.url_rule.rule if request.url_rule is not None else request.path
+        g._trace = start_trace(
+            f"{request.method} {route}", KIND_SERVER, trace_id, parent_span_id,
+            **{"http.method": request.method, "http.route": route, "http.target": request.path,
+               "request.id": request_id},
+        )
+
+    @app.after_request
+    def _trace_status(response):
+        state = g.get("_trace")
+        if state is not None:
+            state[0].set_attribute("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                state[0].error = f"HTTP {response.status_code}"
+        return response
+
+    @app.teardown_request
+    def _trace_finish(exc):
+        state = g.pop("_trace", None)
+        if state is not None:
+            finish_trace(*state, error=f"{type(exc).__name__}: {exc}" if exc else None)
+
+    # O engine é compartilhado entre apps (create_app pode rodar mais de uma vez)
+    if getattr(engine, "_tracing_instrumented", False):
+        return
+    engine._tracing_instrumented = True
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        parent = _current_span.get()
+        db_span = None
+        if parent is not None:
+            db_span = parent.child(
+                statement.split(None, 1)[0].upper() if statement else "SQL", KIND_CLIENT,
+                **{"db.system": conn.dialect.name, "db.statement": statement[:STATEMENT_LIMIT]},
+            )
+            if executemany:
+                db_span.set_attribute("db.executemany", True)
+        conn.info.setdefault("_trace_spans", []).append(db_span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        db_span = conn.info["_trace_spans"].pop()
+        if db_span is not None:
+            db_span.finish()
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        stack = conn.info.get("_trace_spans") if conn is not None else None
+        if stack:
+            db_span = stack.pop()
+            if db_span is not None:
+                db_span.finish(error=str(exception_context.original_exception))
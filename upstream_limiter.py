@@ -0,0 +1,159 @@
+"""Limite de taxa do lado do cliente para as chamadas às instituições Open Finance.
+
+Token bucket por instituição (`base_url`, opcionalmente por operação) para que a
+taxa agregada de requests fique abaixo da cota (TPS) de cada instituição:
+
+- `rate` tokens/s com rajada de até `burst`; cada request consome um token.
+- Reserva: quem chega com o balde vazio reserva o próximo token e dorme até ele,
+  então as esperas ficam em fila e a vazão fica no limite, sem folga.
+- Estado em memória (compartilhado pelos threads do worker) ou, com
+  OPENFINANCE_RATE_LIMIT_DB, em um arquivo SQLite compartilhado pelos workers
+  da máquina.
+- Se a espera passar de `max_wait`, levanta `BudgetExhaustedError` em vez de
+  segurar o worker.
+
+Desligado por padrão (OPENFINANCE_RATE_LIMIT=0).
+"""
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+from resilience import institution_of
+
+RATE_LIMIT = float(os.getenv("OPENFINANCE_RATE_LIMIT", "0"))  # requests/s por instituição; 0 desliga
+RATE_BURST = float(os.getenv("OPENFINANCE_RATE_BURST", "0")) or None  # padrão: igual ao rate
+RATE_LIMIT_PER_ENDPOINT = os.getenv("OPENFINANCE_RATE_LIMIT_PER_ENDPOINT", "false").lower() == "true"
+RATE_LIMIT_DB = os.getenv("OPENFINANCE_RATE_LIMIT_DB")
+RATE_LIMIT_MAX_WAIT = float(os.getenv("OPENFINANCE_RATE_LIMIT_MAX_WAIT", "30"))
+
+WAIT_SECONDS = metrics.REGISTRY.histogram(
+    "provider_rate_limit_wait_seconds", "Espera imposta pelo limite de taxa por instituição", ("institution",),
+    buckets=(0.0, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+
+
+class BudgetExhaustedError(Exception):
+    """Espera pelo próximo token acima de `max_wait`."""
+
+    def __init__(self, institution: str, retry_after: float):
+        super().__init__(f"Cota de requests para {institution} esgotada; nova tentativa em {retry_after:.0f}s")
+        self.institution = institution
+        self.retry_after = retry_after
+
+
+def _take(tokens: float, updated: float, now: float, rate: float, burst: float) -> Tuple[float, float]:
+    """Reabastece o balde até `now` e reserva um token → (tokens restantes, espera)."""
+    tokens = min(burst, tokens + (now - updated) * rate) - 1
+    return tokens, max(0.0, -tokens / rate)
+
+
+class MemoryStore:
+    """Baldes no processo (threads do worker)."""
+
+    def __init__(self):
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str, rate: float, burst: float, max_wait: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens, wait = _take(tokens, updated, now, rate, burst)
+            if wait > max_wait:
+                raise BudgetExhaustedError(key, wait)
+            self._buckets[key] = [tokens, now]
+            return wait
+
+
+class SQLiteStore:
+    """Baldes em um arquivo SQLite, compartilhados por processos da mesma máquina.
+
+    Cada reserva é uma transação `BEGIN IMMEDIATE` (lock de escrita do arquivo),
+    o que serializa os workers sem servidor externo.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS upstream_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def reserve(self, key: str, rate: float, burst: float, max_wait: float) -> float:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()  # relógio comum entre processos
+            row = conn.execute("SELECT tokens, updated FROM upstream_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, wait = _take(*(row or (burst, now)), now, rate, burst)
+            if wait > max_wait:
+                raise BudgetExhaustedError(key, wait)
+            conn.execute("INSERT OR REPLACE INTO upstream_buckets (key, tokens, updated) VALUES (?, ?, ?)", (key, tokens, now))
+            conn.execute("COMMIT")
+            return wait
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class UpstreamLimiter:
+    """Token bucket por instituição (e opcionalmente por operação).
+
+    Args:
+        rate: Requests/s permitidos por chave; <= 0 desliga o limite
+        burst: Rajada máxima (padrão: `rate`, mínimo 1)
+        per_endpoint: Baldes separados por operação (token, accounts, transactions)
+        store_path: Arquivo SQLite para compartilhar os baldes entre workers
+        max_wait: Maior espera aceita antes de `BudgetExhaustedError`
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT, burst: Optional[float] = RATE_BURST, per_endpoint: bool = RATE_LIMIT_PER_ENDPOINT,
+                 store_path: Optional[str] = RATE_LIMIT_DB, max_wait: float = RATE_LIMIT_MAX_WAIT):
+        self.rate = rate
+        self.burst = max(1.0, burst or rate)
+        self.per_endpoint = per_endpoint
+        self.max_wait = max_wait
+        self.store = SQLiteStore(store_path) if store_path and rate > 0 else MemoryStore()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self, base_url: Optional[str], operation: Optional[str] = None) -> float:
+        """Espera até haver token para a instituição; retorna os segundos esperados."""
+        if not self.enabled:
+            return 0.0
+        institution = institution_of(base_url)
+        key = f"{base_url}|{operation}" if self.per_endpoint and operation else (base_url or institution)
+        try:
+            wait = self.store.reserve(key, self.rate, self.burst, self.max_wait)
+        except BudgetExhaustedError as e:
+            raise BudgetExhaustedError(institution, e.retry_after) from None
+        WAIT_SECONDS.observe(wait, institution=institution)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+_default_limiter: Optional[UpstreamLimiter] = None
+_default_lock = threading.Lock()
+
+
+def default_limiter() -> UpstreamLimiter:
+    """Limiter compartilhado pelo processo (variáveis OPENFINANCE_RATE_*)."""
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = UpstreamLimiter()
+        return _default_limiter
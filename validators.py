@@ -0,0 +1,125 @@
+"""Validação em lote de transações normalizadas (importação e sync Open Finance).
+
+Equivalente enxuto de `TransactionSchema.load` para listas grandes: valida
+descrição, valor positivo, tipo e data ISO em uma única passada, sem montar
+a maquinaria de erros do marshmallow por linha, e coleta os erros por índice
+com as mesmas mensagens. Campos desconhecidos são ignorados.
+"""
+from __future__ import annotations
+import math
+from datetime import date
+from typing import Dict, Iterable, List, Tuple
+
+from marshmallow.utils import from_iso_date
+
+TRANSACTION_TYPES = ("income", "expense")
+
+MSG_REQUIRED = "Missing data for required field."
+MSG_NULL = "Field may not be null."
+MSG_STRING = "Not a valid string."
+MSG_EMPTY = "Shorter than minimum length 1."
+MSG_NUMBER = "Not a valid number."
+MSG_SPECIAL = "Special numeric values (nan or infinity) are not permitted."
+MSG_POSITIVE = "Must be greater than 0."
+MSG_TYPE = f"Must be one of: {', '.join(TRANSACTION_TYPES)}."
+MSG_DATE = "Not a valid date."
+
+_MISSING = object()
+
+
+def _check_description(value, errors: Dict[str, List[str]]):
+    if value is _MISSING:
+        errors["description"] = [MSG_REQUIRED]
+    elif value is None:
+        errors["description"] = [MSG_NULL]
+    elif not isinstance(value, str):
+        errors["description"] = [MSG_STRING]
+    elif not value:
+        errors["description"] = [MSG_EMPTY]
+    else:
+        return value
+    return None
+
+
+def _check_amount(value, errors: Dict[str, List[str]]):
+    if value is _MISSING:
+        errors["amount"] = [MSG_REQUIRED]
+        return None
+    if value is None:
+        errors["amount"] = [MSG_NULL]
+        return None
+    if isinstance(value, bool):
+        errors["amount"] = [MSG_NUMBER]
+        return None
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        errors["amount"] = [MSG_NUMBER]
+        return None
+    if not math.isfinite(amount):
+        errors["amount"] = [MSG_SPECIAL]
+    elif amount <= 0:
+        errors["amount"] = [MSG_POSITIVE]
+    else:
+        return amount
+    return None
+
+
+def validate_transactions(items: Iterable[Dict], user_id: str) -> Tuple[List[Dict], Dict[int, Dict[str, List[str]]]]:
+    """Valida uma lista de transações normalizadas em uma única passada.
+
+    Args:
+        items: Dicts com description, amount, type e date (YYYY-MM-DD)
+        user_id: Usuário dono das transações (adicionado a cada item válido)
+
+    Returns:
+        (válidos, erros): válidos são dicts prontos para `Transaction(**data)`
+        (amount float, date como `date`); erros mapeiam índice → {campo: [mensagens]}.
+    """
+    valid: List[Dict] = []
+    errors: Dict[int, Dict[str, List[str]]] = {}
+    parsed_dates: Dict[str, date] = {}  # lotes de sync repetem muito as datas
+
+    for index, item in enumerate(items):
+        item_errors: Dict[str, List[str]] = {}
+        get = item.get
+
+        description = _check_description(get("description", _MISSING), item_errors)
+        amount = _check_amount(get("amount", _MISSING), item_errors)
+
+        txn_type = get("type", _MISSING)
+        if txn_type is _MISSING:
+            item_errors["type"] = [MSG_REQUIRED]
+        elif txn_type is None:
+            item_errors["type"] = [MSG_NULL]
+        elif not isinstance(txn_type, str):
+            item_errors["type"] = [MSG_STRING]
+        elif txn_type not in TRANSACTION_TYPES:
+            item_errors["type"] = [MSG_TYPE]
+
+        raw_date = get("date", _MISSING)
+        txn_date = None
+        if raw_date is _MISSING:
+            item_errors["date"] = [MSG_REQUIRED]
+        elif raw_date is None:
+            item_errors["date"] = [MSG_NULL]
+        else:
+            txn_date = parsed_dates.get(raw_date) if isinstance(raw_date, str) else None
+            if txn_date is None:
+                try:
+                    txn_date = from_iso_date(raw_date)
+                    parsed_dates[raw_date] = txn_date
+                except (TypeError, ValueError, AttributeError):
+                    item_errors["date"] = [MSG_DATE]
+
+        if item_errors:
+            errors[index] = item_errors
+            continue
+        valid.append({
+            "user_id": user_id,
+            "description": description,
+            "amount": amount,
+            "type": txn_type,
+            "date": txn_date,
+        })
+    return valid, errors